@@ -20,6 +20,60 @@ from app.utils.types import BrushDeleteType
 from config import BRUSH_REMOVE_TORRENTS_INTERVAL, Config
 
 
+class _BrushAdmission(object):
+    """
+    刷流任务单次运行的准入状态：运行开始时查询一次保种体积，下载器速度和任务数在首次用到时查询，
+    添加种子后在本地累加，不再逐个种子查询数据库和下载器
+    """
+
+    def __init__(self, taskinfo, dbhelper, downloader):
+        self._downloader = downloader
+        self._downloader_id = taskinfo.get("downloader")
+        # 当前保种体积
+        self.total_size = int(dbhelper.get_brushtask_totalsize(taskinfo.get("id")) or 0)
+        self._client_speed = None
+        # (类型, 标签) -> 任务数
+        self._counts = {}
+
+    def get_client_speed(self):
+        """
+        下载器当前速度
+        """
+        if self._client_speed is None:
+            downloader = self._downloader.get_downloader(downloader_id=self._downloader_id)
+            self._client_speed = downloader.get_client_speed() if downloader else False
+        return self._client_speed
+
+    def get_downloading_count(self, tag=None):
+        """
+        正在下载的任务数，支持限定 tag
+        """
+        key = ("downloading", tuple(tag or []))
+        if key not in self._counts:
+            self._counts[key] = len(self._downloader.get_downloading_torrents(downloader_id=self._downloader_id,
+                                                                              tag=tag) or [])
+        return self._counts[key]
+
+    def get_task_count(self, tag):
+        """
+        任务总数，限定 tag
+        """
+        key = ("total", tuple(tag or []))
+        if key not in self._counts:
+            self._counts[key] = len(self._downloader.get_torrents(downloader_id=self._downloader_id,
+                                                                  tag=tag) or [])
+        return self._counts[key]
+
+    def add_torrent(self, size, tags=None):
+        """
+        添加种子后更新保种体积和包含该种子标签的任务数
+        """
+        self.total_size += int(float(size or 0))
+        for key in self._counts:
+            if all(t in (tags or []) for t in key[1] if t):
+                self._counts[key] += 1
+
+
 @singleton
 class BrushTask(object):
     message = None
@@ -31,6 +85,7 @@ class BrushTask(object):
     downloader = None
     _scheduler = None
     _brush_tasks = {}
+    _brush_tasks_expired = True
     _torrents_cache = []
     _qb_client = "qbittorrent"
     _tr_client = "transmission"
@@ -93,10 +148,12 @@ class BrushTask(object):
         """
         从数据库加载刷流任务
         """
-        self._brush_tasks = {}
+        self._brush_tasks_expired = False
         brushtasks = self.dbhelper.get_brushtasks()
         if not brushtasks:
+            self._brush_tasks = {}
             return
+        brush_tasks = {}
         # 加载任务到内存
         for task in brushtasks:
             site_info = self.sites.get_sites(siteid=task.SITE)
@@ -106,7 +163,7 @@ class BrushTask(object):
                 site_url = ""
             downloader_info = self.downloader.get_downloader_conf(task.DOWNLOADER)
             total_size = round(int(self.dbhelper.get_brushtask_totalsize(task.ID)) / (1024 ** 3), 1)
-            self._brush_tasks[str(task.ID)] = {
+            brush_tasks[str(task.ID)] = {
                 "id": task.ID,
                 "name": task.NAME,
                 "site": site_info.get("name"),
@@ -138,12 +195,14 @@ class BrushTask(object):
                 "lst_mod_date": task.LST_MOD_DATE,
                 "site_url": site_url
             }
+        self._brush_tasks = brush_tasks
 
     def get_brushtask_info(self, taskid=None):
         """
-        读取刷流任务列表
+        读取刷流任务列表，任务有修改或统计数据有变化时才重新加载
         """
-        self.load_brushtasks()
+        if self._brush_tasks_expired:
+            self.load_brushtasks()
         if taskid:
             return self._brush_tasks.get(str(taskid)) or {}
         else:
@@ -163,13 +222,9 @@ class BrushTask(object):
         # 任务属性
         task_name = taskinfo.get("name")
         site_id = taskinfo.get("site_id")
-        rss_url = taskinfo.get("rss_url")
         rss_rule = taskinfo.get("rss_rule")
-        cookie = taskinfo.get("cookie")
         rss_free = taskinfo.get("free")
         downloader_id = taskinfo.get("downloader")
-        ua = taskinfo.get("ua")
-        apikey = taskinfo.get("apikey")
         state = taskinfo.get("state")
         if state != 'Y':
             log.info("【Brush】刷流任务 %s 已停止下载新种！" % task_name)
@@ -184,6 +239,11 @@ class BrushTask(object):
         site_name = site_info.get("name")
         site_proxy = site_info.get("proxy")
         site_brush_enable = site_info.get("brush_enable")
+        # 任务信息有缓存，站点的RSS地址和Cookie等以站点当前设置为准
+        rss_url = taskinfo.get("rss_url_show") or site_info.get("rssurl")
+        cookie = site_info.get("cookie")
+        ua = site_info.get("ua")
+        apikey = site_info.get("apikey")
         if not site_brush_enable:
             log.error("【Brush】站点 %s 未开启刷流功能，无法刷流！" % site_name)
             return
@@ -200,8 +260,11 @@ class BrushTask(object):
             return
 
         log.info("【Brush】开始站点 %s 的刷流任务：%s..." % (site_name, task_name))
+        # 本次运行的准入状态
+        admission = _BrushAdmission(taskinfo=taskinfo, dbhelper=self.dbhelper, downloader=self.downloader)
         # 检查是否达到保种体积
-        if not self.__is_allow_new_torrent(taskinfo=taskinfo,
+        if not self.__is_allow_new_torrent(admission=admission,
+                                           taskinfo=taskinfo,
                                            dlcount=rss_rule.get("dlcount"),
                                            current_site_count=rss_rule.get("current_site_count"),
                                            current_site_dlcount=rss_rule.get("current_site_dlcount"),
@@ -224,7 +287,7 @@ class BrushTask(object):
         success_count = 0
         new_torrent_count = 0
         if max_dlcount:
-            downloading_count = self.__get_downloading_count(downloader_id) or 0
+            downloading_count = admission.get_downloading_count() or 0
             new_torrent_count = int(max_dlcount) - int(downloading_count)
 
         # 当前站点任务总数
@@ -262,7 +325,8 @@ class BrushTask(object):
                                              proxy=site_proxy):
                     continue
                 # 检查能否添加当前种子，判断是否超过保种体积大小
-                if not self.__is_allow_new_torrent(taskinfo=taskinfo,
+                if not self.__is_allow_new_torrent(admission=admission,
+                                                   taskinfo=taskinfo,
                                                    dlcount=max_dlcount,
                                                    torrent_size=size,
                                                    current_site_count=current_site_count,
@@ -283,12 +347,15 @@ class BrushTask(object):
                                            size=size):
                     # 计数
                     success_count += 1
+                    admission.add_torrent(size=size,
+                                          tags=self.__get_site_labels(taskinfo=taskinfo, site_info=site_info))
                     # 添加种子后不能超过最大下载数量
                     if max_dlcount and success_count >= new_torrent_count:
                         break
 
                     # 再判断一次
-                    if not self.__is_allow_new_torrent(taskinfo=taskinfo,
+                    if not self.__is_allow_new_torrent(admission=admission,
+                                                       taskinfo=taskinfo,
                                                        dlcount=max_dlcount,
                                                        current_site_count=current_site_count,
                                                        current_site_dlcount=current_site_dlcount,
@@ -543,12 +610,23 @@ class BrushTask(object):
                                                          upload_size=total_uploaded,
                                                          download_size=total_downloaded,
                                                          remove_count=len(delete_ids) + len(remove_torrent_ids))
+                self._brush_tasks_expired = True
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
 
-    def __is_allow_new_torrent(self, taskinfo, dlcount, current_site_dlcount, current_site_count, site_info, torrent_size=None):
+    @staticmethod
+    def __get_site_labels(taskinfo, site_info):
+        """
+        站点任务数统计使用的标签：刷流任务标签和站点标签
+        """
+        return sorted(set((taskinfo.get("label").split(',') if taskinfo.get("label") else []) +
+                          (site_info.get("tags").split(',') if site_info.get("tags") else [])))
+
+    def __is_allow_new_torrent(self, admission, taskinfo, dlcount, current_site_dlcount, current_site_count, site_info,
+                               torrent_size=None):
         """
         检查是否还能添加新的下载
+        :param admission: 本次运行的准入状态
         """
         if not taskinfo:
             return False
@@ -557,9 +635,8 @@ class BrushTask(object):
         task_name = taskinfo.get("name")
         up_limit_speed = taskinfo.get("up_limit") or None
         dl_limit_speed = taskinfo.get("dl_limit") or None
-        downloader_id = taskinfo.get("downloader")
         downloader_name = taskinfo.get("downloader_name")
-        total_size = self.dbhelper.get_brushtask_totalsize(taskinfo.get("id"))
+        total_size = admission.total_size
         if torrent_size and seed_size:
             if float(torrent_size) + int(total_size) >= (float(seed_size) + 5) * 1024 ** 3:
                 log.warn("【Brush】刷流任务 %s 当前保种体积 %sGB，种子大小 %sGB，不添加刷流任务"
@@ -574,8 +651,7 @@ class BrushTask(object):
 
         # 检查下载速度上限、上传速度上限
         if (up_limit_speed and str(up_limit_speed).isdigit()) or (dl_limit_speed and str(dl_limit_speed).isdigit()):
-            downloader = self.downloader.get_downloader(downloader_id=downloader_id)
-            client_speed = downloader.get_client_speed()
+            client_speed = admission.get_client_speed()
             if client_speed and up_limit_speed and str(up_limit_speed).isdigit():
                 if float(client_speed.get('up_speed')) / 1024 >= float(up_limit_speed):
                     log.warn("【Brush】刷流任务 %s 所选下载器 %s 目前上传速度 %s Kb/s，不再新增下载"
@@ -587,7 +663,7 @@ class BrushTask(object):
 
         # 检查正在下载的任务数
         if dlcount:
-            downloading_total_count = self.__get_downloading_count(downloader_id)
+            downloading_total_count = admission.get_downloading_count()
             if downloading_total_count is None:
                 log.error("【Brush】任务 %s 下载器 %s 无法连接" % (task_name, downloader_name))
                 return False
@@ -597,8 +673,7 @@ class BrushTask(object):
                 return False
 
         # 检查是否添加标签
-        label = list(set((taskinfo.get("label").split(',') if taskinfo.get("label") else []) +
-                 (site_info.get("tags").split(',') if site_info.get("tags") else [])))
+        label = self.__get_site_labels(taskinfo=taskinfo, site_info=site_info)
         if label is None or len(label) <= 0:
             return True
 
@@ -606,7 +681,7 @@ class BrushTask(object):
 
         # 检查当前站点正在下载的任务数量
         if current_site_dlcount:
-            current_site_count_downloading = self.__get_downloading_count(downloader_id, tag=label)
+            current_site_count_downloading = admission.get_downloading_count(tag=label)
             if current_site_count_downloading is None:
                 log.error("【Brush】任务 %s 下载器 %s 无法连接" % (task_name, downloader_name))
                 return False
@@ -617,7 +692,7 @@ class BrushTask(object):
 
         # 检查当前站点任务数量
         if current_site_count:
-            current_site_count_total = self.__get_task_count(downloader_id, tag=label)
+            current_site_count_total = admission.get_task_count(tag=label)
             if current_site_count_total is None:
                 log.error("【Brush】任务 %s 下载器 %s 无法连接" % (task_name, downloader_name))
                 return False
@@ -628,20 +703,6 @@ class BrushTask(object):
 
         return True
 
-    def __get_downloading_count(self, downloader_id, tag=None):
-        """
-        查询当前正在下载的任务数，支持限定 tag
-        """
-        torrents = self.downloader.get_downloading_torrents(downloader_id=downloader_id, tag=tag) or []
-        return len(torrents)
-
-    def __get_task_count(self, downloader_id, tag):
-        """
-        查询当前任务总数，限定 tag
-        """
-        torrents = self.downloader.get_torrents(downloader_id=downloader_id, tag=tag) or []
-        return len(torrents)
-
     def __download_torrent(self,
                            taskinfo,
                            rss_rule,
@@ -723,6 +784,7 @@ class BrushTask(object):
                                                   size=size):
             # 更新下载次数
             self.dbhelper.add_brushtask_download_count(brush_id=taskid)
+            self._brush_tasks_expired = True
         else:
             log.info("【Brush】%s 已下载过" % title)
 
@@ -1064,4 +1126,4 @@ class BrushTask(object):
         """
         判断种子是否已经处理过
         """
-        return self.dbhelper.get_brushtask_torrent_by_enclosure(enclosure)
+        return self.dbhelper.is_brushtask_torrent_handled(enclosure)
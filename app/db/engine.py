@@ -0,0 +1,121 @@
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.pool import QueuePool
+
+import log
+from config import Config
+
+# 默认数据库连接参数
+DEFAULT_DATABASE_CONF = {
+    # 日志模式，WAL模式下读写互不阻塞
+    "journal_mode": "wal",
+    # 同步模式，WAL模式下NORMAL已能保证数据库不损坏
+    "synchronous": "normal",
+    # 数据库被锁时的等待时间（毫秒）
+    "busy_timeout": 30000,
+    # 每个连接的页缓存大小，负数表示KB
+    "cache_size": -16000,
+    # 内存映射大小（字节）
+    "mmap_size": 128 * 1024 * 1024,
+    # 连接池常驻连接数，会话在提交前一直占用连接，需覆盖所有长期运行的线程
+    "pool_size": 100,
+    # 连接池允许临时增加的连接数
+    "max_overflow": 0,
+    # 从连接池获取连接的超时时间（秒）
+    "pool_timeout": 30
+}
+
+JOURNAL_MODES = ["delete", "truncate", "persist", "memory", "wal", "off"]
+SYNCHRONOUS_MODES = ["off", "normal", "full", "extra"]
+
+
+def get_database_conf(conf=None):
+    """
+    合并配置文件中的数据库参数与默认参数
+    :param conf: 指定的数据库参数，为空时读取配置文件database节
+    """
+    if conf is None:
+        conf = Config().get_config('database') or {}
+    database_conf = dict(DEFAULT_DATABASE_CONF)
+    for key, default in DEFAULT_DATABASE_CONF.items():
+        value = conf.get(key)
+        if value is None or value == "":
+            continue
+        if isinstance(default, int):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        else:
+            value = str(value).lower()
+        database_conf[key] = value
+    if database_conf["journal_mode"] not in JOURNAL_MODES:
+        database_conf["journal_mode"] = DEFAULT_DATABASE_CONF["journal_mode"]
+    if database_conf["synchronous"] not in SYNCHRONOUS_MODES:
+        database_conf["synchronous"] = DEFAULT_DATABASE_CONF["synchronous"]
+    return database_conf
+
+
+def create_sqlite_engine(db_file, conf=None):
+    """
+    创建SQLite数据库引擎，每个新连接建立时设置日志模式、同步模式、缓存等参数
+    :param db_file: 数据库文件路径
+    :param conf: 数据库参数，为空时读取配置文件
+    """
+    database_conf = get_database_conf(conf)
+    engine = create_engine(
+        f"sqlite:///{db_file}?check_same_thread=False",
+        echo=False,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_size=max(database_conf["pool_size"], 1),
+        max_overflow=max(database_conf["max_overflow"], 0),
+        pool_timeout=database_conf["pool_timeout"],
+        pool_recycle=60 * 10,
+        connect_args={"timeout": database_conf["busy_timeout"] / 1000}
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={database_conf['journal_mode']}")
+            cursor.execute(f"PRAGMA synchronous={database_conf['synchronous']}")
+            cursor.execute(f"PRAGMA busy_timeout={database_conf['busy_timeout']}")
+            cursor.execute(f"PRAGMA cache_size={database_conf['cache_size']}")
+            cursor.execute(f"PRAGMA mmap_size={database_conf['mmap_size']}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def create_indexes(metadata, engine):
+    """
+    创建模型中声明但数据库中缺失的索引，create_all不会为已存在的表补建索引
+    :param metadata: 模型元数据
+    :param engine: 数据库引擎
+    :return: 新建的索引名称列表
+    """
+    inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+    created = []
+    for table in metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        exists = {index.get("name") for index in inspector.get_indexes(table.name)}
+        columns = {column.get("name") for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if index.name in exists:
+                continue
+            # 字段尚未通过数据库升级脚本添加时，待下次启动再创建
+            if any(column.name not in columns for column in index.columns):
+                continue
+            log.info(f"【Db】正在为表 {table.name} 创建索引 {index.name} ...")
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # 旧数据存在重复记录时唯一索引无法创建，跳过该索引，不影响数据库初始化
+                log.error(f"【Db】为表 {table.name} 创建索引 {index.name} 失败：{str(e)}")
+                continue
+            created.append(index.name)
+    return created
@@ -1,23 +1,19 @@
 import os
 import threading
-from sqlalchemy import create_engine, text
+from contextlib import contextmanager
+
+from sqlalchemy import text, insert
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
+from app.db.engine import create_sqlite_engine, create_indexes
 from app.db.models import Base
 from app.utils import ExceptionUtils, PathUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+# 当前线程的事务单元嵌套深度
+_UnitOfWork = threading.local()
+_Engine = create_sqlite_engine(os.path.join(Config().get_config_path(), 'user.db'))
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False,
@@ -33,6 +29,7 @@ class MainDb:
     def init_db(self):
         with lock:
             Base.metadata.create_all(_Engine)
+            create_indexes(Base.metadata, _Engine)
             self.init_db_version()
 
     def init_db_version(self):
@@ -79,6 +76,75 @@ class MainDb:
         else:
             self.session.add(data)
 
+    def bulk_insert(self, model, rows):
+        """
+        批量插入数据，使用executemany一次写入，不构造ORM对象
+        :param model: 数据表模型
+        :param rows: 字段字典列表
+        """
+        if not rows:
+            return
+        self.session.execute(insert(model), rows)
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        事务单元，单元内所有DbPersist操作合并为一个事务，在最外层单元结束时统一提交；
+        单元内任一操作失败时，最外层单元结束时回滚全部写入，不再提交
+        """
+        _UnitOfWork.depth = self.unit_of_work_depth() + 1
+        if _UnitOfWork.depth == 1:
+            _UnitOfWork.failed = False
+            _UnitOfWork.callbacks = []
+        try:
+            yield self
+            if _UnitOfWork.depth == 1:
+                if _UnitOfWork.failed:
+                    self.rollback()
+                else:
+                    self.commit()
+                    for callback in _UnitOfWork.callbacks:
+                        callback()
+        except Exception:
+            self.rollback()
+            raise
+        finally:
+            if _UnitOfWork.depth == 1:
+                _UnitOfWork.callbacks = []
+            _UnitOfWork.depth -= 1
+
+    def after_commit(self, callback):
+        """
+        写入提交后执行回调，处于事务单元中时在最外层单元提交后执行，回滚时不执行
+        """
+        if self.unit_of_work_depth():
+            _UnitOfWork.callbacks.append(callback)
+        else:
+            callback()
+
+    @staticmethod
+    def fail_unit_of_work():
+        """
+        标记当前事务单元失败，单元结束时回滚全部写入
+        """
+        if getattr(_UnitOfWork, "depth", 0):
+            _UnitOfWork.failed = True
+
+    @staticmethod
+    def unit_of_work_depth():
+        """
+        当前线程所处事务单元的嵌套深度，0表示不在事务单元中
+        """
+        return getattr(_UnitOfWork, "depth", 0)
+
+    @staticmethod
+    def checkpoint():
+        """
+        将WAL日志合并到数据库文件并清空日志，直接操作数据库文件前调用
+        """
+        with _Engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
     def query(self, *obj):
         """
         查询对象
@@ -122,11 +188,17 @@ class DbPersist(object):
         def persist(*args, **kwargs):
             try:
                 ret = f(*args, **kwargs)
-                self.db.commit()
+                if self.db.unit_of_work_depth():
+                    # 处于事务单元中时只刷写，由事务单元统一提交
+                    self.db.flush()
+                else:
+                    self.db.commit()
                 return True if ret is None else ret
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
                 self.db.rollback()
+                # 事务单元中已刷写的写入已被回滚，标记单元失败，后续写入也不再提交
+                self.db.fail_unit_of_work()
                 return False
 
         return persist
@@ -4,24 +4,17 @@ import threading
 import time
 
 from cachetools import cached, TTLCache
-from sqlalchemy import create_engine
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
-from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
+from app.db.engine import create_sqlite_engine, create_indexes
+from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC, TMDBCACHE
 from app.utils import ExceptionUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'media.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+_Engine = create_sqlite_engine(os.path.join(Config().get_config_path(), 'media.db'))
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False))
@@ -37,6 +30,7 @@ class MediaDb:
     def init_db():
         with lock:
             BaseMedia.metadata.create_all(_Engine)
+            create_indexes(BaseMedia.metadata, _Engine)
 
     def insert(self, server_type, iteminfo, seasoninfo):
         if not server_type or not iteminfo:
@@ -129,3 +123,97 @@ class MediaDb:
         if not server_type:
             return None
         return self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).first()
+
+    def get_tmdb_cache(self, key):
+        """
+        按KEY查询TMDB缓存
+        """
+        if not key:
+            return None
+        try:
+            return self.session.query(TMDBCACHE).filter(TMDBCACHE.KEY == key).first()
+        finally:
+            # 只读查询不会提交，查询后释放连接，避免长期运行的搜索、识别线程一直占用连接池
+            _Session.remove()
+
+    def insert_tmdb_cache(self, items):
+        """
+        批量插入TMDB缓存，KEY已存在的跳过
+        :param items: TMDB_CACHE字段字典列表
+        """
+        if not items:
+            return False
+        try:
+            self.session.execute(sqlite_insert(TMDBCACHE).on_conflict_do_nothing(index_elements=["KEY"]), items)
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def update_tmdb_cache(self, key, **kwargs):
+        """
+        更新TMDB缓存的字段
+        """
+        if not key or not kwargs:
+            return False
+        try:
+            self.session.query(TMDBCACHE).filter(TMDBCACHE.KEY == key).update(kwargs)
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def delete_tmdb_cache(self, key=None, tmdbid=None, expire_time=None):
+        """
+        删除TMDB缓存，均为空时不删除，清空全部使用clear_tmdb_cache
+        :param key: 缓存KEY
+        :param tmdbid: 删除该TMDBID的所有缓存
+        :param expire_time: 删除过期时间早于该时间的缓存
+        """
+        if not key and not tmdbid and not expire_time:
+            return False
+        try:
+            query = self.session.query(TMDBCACHE)
+            if key:
+                query = query.filter(TMDBCACHE.KEY == key)
+            elif tmdbid:
+                query = query.filter(TMDBCACHE.TMDBID == str(tmdbid))
+            elif expire_time:
+                query = query.filter(TMDBCACHE.EXPIRE_TIME < expire_time)
+            query.delete()
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def clear_tmdb_cache(self):
+        """
+        清空全部TMDB缓存
+        """
+        try:
+            self.session.query(TMDBCACHE).delete()
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def search_tmdb_cache(self, search=None, offset=0, limit=30):
+        """
+        分页搜索TMDB缓存
+        :return: 总数, 当前页记录
+        """
+        try:
+            query = self.session.query(TMDBCACHE)
+            if search:
+                query = query.filter(func.instr(func.lower(TMDBCACHE.KEY), search.lower()) > 0)
+            return query.count(), query.order_by(TMDBCACHE.ID).offset(offset).limit(limit).all()
+        finally:
+            _Session.remove()
@@ -151,6 +151,10 @@ class DOWNLOADER(Base):
 
 class DOWNLOADHISTORY(Base):
     __tablename__ = 'DOWNLOAD_HISTORY'
+    __table_args__ = (
+        Index('INDX_DOWNLOAD_HISTORY_DOWNLOADER', 'DOWNLOADER', 'DOWNLOAD_ID'),
+        Index('INDX_DOWNLOAD_HISTORY_SAVE_PATH', 'SAVE_PATH', 'DATE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TITLE = Column(Text, index=True)
@@ -389,6 +393,9 @@ class SITEBRUSHTASK(Base):
 
 class SITEBRUSHTORRENTS(Base):
     __tablename__ = 'SITE_BRUSH_TORRENTS'
+    __table_args__ = (
+        Index('INDX_SITE_BRUSH_TORRENTS_TE', 'TASK_ID', 'ENCLOSURE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TASK_ID = Column(Text, index=True)
@@ -497,6 +504,9 @@ class TRANSFERBLACKLIST(Base):
 
 class TRANSFERHISTORY(Base):
     __tablename__ = 'TRANSFER_HISTORY'
+    __table_args__ = (
+        Index('INDX_TRANSFER_HISTORY_SOURCE', 'SOURCE_PATH', 'SOURCE_FILENAME'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     MODE = Column(Text)
@@ -566,6 +576,8 @@ class MEDIASYNCITEMS(BaseMedia):
     __tablename__ = 'MEDIASYNC_ITEMS'
     __table_args__ = (
         Index('INDX_MEDIASYNC_ITEMS_SL', 'SERVER', 'LIBRARY'),
+        Index('INDX_MEDIASYNC_ITEMS_ST', 'SERVER', 'TMDBID'),
+        Index('INDX_MEDIASYNC_ITEMS_STY', 'SERVER', 'TITLE', 'YEAR'),
     )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
@@ -592,3 +604,17 @@ class MEDIASYNCSTATISTIC(BaseMedia):
     MOVIE_COUNT = Column(Text)
     TV_COUNT = Column(Text)
     UPDATE_TIME = Column(Text)
+
+
+class TMDBCACHE(BaseMedia):
+    __tablename__ = 'TMDB_CACHE'
+
+    ID = Column(Integer, Sequence('ID'), primary_key=True)
+    KEY = Column(Text, unique=True, index=True)
+    TMDBID = Column(Text, index=True)
+    TYPE = Column(Text)
+    TITLE = Column(Text)
+    YEAR = Column(Text)
+    POSTER_PATH = Column(Text)
+    BACKDROP_PATH = Column(Text)
+    EXPIRE_TIME = Column(Integer, index=True)
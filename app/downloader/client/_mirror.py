@@ -0,0 +1,204 @@
+import time
+from threading import Lock
+
+import log
+
+
+class TorrentMirror(object):
+    """
+    下载器种子镜像：在内存中保存下载器的全部种子，按Hash、状态、标签建立索引，
+    读取时超过有效期才向下载器增量同步，多处同时读取只同步一次
+    """
+    # 镜像有效期（秒），有效期内的读取不访问下载器
+    MAX_AGE = 5
+    # 全量同步间隔（秒），用于纠正增量同步可能遗漏的变化
+    FULL_INTERVAL = 600
+
+    def __init__(self, name, sync, get_state, get_tags, get_aliases=None, delta_window=None,
+                 max_age=MAX_AGE, full_interval=FULL_INTERVAL):
+        """
+        :param name: 下载器名称
+        :param sync: 同步函数，参数为 是否全量、当前种子字典、需要重新查询的种子ID，
+                     返回 是否全量结果、变化的种子字典、删除的种子ID列表
+        :param get_state: 获取种子状态的函数
+        :param get_tags: 获取种子标签列表的函数
+        :param get_aliases: 获取种子Hash以外其它ID的函数
+        :param delta_window: 增量同步的时间窗口（秒），距上次同步超过该时间时全量同步
+        :param max_age: 镜像有效期（秒）
+        :param full_interval: 全量同步间隔（秒）
+        """
+        self._name = name
+        self._sync = sync
+        self._get_state = get_state
+        self._get_tags = get_tags
+        self._get_aliases = get_aliases
+        self._delta_window = delta_window
+        self._max_age = max_age
+        self._full_interval = full_interval
+        # Hash -> 种子
+        self._torrents = {}
+        # 其它ID -> Hash
+        self._aliases = {}
+        # 状态 -> Hash集合
+        self._states = {}
+        # 标签 -> Hash集合
+        self._tags = {}
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._synced = False
+        self._sync_time = 0
+        self._full_time = 0
+        self._dirty = False
+        # 修改过的种子ID，下次同步时重新查询
+        self._pending = set()
+        self._hits = 0
+        self._syncs = 0
+        self._full_syncs = 0
+
+    def invalidate(self, ids=None):
+        """
+        标记镜像需要同步，对下载器做了修改后调用
+        :param ids: 修改过的种子ID，下次同步时重新查询
+        """
+        if ids:
+            with self._lock:
+                self._pending.update(ids if isinstance(ids, list) else [ids])
+        self._dirty = True
+
+    def get_torrents(self, ids=None, states=None, tags=None):
+        """
+        查询种子，同步出错时抛出异常
+        :param ids: 种子ID，单个ID或者ID列表
+        :param states: 种子状态列表，满足其一即可
+        :param tags: 种子标签，单个标签或者标签列表，需全部包含
+        :return: 种子列表
+        """
+        synced = self.__refresh()
+        if ids is not None and not isinstance(ids, list):
+            ids = [ids]
+        if not ids:
+            ids = None
+        if tags and not isinstance(tags, list):
+            tags = [tags]
+        torrents, missing = self.__query(ids, states, tags)
+        # 指定的种子不在镜像中时可能是刚添加的，立即同步后再查一次
+        if missing and not synced:
+            self.invalidate()
+            self.__refresh()
+            torrents, _ = self.__query(ids, states, tags)
+        return torrents
+
+    def __query(self, ids, states, tags):
+        """
+        按索引查询种子，返回 种子列表、是否有指定的种子不在镜像中
+        """
+        missing = False
+        with self._lock:
+            if ids is not None:
+                hashes = [self.__get_hash(tid) for tid in ids]
+                missing = None in hashes
+                hashes = list(dict.fromkeys(thash for thash in hashes if thash))
+            else:
+                hashes = list(self._torrents)
+            matched = None
+            if states:
+                matched = set()
+                for state in states:
+                    matched |= self._states.get(state) or set()
+            for tag in tags or []:
+                if not tag:
+                    continue
+                tagged = self._tags.get(tag) or set()
+                matched = tagged if matched is None else matched & tagged
+            if matched is not None:
+                hashes = [thash for thash in hashes if thash in matched]
+            return [self._torrents[thash] for thash in hashes], missing
+
+    def __get_hash(self, tid):
+        if tid in self._torrents:
+            return tid
+        return self._aliases.get(tid)
+
+    def __refresh(self):
+        """
+        镜像过期时同步，同时发起的同步只执行一次
+        :return: 是否进行了同步
+        """
+        if self.__is_fresh():
+            self._hits += 1
+            return False
+        with self._sync_lock:
+            # 等待其它线程同步完成后再次检查
+            if self.__is_fresh():
+                self._hits += 1
+                return False
+            now = time.time()
+            full = not self._synced \
+                or now - self._full_time > self._full_interval \
+                or (self._delta_window and now - self._sync_time > self._delta_window)
+            with self._lock:
+                pending, self._pending = self._pending, set()
+                self._dirty = False
+            try:
+                full_update, torrents, removed = self._sync(full, self._torrents, list(pending))
+            except Exception:
+                with self._lock:
+                    self._pending |= pending
+                    self._dirty = True
+                raise
+            self.__apply(full_update, torrents, removed)
+            self._synced = True
+            self._sync_time = now
+            self._syncs += 1
+            if full_update:
+                self._full_time = now
+                self._full_syncs += 1
+                log.debug(f"【Downloader】{self._name} 种子镜像全量同步完成，共 {len(self._torrents)} 个种子")
+            return True
+
+    def __is_fresh(self):
+        return self._synced and not self._dirty and time.time() - self._sync_time < self._max_age
+
+    def __apply(self, full_update, torrents, removed):
+        with self._lock:
+            if full_update:
+                self._torrents = {}
+                self._aliases = {}
+                self._states = {}
+                self._tags = {}
+            for tid in removed or []:
+                self.__remove(self.__get_hash(tid))
+            for thash, torrent in (torrents or {}).items():
+                self.__remove(thash)
+                self._torrents[thash] = torrent
+                for alias in (self._get_aliases(torrent) if self._get_aliases else None) or []:
+                    self._aliases[alias] = thash
+                self._states.setdefault(self._get_state(torrent), set()).add(thash)
+                for tag in self._get_tags(torrent) or []:
+                    self._tags.setdefault(tag, set()).add(thash)
+
+    def __remove(self, thash):
+        torrent = self._torrents.pop(thash, None) if thash else None
+        if torrent is None:
+            return
+        for alias in (self._get_aliases(torrent) if self._get_aliases else None) or []:
+            self._aliases.pop(alias, None)
+        state = self._get_state(torrent)
+        self._states.get(state, set()).discard(thash)
+        for tag in self._get_tags(torrent) or []:
+            self._tags.get(tag, set()).discard(thash)
+
+    def get_statistics(self):
+        """
+        查询镜像统计信息
+        """
+        with self._lock:
+            return {
+                "name": self._name,
+                "count": len(self._torrents),
+                "states": {state: len(hashes) for state, hashes in self._states.items() if hashes},
+                "hits": self._hits,
+                "syncs": self._syncs,
+                "full_syncs": self._full_syncs,
+                "age": round(time.time() - self._sync_time, 1) if self._synced else None
+            }
@@ -6,6 +6,7 @@ from datetime import datetime
 import log
 import qbittorrentapi
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.client._mirror import TorrentMirror
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 
@@ -18,9 +19,19 @@ class Qbittorrent(_IDownloadClient):
     # 下载器名称
     client_name = DownloaderType.QB.value
 
+    # 种子状态筛选条件对应的种子状态，与qBittorrent的status_filter保持一致
+    _qb_state_filters = {
+        "downloading": ["downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL", "pausedDL", "stoppedDL",
+                        "queuedDL", "forcedDL"],
+        "completed": ["uploading", "stalledUP", "checkingUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP"],
+        "paused": ["pausedDL", "pausedUP", "stoppedDL", "stoppedUP"]
+    }
+
     # 私有属性
     _client_config = {}
     _torrent_management = False
+    _mirror = None
+    _rid = 0
 
     qbc = None
     ver = None
@@ -34,6 +45,11 @@ class Qbittorrent(_IDownloadClient):
     def __init__(self, config):
         self._client_config = config
         self.init_config()
+        # 种子镜像，通过sync/maindata增量同步
+        self._mirror = TorrentMirror(name=f"{self.client_name} {self.name}",
+                                     sync=self.__sync_torrents,
+                                     get_state=lambda torrent: torrent.get("state"),
+                                     get_tags=self.__get_torrent_tags)
         self.connect()
         # 种子自动管理模式，根据下载路径设置为下载器设置分类
         self.init_torrent_management()
@@ -175,6 +191,27 @@ class Qbittorrent(_IDownloadClient):
                 return category_name
         return None
 
+    def __sync_torrents(self, full, torrents, ids=None):
+        """
+        通过sync/maindata同步种子，rid为0时返回全部种子，否则只返回变化的字段，修改过的种子也包含在内
+        """
+        if full:
+            self._rid = 0
+        maindata = self.qbc.sync_maindata(rid=self._rid)
+        self._rid = maindata.get("rid") or 0
+        full_update = True if maindata.get("full_update") else False
+        changed = {}
+        for thash, data in (maindata.get("torrents") or {}).items():
+            torrent = {} if full_update else dict(torrents.get(thash) or {})
+            torrent.update(data)
+            torrent["hash"] = thash
+            changed[thash] = qbittorrentapi.TorrentDictionary(data=torrent, client=self.qbc)
+        return full_update, changed, maindata.get("torrents_removed") or []
+
+    @staticmethod
+    def __get_torrent_tags(torrent):
+        return [tag.strip() for tag in (torrent.get("tags") or "").split(",") if tag.strip()]
+
     def get_torrents(self, ids=None, status=None, tag=None):
         """
         获取种子列表
@@ -183,6 +220,13 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return [], True
         try:
+            # 常用的状态筛选从种子镜像中查询
+            status_filters = status if isinstance(status, list) else [status] if status else []
+            if all(s in self._qb_state_filters for s in status_filters):
+                states = [state for s in status_filters for state in self._qb_state_filters.get(s)]
+                return self._mirror.get_torrents(ids=ids.split("|") if isinstance(ids, str) else ids,
+                                                 states=states,
+                                                 tags=tag), False
             torrents = self.qbc.torrents_info(torrent_hashes=ids,
                                               status_filter=status)
             if tag:
@@ -236,6 +280,9 @@ class Qbittorrent(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 移除种子tag出错：{str(err)}")
             return False
+        finally:
+            # 修改完成后再使镜像失效，出错时也可能已部分生效
+            self._mirror.invalidate()
 
     def set_torrents_status(self, ids, tags=None):
         """
@@ -246,6 +293,7 @@ class Qbittorrent(_IDownloadClient):
         try:
             # 打标签
             self.qbc.torrents_add_tags(tags="已整理", torrent_hashes=ids)
+            self._mirror.invalidate()
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子状态为已整理出错：{str(err)}")
 
@@ -255,6 +303,7 @@ class Qbittorrent(_IDownloadClient):
         """
         try:
             self.qbc.torrents_set_force_start(enable=True, torrent_hashes=ids)
+            self._mirror.invalidate()
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置强制做种出错：{str(err)}")
 
@@ -495,6 +544,7 @@ class Qbittorrent(_IDownloadClient):
                                             seeding_time_limit=seeding_time_limit,
                                             use_auto_torrent_management=is_auto,
                                             cookie=cookie)
+            self._mirror.invalidate()
             return True if qbc_ret and str(qbc_ret).find("Ok") != -1 else False
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 添加种子出错：{str(err)}")
@@ -508,6 +558,8 @@ class Qbittorrent(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 开始下载出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate()
 
     def stop_torrents(self, ids):
         if not self.qbc:
@@ -517,6 +569,8 @@ class Qbittorrent(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 停止下载出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate()
 
     def delete_torrents(self, delete_file, ids):
         if not self.qbc:
@@ -525,6 +579,7 @@ class Qbittorrent(_IDownloadClient):
             return False
         try:
             self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
+            self._mirror.invalidate()
             return True
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 删除种子出错：{str(err)}")
@@ -579,6 +634,7 @@ class Qbittorrent(_IDownloadClient):
             return
         self.qbc.torrents_set_upload_limit(limit=int(limit),
                                            torrent_hashes=ids)
+        self._mirror.invalidate()
 
     def set_downloadspeed_limit(self, ids, limit):
         """
@@ -590,6 +646,7 @@ class Qbittorrent(_IDownloadClient):
             return
         self.qbc.torrents_set_download_limit(limit=int(limit),
                                              torrent_hashes=ids)
+        self._mirror.invalidate()
 
     def change_torrent(self, **kwargs):
         """
@@ -655,6 +712,8 @@ class Qbittorrent(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 检验种子出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate()
 
     def get_client_speed(self):
         if not self.qbc:
@@ -9,6 +9,7 @@ import log
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.client._mirror import TorrentMirror
 
 
 class Transmission(_IDownloadClient):
@@ -25,8 +26,12 @@ class Transmission(_IDownloadClient):
               "peersGettingFromUs", "peersSendingToUs", "uploadRatio", "uploadedEver", "downloadedEver", "downloadDir",
               "error", "errorString", "doneDate", "queuePosition", "activityDate", "trackers"]
 
+    # Transmission的recently-active只包含最近60秒内变化的种子，超过该时间未同步需全量同步
+    _recently_active_window = 50
+
     # 私有属性
     _client_config = {}
+    _mirror = None
 
     trc = None
     host = None
@@ -39,6 +44,13 @@ class Transmission(_IDownloadClient):
     def __init__(self, config):
         self._client_config = config
         self.init_config()
+        # 种子镜像，通过recently-active增量同步
+        self._mirror = TorrentMirror(name=f"{self.client_name} {self.name}",
+                                     sync=self.__sync_torrents,
+                                     get_state=lambda torrent: torrent.status,
+                                     get_tags=lambda torrent: torrent.fields.get("labels") or [],
+                                     get_aliases=lambda torrent: [torrent.id],
+                                     delta_window=self._recently_active_window)
         self.connect()
         # 设置未完成种子添加!part后缀
         self.trc.set_session(rename_partial_files=True)
@@ -102,29 +114,25 @@ class Transmission(_IDownloadClient):
         if not self.trc:
             return [], True
         ids = self.__parse_ids(ids)
+        if status and not isinstance(status, list):
+            status = [status]
         try:
-            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
+            return self._mirror.get_torrents(ids=ids, states=status, tags=tag), False
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return [], True
-        if status and not isinstance(status, list):
-            status = [status]
-        if tag and not isinstance(tag, list):
-            tag = [tag]
-        ret_torrents = []
-        for torrent in torrents:
-            if status and torrent.status not in status:
-                continue
-            labels = torrent.labels if hasattr(torrent, "labels") else []
-            include_flag = True
-            if tag:
-                for t in tag:
-                    if t and t not in labels:
-                        include_flag = False
-                        break
-            if include_flag:
-                ret_torrents.append(torrent)
-        return ret_torrents, False
+
+    def __sync_torrents(self, full, torrents, ids=None):
+        """
+        全量同步时查询全部种子，否则只查询最近60秒内变化的种子和修改过的种子
+        """
+        if full:
+            return True, {torrent.hashString: torrent
+                          for torrent in self.trc.get_torrents(arguments=self._trarg)}, []
+        active, removed = self.trc.get_recently_active_torrents(arguments=self._trarg)
+        if ids:
+            active += self.trc.get_torrents(ids=ids, arguments=self._trarg)
+        return False, {torrent.hashString: torrent for torrent in active}, removed
 
     def get_completed_torrents(self, ids=None, tag=None):
         """
@@ -174,6 +182,7 @@ class Transmission(_IDownloadClient):
         # 打标签
         try:
             self.trc.change_torrent(labels=tags, ids=ids)
+            self._mirror.invalidate(ids)
             log.info(f"【{self.client_name}】{self.name} 设置种子标签成功")
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子为已整理状态出错：{str(err)}")
@@ -187,6 +196,7 @@ class Transmission(_IDownloadClient):
         ids = self.__parse_ids(tid)
         try:
             self.trc.change_torrent(labels=tag, ids=ids)
+            self._mirror.invalidate(ids)
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子标签出错：{str(err)}")
 
@@ -253,6 +263,7 @@ class Transmission(_IDownloadClient):
                                     seedRatioLimit=seedRatioLimit,
                                     seedIdleMode=seedIdleMode,
                                     seedIdleLimit=seedIdleLimit)
+            self._mirror.invalidate(ids)
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 设置种子出错：{str(err)}")
 
@@ -389,6 +400,7 @@ class Transmission(_IDownloadClient):
                                        paused=is_paused,
                                        cookies=cookie)
             if ret and ret.hashString:
+                self._mirror.invalidate(ret.hashString)
                 if upload_limit:
                     self.set_uploadspeed_limit(ret.hashString, int(upload_limit))
                 if download_limit:
@@ -407,6 +419,9 @@ class Transmission(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 开始下载出错：{str(err)}")
             return False
+        finally:
+            # 修改完成后再使镜像失效，出错时也可能已部分生效
+            self._mirror.invalidate(ids)
 
     def stop_torrents(self, ids):
         if not self.trc:
@@ -417,6 +432,8 @@ class Transmission(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 停止下载出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate(ids)
 
     def delete_torrents(self, delete_file, ids):
         if not self.trc:
@@ -429,6 +446,8 @@ class Transmission(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 删除下载出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate()
 
     def get_files(self, tid):
         """
@@ -488,6 +507,7 @@ class Transmission(_IDownloadClient):
             return
         ids = self.__parse_ids(ids)
         self.trc.change_torrent(ids, uploadLimit=int(limit))
+        self._mirror.invalidate(ids)
 
     def set_downloadspeed_limit(self, ids, limit):
         """
@@ -499,6 +519,7 @@ class Transmission(_IDownloadClient):
             return
         ids = self.__parse_ids(ids)
         self.trc.change_torrent(ids, downloadLimit=int(limit))
+        self._mirror.invalidate(ids)
 
     def get_downloading_progress(self, tag=None, ids=None):
         """
@@ -570,6 +591,8 @@ class Transmission(_IDownloadClient):
         except Exception as err:
             log.error(f"【{self.client_name}】{self.name} 校验种子出错：{str(err)}")
             return False
+        finally:
+            self._mirror.invalidate(ids)
 
     def get_client_speed(self):
         if not self.trc:
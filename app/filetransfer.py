@@ -5,12 +5,11 @@ import re
 import shutil
 import traceback
 from enum import Enum
-from threading import Lock
 from time import sleep
 
 import log
 from app.conf import ModuleConf
-from app.helper import DbHelper, ProgressHelper
+from app.helper import DbHelper, ProgressHelper, TransferHelper
 from app.helper import ThreadHelper
 from app.media import Media, Category, Scraper
 from app.media.meta import MetaInfo
@@ -22,8 +21,6 @@ from app.utils.types import MediaType, SyncType, RmtMode, EventType, ProgressKey
 from config import RMT_AUDIO_TRACK_EXT, RMT_SUBEXT, RMT_MEDIAEXT, RMT_FAVTYPE, RMT_MIN_FILESIZE, DEFAULT_MOVIE_FORMAT, \
     DEFAULT_TV_FORMAT, Config
 
-lock = Lock()
-
 
 @singleton
 class FileTransfer:
@@ -36,6 +33,7 @@ class FileTransfer:
     dbhelper = None
     progress = None
     eventmanager = None
+    transferhelper = None
 
     _default_rmt_mode = None
     _movie_path = None
@@ -68,6 +66,7 @@ class FileTransfer:
         self.dbhelper = DbHelper()
         self.progress = ProgressHelper()
         self.eventmanager = EventManager()
+        self.transferhelper = TransferHelper()
 
         laboratory = Config().get_config("laboratory")
         if laboratory:
@@ -151,43 +150,54 @@ class FileTransfer:
         self._default_rmt_mode = ModuleConf.RMT_MODES.get(Config().get_config('pt').get('rmt_mode', 'copy'),
                                                           RmtMode.COPY)
 
-    @staticmethod
-    def __transfer_command(file_item, target_file, rmt_mode):
+    def __transfer_command(self, file_item, target_file, rmt_mode):
         """
-        使用系统命令处理单个文件
+        使用系统命令处理单个文件，由转移执行器按目的设备调度执行
         :param file_item: 文件路径
         :param target_file: 目标文件路径
         :param rmt_mode: RmtMode转移方式
         """
-        with lock:
-            if rmt_mode == RmtMode.LINK:
-                # 更链接
-                retcode, retmsg = SystemUtils.link(file_item, target_file)
-            elif rmt_mode == RmtMode.SOFTLINK:
-                # 软链接
-                retcode, retmsg = SystemUtils.softlink(file_item, target_file)
-            elif rmt_mode == RmtMode.MOVE:
-                # 移动
-                retcode, retmsg = SystemUtils.move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONE:
-                # Rclone移动
-                retcode, retmsg = SystemUtils.rclone_move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONECOPY:
-                # Rclone复制
-                retcode, retmsg = SystemUtils.rclone_copy(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIO:
-                # Minio移动
-                retcode, retmsg = SystemUtils.minio_move(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIOCOPY:
-                # Minio复制
-                retcode, retmsg = SystemUtils.minio_copy(file_item, target_file)
-            else:
-                # 复制
-                retcode, retmsg = SystemUtils.copy(file_item, target_file)
+        retcode, retmsg = self.transferhelper.execute(func=self.__run_command,
+                                                      file_item=file_item,
+                                                      target_file=target_file,
+                                                      rmt_mode=rmt_mode)
         if retcode != 0:
             log.error("【Rmt】%s" % retmsg)
         return retcode
 
+    @staticmethod
+    def __run_command(file_item, target_file, rmt_mode):
+        """
+        按转移方式执行系统命令
+        :param file_item: 文件路径
+        :param target_file: 目标文件路径
+        :param rmt_mode: RmtMode转移方式
+        """
+        if rmt_mode == RmtMode.LINK:
+            # 更链接
+            return SystemUtils.link(file_item, target_file)
+        elif rmt_mode == RmtMode.SOFTLINK:
+            # 软链接
+            return SystemUtils.softlink(file_item, target_file)
+        elif rmt_mode == RmtMode.MOVE:
+            # 移动
+            return SystemUtils.move(file_item, target_file)
+        elif rmt_mode == RmtMode.RCLONE:
+            # Rclone移动
+            return SystemUtils.rclone_move(file_item, target_file)
+        elif rmt_mode == RmtMode.RCLONECOPY:
+            # Rclone复制
+            return SystemUtils.rclone_copy(file_item, target_file)
+        elif rmt_mode == RmtMode.MINIO:
+            # Minio移动
+            return SystemUtils.minio_move(file_item, target_file)
+        elif rmt_mode == RmtMode.MINIOCOPY:
+            # Minio复制
+            return SystemUtils.minio_copy(file_item, target_file)
+        else:
+            # 复制
+            return SystemUtils.copy(file_item, target_file)
+
     def __transfer_other_files(self, org_name, new_name, rmt_mode, over_flag):
         """
         根据文件名转移其他相关文件
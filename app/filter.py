@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 import log
 from app.conf import ModuleConf
@@ -8,6 +9,85 @@ from app.utils import StringUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType
 
+# 促销规则对应的显示文本
+FREE_TEXTS = {
+    "1.0 1.0": "普通",
+    "1.0 0.0": "免费",
+    "2.0 0.0": "2X免费"
+}
+
+
+@lru_cache(maxsize=512)
+def _compile_filter(pattern):
+    """
+    预编译过滤条件使用的正则，忽略大小写
+    """
+    return re.compile(r"%s" % pattern, re.I)
+
+
+def _compile_rule_pattern(pattern):
+    """
+    预编译过滤规则中的包含、排除项，编译失败时保留异常，在使用时按原有顺序抛出
+    :return: 原始文本, 编译后的正则, 编译异常
+    """
+    try:
+        return pattern, re.compile(r'%s' % pattern.strip(), re.IGNORECASE), None
+    except re.error as err:
+        return pattern, None, err
+
+
+def _search_rule_pattern(compiled, text):
+    pattern, regex, err = compiled
+    if err:
+        raise err
+    return regex.search(text)
+
+
+def _parse_size_limit(sizes):
+    """
+    解析大小限制，返回 最小GB, 最大GB
+    """
+    if sizes.find(',') != -1:
+        sizes = sizes.split(',')
+        begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+        end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+    else:
+        begin_size = 0
+        end_size = int(sizes.strip()) if sizes.isdigit() else 0
+    return begin_size, end_size
+
+
+def _compile_rule(rule_info):
+    """
+    将一条过滤规则编译为不可变的元组：
+    规则信息, 命中优先值, 包含项, 排除项, 排除项合并预筛选正则, 大小限制, 促销限制
+    """
+    includes = tuple(_compile_rule_pattern(include) for include in rule_info.get("include") if include)
+    excludes = tuple(_compile_rule_pattern(exclude) for exclude in rule_info.get("exclude") if exclude)
+    # 排除项全部命中时才排除，先用合并的正则判断是否有任意一项命中，都未命中时不再逐项匹配
+    exclude_re = None
+    if len(excludes) > 1 \
+            and not any(err or re.search(r"\\\d|\(\?P=|\(\?[a-zA-Z]", pattern) for pattern, _, err in excludes):
+        try:
+            exclude_re = re.compile("|".join(f"(?:{pattern.strip()})" for pattern, _, _ in excludes), re.IGNORECASE)
+        except re.error:
+            exclude_re = None
+    sizes = rule_info.get("size")
+    free = rule_info.get("free")
+    if free:
+        try:
+            ul_factor, dl_factor = free.split()
+            free = (float(ul_factor), float(dl_factor), None)
+        except ValueError as err:
+            free = (None, None, err)
+    return (rule_info,
+            100 - int(rule_info.get("pri")),
+            includes,
+            excludes,
+            exclude_re,
+            _parse_size_limit(sizes) if sizes else None,
+            free or None)
+
 
 @singleton
 class Filter:
@@ -15,6 +95,8 @@ class Filter:
     dbhelper = None
     _groups = []
     _rules = []
+    # 预编译的过滤规则：规则组ID -> 规则组信息，默认规则组，规则组ID -> 规则信息列表，规则组ID -> 编译后的规则
+    _program = ({}, {}, {}, {})
 
     def __init__(self):
         self.init_config()
@@ -24,12 +106,14 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.get_filter_group()
         self._rules = self.get_filter_rule()
+        self.build_program()
 
-    def get_rule_groups(self, groupid=None, default=False):
+    def build_program(self):
         """
-        获取所有规则组
+        将规则组及规则预编译，规则变化后需重新调用
         """
-        ret_groups = []
+        groups = {}
+        default_group = {}
         for group in self._groups:
             group_info = {
                 "id": group.ID,
@@ -37,13 +121,43 @@ class Filter:
                 "default": group.IS_DEFAULT,
                 "note": group.NOTE
             }
-            if (groupid and str(groupid) == str(group.ID)) \
-                    or (default and group.IS_DEFAULT == "Y"):
-                return group_info
-            ret_groups.append(group_info)
-        if groupid or default:
-            return {}
-        return ret_groups
+            groups[str(group.ID)] = group_info
+            if not default_group and group.IS_DEFAULT == "Y":
+                default_group = group_info
+        rule_infos = {}
+        for rule in self._rules:
+            rule_infos.setdefault(str(rule.GROUP_ID), []).append({
+                "id": rule.ID,
+                "group": rule.GROUP_ID,
+                "name": rule.ROLE_NAME,
+                "pri": rule.PRIORITY or 0,
+                "include": rule.INCLUDE.split("\n") if rule.INCLUDE else [],
+                "exclude": rule.EXCLUDE.split("\n") if rule.EXCLUDE else [],
+                "size": rule.SIZE_LIMIT,
+                "free": rule.NOTE,
+                "free_text": FREE_TEXTS.get(rule.NOTE, "全部") if rule.NOTE else ""
+            })
+        programs = {}
+        for groupid, infos in rule_infos.items():
+            rules = []
+            for rule_info in infos:
+                try:
+                    rules.append(_compile_rule(rule_info))
+                except Exception as err:
+                    log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{rule_info}")
+            programs[groupid] = tuple(rules)
+        self._program = (groups, default_group, rule_infos, programs)
+
+    def get_rule_groups(self, groupid=None, default=False):
+        """
+        获取所有规则组
+        """
+        groups, default_group, _, _ = self._program
+        if groupid:
+            return dict(groups.get(str(groupid)) or {})
+        if default:
+            return dict(default_group)
+        return [dict(group_info) for group_info in groups.values()]
 
     def get_rule_infos(self):
         """
@@ -60,26 +174,9 @@ class Filter:
         """
         if not groupid:
             return []
-        ret_rules = []
-        for rule in self._rules:
-            rule_info = {
-                "id": rule.ID,
-                "group": rule.GROUP_ID,
-                "name": rule.ROLE_NAME,
-                "pri": rule.PRIORITY or 0,
-                "include": rule.INCLUDE.split("\n") if rule.INCLUDE else [],
-                "exclude": rule.EXCLUDE.split("\n") if rule.EXCLUDE else [],
-                "size": rule.SIZE_LIMIT,
-                "free": rule.NOTE,
-                "free_text": {
-                    "1.0 1.0": "普通",
-                    "1.0 0.0": "免费",
-                    "2.0 0.0": "2X免费"
-                }.get(rule.NOTE, "全部") if rule.NOTE else ""
-            }
-            if str(rule.GROUP_ID) == str(groupid) \
-                    and (not ruleid or int(ruleid) == rule.ID):
-                ret_rules.append(rule_info)
+        _, _, rule_infos, _ = self._program
+        ret_rules = [dict(rule_info) for rule_info in rule_infos.get(str(groupid)) or []
+                     if not ruleid or int(ruleid) == rule_info.get("id")]
         if ruleid:
             return ret_rules[0] if ret_rules else {}
         return ret_rules
@@ -100,104 +197,91 @@ class Filter:
         :param rulegroup: 规则组ID
         :return: 是否匹配，匹配的优先值，规则名称，值越大越优先
         """
-        if not meta_info:
-            return False, 0, ""
+        return self.evaluate([meta_info], rulegroup=rulegroup)[0]
+
+    def evaluate(self, meta_infos, rulegroup=None):
+        """
+        使用同一规则组批量检查种子是否匹配过滤规则
+        :param meta_infos: 识别的信息列表
+        :param rulegroup: 规则组ID
+        :return: 与meta_infos顺序一致的列表，每项为 是否匹配，匹配的优先值，规则名称
+        """
         # 为-1时不使用过滤规则
         if rulegroup and int(rulegroup) == -1:
-            return True, 0, "不过滤"
+            return [(True, 0, "不过滤") if meta_info else (False, 0, "") for meta_info in meta_infos]
+        groups, default_group, _, programs = self._program
+        # 过滤规则组
+        if not rulegroup:
+            group_info = default_group
+            if not group_info:
+                return [(True, 0, "未配置过滤规则") if meta_info else (False, 0, "") for meta_info in meta_infos]
+        else:
+            group_info = groups.get(str(rulegroup)) or {}
+        rules = programs.get(str(group_info.get("id"))) or ()
+        group_name = group_info.get("name")
+        return [self.__run_rules(meta_info, rules, group_name) if meta_info else (False, 0, "")
+                for meta_info in meta_infos]
+
+    @staticmethod
+    def __run_rules(meta_info, rules, group_name):
+        """
+        按优先级依次匹配规则组内预编译的规则，命中任一规则即匹配
+        """
         # 过滤使用的文本
         title = meta_info.rev_string
         if meta_info.subtitle:
             title = f"{title} {meta_info.subtitle}"
-        # 过滤规则组
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置过滤规则"
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
         # 命中优先级
         order_seq = 0
         # 当前规则组是否命中
         group_match = True
-        for filter_info in filters:
+        for rule_info, rule_order, includes, excludes, exclude_re, sizes, free in rules:
             try:
                 # 当前规则是否命中
                 rule_match = True
                 # 命中规则的序号
-                order_seq = 100 - int(filter_info.get('pri'))
+                order_seq = rule_order
                 # 必须包括的项
-                includes = filter_info.get('include')
-                if includes and rule_match:
-                    include_flag = True
-                    for include in includes:
-                        if not include:
-                            continue
-                        if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                            include_flag = False
-                            break
-                    if not include_flag:
-                        rule_match = False
-
-                # 不能包含的项
-                excludes = filter_info.get('exclude')
-                if excludes and rule_match:
-                    exclude_flag = False
-                    exclude_count = 0
-                    for exclude in excludes:
-                        if not exclude:
-                            continue
-                        exclude_count += 1
-                        if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
-                            exclude_flag = True
-                    if exclude_count > 0 and not exclude_flag:
+                for include in includes:
+                    if not _search_rule_pattern(include, title):
                         rule_match = False
+                        break
+                # 不能包含的项，全部命中时不匹配；逐项匹配时每一项都要检查，有错误的项会使该规则被跳过
+                if excludes and rule_match \
+                        and (exclude_re is None or exclude_re.search(title)) \
+                        and all([_search_rule_pattern(exclude, title) for exclude in excludes]):
+                    rule_match = False
                 # 大小
-                sizes = filter_info.get('size')
                 if sizes and rule_match and meta_info.size:
                     meta_info.size = StringUtils.num_filesize(meta_info.size)
-                    if sizes.find(',') != -1:
-                        sizes = sizes.split(',')
-                        if sizes[0].isdigit():
-                            begin_size = int(sizes[0].strip())
-                        else:
-                            begin_size = 0
-                        if sizes[1].isdigit():
-                            end_size = int(sizes[1].strip())
-                        else:
-                            end_size = 0
-                    else:
-                        begin_size = 0
-                        if sizes.isdigit():
-                            end_size = int(sizes.strip())
-                        else:
-                            end_size = 0
+                    begin_size, end_size = sizes
                     if meta_info.type == MediaType.MOVIE:
                         if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
                             rule_match = False
                     else:
                         if meta_info.total_episodes \
-                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
+                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(
+                                    meta_info.total_episodes) <= end_size * 1024 ** 3:
                             rule_match = False
-
                 # 促销
-                free = filter_info.get("free")
-                if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                    ul_factor, dl_factor = free.split()
-                    if float(ul_factor) > meta_info.upload_volume_factor \
-                            or float(dl_factor) < meta_info.download_volume_factor:
+                if free and meta_info.upload_volume_factor is not None \
+                        and meta_info.download_volume_factor is not None:
+                    ul_factor, dl_factor, err = free
+                    if err:
+                        raise err
+                    if ul_factor > meta_info.upload_volume_factor \
+                            or dl_factor < meta_info.download_volume_factor:
                         rule_match = False
 
                 if rule_match:
-                    return True, order_seq, rulegroup.get("name")
+                    return True, order_seq, group_name
                 else:
                     group_match = False
             except Exception as err:
-                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{filter_info}")
+                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{rule_info}")
         if not group_match:
-            return False, 0, rulegroup.get("name")
-        return True, order_seq, rulegroup.get("name")
+            return False, 0, group_name
+        return True, order_seq, group_name
 
     def is_rule_free(self, rulegroup=None):
         """
@@ -264,14 +348,14 @@ class Filter:
             restype_re = ModuleConf.TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))
             if not meta_info.get_edtion_string():
                 return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
-            if restype_re and not re.search(r"%s" % restype_re, meta_info.get_edtion_string(), re.I):
+            if restype_re and not _compile_filter(restype_re).search(meta_info.get_edtion_string()):
                 return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
         # 过滤分辨率
         if filter_args.get("pix"):
             pix_re = ModuleConf.TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))
             if not meta_info.resource_pix:
                 return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
-            if pix_re and not re.search(r"%s" % pix_re, meta_info.resource_pix, re.I):
+            if pix_re and not _compile_filter(pix_re).search(meta_info.resource_pix):
                 return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
         # 过滤制作组/字幕组
         if filter_args.get("team"):
@@ -284,7 +368,7 @@ class Filter:
                     return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
                 else:
                     meta_info.resource_team = resource_team
-            elif not re.search(r"%s" % team, meta_info.resource_team, re.I):
+            elif not _compile_filter(team).search(meta_info.resource_team):
                 return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
         # 过滤促销
         if filter_args.get("sp_state"):
@@ -296,17 +380,17 @@ class Filter:
         # 过滤包含
         if filter_args.get("include"):
             include = filter_args.get("include")
-            if not re.search(r"%s" % include, text, re.I):
+            if not _compile_filter(include).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合包含 {include} 要求"
         # 过滤排除
         if filter_args.get("exclude"):
             exclude = filter_args.get("exclude")
-            if re.search(r"%s" % exclude, text, re.I):
+            if _compile_filter(exclude).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合排除 {exclude} 要求"
         # 过滤关键字
         if filter_args.get("key"):
             key = filter_args.get("key")
-            if not re.search(r"%s" % key, text, re.I):
+            if not _compile_filter(key).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合 {key} 要求"
         # 过滤过滤规则，-1表示不使用过滤规则，空则使用默认过滤规则
         if filter_args.get("rule"):
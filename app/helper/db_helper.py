@@ -2,17 +2,32 @@ import datetime
 import os.path
 import time
 import json
+import threading
+from contextlib import contextmanager
 from enum import Enum
 from sqlalchemy import cast, func, and_, case
 
 from app.db import MainDb, DbPersist
 from app.db.models import *
-from app.utils import StringUtils
+from app.utils import StringUtils, SeenIndex
 from app.utils.types import MediaType, RmtMode
 
+# 当前线程批量收集中的索引器统计
+_IndexerStatisticsBatch = threading.local()
+
 
 class DbHelper:
     _db = MainDb()
+    # 刷流已处理种子下载链接索引
+    _brush_enclosure_index = SeenIndex(
+        loader=lambda: [item.ENCLOSURE for item in MainDb().query(SITEBRUSHTORRENTS.ENCLOSURE).yield_per(10000)]
+    )
+
+    def unit_of_work(self):
+        """
+        事务单元，单元内的所有写入合并为一次提交
+        """
+        return self._db.unit_of_work()
 
     @DbPersist(_db)
     def insert_search_results(self, media_items: list, title=None, ident_flag=True):
@@ -30,7 +45,7 @@ class DbHelper:
             else:
                 mtype = "ANI"
             data_list.append(
-                SEARCHRESULTINFO(
+                dict(
                     TORRENT_NAME=media_item.org_string,
                     ENCLOSURE=media_item.enclosure,
                     DESCRIPTION=media_item.description,
@@ -63,7 +78,7 @@ class DbHelper:
                     DOWNLOAD_VOLUME_FACTOR=media_item.download_volume_factor,
                     NOTE=media_item.labels
                 ))
-        self._db.insert(data_list)
+        self._db.bulk_insert(SEARCHRESULTINFO, data_list)
 
     def get_search_result_by_id(self, dl_id):
         """
@@ -1677,11 +1692,16 @@ class DbHelper:
                 }
             )
 
-    @DbPersist(_db)
     def delete_brushtask(self, brush_id):
         """
         删除刷流任务
         """
+        ret = self.__delete_brushtask(brush_id)
+        self._brush_enclosure_index.invalidate()
+        return ret
+
+    @DbPersist(_db)
+    def __delete_brushtask(self, brush_id):
         self._db.query(SITEBRUSHTASK).filter(SITEBRUSHTASK.ID == int(brush_id)).delete()
         self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id).delete()
 
@@ -1778,11 +1798,18 @@ class DbHelper:
             "DOWNLOAD_SIZE": int(download_size) + delete_dlsize,
         })
 
-    @DbPersist(_db)
     def insert_brushtask_torrent(self, brush_id, title, enclosure, downloader, download_id, size):
         """
         增加刷流下载的种子信息
         """
+        ret = self.__insert_brushtask_torrent(brush_id, title, enclosure, downloader, download_id, size)
+        if ret and brush_id:
+            # 提交后才加入索引，事务单元回滚时索引中不残留
+            self._db.after_commit(lambda: self._brush_enclosure_index.add(enclosure))
+        return ret
+
+    @DbPersist(_db)
+    def __insert_brushtask_torrent(self, brush_id, title, enclosure, downloader, download_id, size):
         if not brush_id:
             return
         if self.is_brushtask_torrent_exists(brush_id, title, enclosure):
@@ -1820,6 +1847,16 @@ class DbHelper:
             return None
         return self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.ENCLOSURE == enclosure).first()
 
+    def is_brushtask_torrent_handled(self, enclosure):
+        """
+        根据URL判断刷流种子是否已处理过，通过内存索引排除未处理的链接，命中时再查询数据库确认
+        """
+        if not enclosure:
+            return False
+        if not self._brush_enclosure_index.contains(enclosure):
+            return False
+        return self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.ENCLOSURE == enclosure).count() > 0
+
     def is_brushtask_torrent_exists(self, brush_id, title, enclosure):
         """
         查询刷流任务种子是否已存在
@@ -1850,11 +1887,16 @@ class DbHelper:
                 }
             )
 
-    @DbPersist(_db)
     def delete_brushtask_torrent(self, brush_id, download_id):
         """
         删除刷流种子记录
         """
+        ret = self.__delete_brushtask_torrent(brush_id, download_id)
+        self._brush_enclosure_index.invalidate()
+        return ret
+
+    @DbPersist(_db)
+    def __delete_brushtask_torrent(self, brush_id, download_id):
         if not download_id or not brush_id:
             return
         self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id,
@@ -2633,22 +2675,53 @@ class DbHelper:
         """
         return self._db.query(DOWNLOADER).all()
 
-    @DbPersist(_db)
     def insert_indexer_statistics(self,
                                   indexer,
                                   itype,
                                   seconds,
                                   result):
         """
-        插入索引器统计
+        插入索引器统计，批量收集期间先缓存，收集结束时统一写入
+        """
+        item = {
+            "INDEXER": indexer,
+            "TYPE": itype,
+            "SECONDS": seconds,
+            "RESULT": result,
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        }
+        items = getattr(_IndexerStatisticsBatch, "items", None)
+        if items is not None:
+            items.append(item)
+            return True
+        return self.__insert_indexer_statistics([item])
+
+    @contextmanager
+    def indexer_statistics_batch(self, items=None):
         """
-        self._db.insert(INDEXERSTATISTICS(
-            INDEXER=indexer,
-            TYPE=itype,
-            SECONDS=seconds,
-            RESULT=result,
-            DATE=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
-        ))
+        批量收集当前线程的索引器统计，在最外层收集结束时一次性写入
+        :param items: 其它线程返回的收集列表，搜索线程加入该收集，由创建该列表的线程写入
+        :return: 收集列表，传给搜索线程使用
+        """
+        current = getattr(_IndexerStatisticsBatch, "items", None)
+        if current is not None:
+            yield current
+            return
+        _IndexerStatisticsBatch.items = items if items is not None else []
+        try:
+            yield _IndexerStatisticsBatch.items
+        finally:
+            collected = _IndexerStatisticsBatch.items
+            _IndexerStatisticsBatch.items = None
+            if items is None and collected:
+                self.__insert_indexer_statistics(collected)
+
+    @DbPersist(_db)
+    def __insert_indexer_statistics(self, items):
+        """
+        批量写入索引器统计
+        """
+        self._db.bulk_insert(INDEXERSTATISTICS, items)
 
     def get_indexer_statistics(self):
         """
@@ -0,0 +1,279 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from PIL import Image
+
+import log
+from app.utils import RequestUtils, ExceptionUtils, SingleFlight
+from app.utils.commons import singleton
+from config import Config
+
+# 预生成的缩略图宽度：海报卡片、背景图
+IMAGE_WIDTHS = [185, 342, 500, 780, 1280]
+# 默认缓存大小（MB）
+DEFAULT_CACHE_SIZE = 512
+
+
+@singleton
+class ImageCacheHelper(object):
+    """
+    图片磁盘缓存：按URL摘要保存在配置目录下，原图和各尺寸的缩略图分别保存，
+    总大小超出限制时淘汰最久未访问的文件，重启后缓存仍然有效
+    """
+    _cache_path = None
+    _maxbytes = 0
+
+    def __init__(self):
+        self._lock = Lock()
+        # 文件名 -> 大小，按访问顺序排列
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._flight = SingleFlight()
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ImagePrefetch")
+        self.init_config()
+
+    def init_config(self):
+        self._cache_path = os.path.join(Config().get_config_path(), "cache", "images")
+        try:
+            cache_size = int(Config().get_config('app').get('image_cache_size') or DEFAULT_CACHE_SIZE)
+        except (TypeError, ValueError):
+            cache_size = DEFAULT_CACHE_SIZE
+        self._maxbytes = cache_size * 1024 * 1024
+        with self._lock:
+            self._files = OrderedDict()
+            self._bytes = 0
+            self._loaded = False
+
+    @staticmethod
+    def get_width(width):
+        """
+        将请求的宽度对齐到预设的缩略图宽度，不在范围内时返回原图
+        """
+        try:
+            width = int(width or 0)
+        except (TypeError, ValueError):
+            return 0
+        if width <= 0:
+            return 0
+        for image_width in IMAGE_WIDTHS:
+            if width <= image_width:
+                return image_width
+        return 0
+
+    @staticmethod
+    def get_etag(url, width=0):
+        return hashlib.sha256(f"{url}|{width}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_mimetype(path):
+        with open(path, "rb") as f:
+            head = f.read(12)
+        if head.startswith(b"\x89PNG"):
+            return "image/png"
+        if head.startswith(b"GIF8"):
+            return "image/gif"
+        if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+            return "image/webp"
+        return "image/jpeg"
+
+    def __get_file_name(self, url, width=0):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return f"{digest[:2]}/{digest}_{width}" if width else f"{digest[:2]}/{digest}"
+
+    def __load(self):
+        """
+        扫描缓存目录，按最后访问时间建立淘汰顺序
+        """
+        files = []
+        if os.path.exists(self._cache_path):
+            for root, _, names in os.walk(self._cache_path):
+                for name in names:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, os.path.relpath(path, self._cache_path).replace(os.sep, "/"),
+                                  stat.st_size))
+        files.sort()
+        self._files = OrderedDict((name, size) for _, name, size in files)
+        self._bytes = sum(self._files.values())
+        self._loaded = True
+        self.__evict()
+
+    def __evict(self):
+        while self._bytes > self._maxbytes and self._files:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(os.path.join(self._cache_path, name))
+            except OSError:
+                pass
+
+    def __lookup(self, name):
+        """
+        查询缓存文件，命中时更新访问时间
+        """
+        path = os.path.join(self._cache_path, name)
+        with self._lock:
+            if not self._loaded:
+                self.__load()
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+        if not os.path.exists(path):
+            with self._lock:
+                self._bytes -= self._files.pop(name, 0)
+            return None
+        try:
+            # 访问时间记录在修改时间上，重启后用于恢复淘汰顺序
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def __save(self, name, content):
+        path = os.path.join(self._cache_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 每次写入使用独立的临时文件，写完后原子替换
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.__add(name, len(content))
+        return path
+
+    def __link(self, name, source):
+        """
+        原图不大于缩略图宽度时，将原图硬链接为该宽度的缓存文件，不支持硬链接时复制
+        """
+        path = os.path.join(self._cache_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 取得唯一的临时文件名后在该位置创建硬链接，再原子替换
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        os.remove(temp_path)
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            with open(source, "rb") as f:
+                return self.__save(name, f.read())
+        os.replace(temp_path, path)
+        # 硬链接按各自的大小计入，淘汰时分别删除
+        self.__add(name, os.path.getsize(path))
+        return path
+
+    def __add(self, name, size):
+        with self._lock:
+            if not self._loaded:
+                self.__load()
+            self._bytes += size - self._files.pop(name, 0)
+            self._files[name] = size
+            self.__evict()
+
+    @staticmethod
+    def __download(url):
+        if "douban" in url:
+            res = RequestUtils(referer="https://movie.douban.com").get_res(url)
+        else:
+            res = RequestUtils().get_res(url)
+        if res is None or res.status_code != 200 or not res.content:
+            return None
+        return res.content
+
+    @staticmethod
+    def __resize(content, width):
+        """
+        按宽度等比缩小图片，原图不大于该宽度时返回None
+        """
+        image = Image.open(BytesIO(content))
+        if image.width <= width:
+            return None
+        height = max(int(image.height * width / image.width), 1)
+        image = image.convert("RGB").resize((width, height), resample=Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=85, optimize=True)
+        return output.getvalue()
+
+    def __fetch(self, url, width=0):
+        """
+        下载原图并生成缩略图，返回缓存文件路径
+        """
+        name = self.__get_file_name(url)
+        path = self.__lookup(name)
+        if not path:
+            content = self.__download(url)
+            if not content:
+                return None
+            path = self.__save(name, content)
+        if not width:
+            return path
+        with open(path, "rb") as f:
+            content = f.read()
+        try:
+            resized = self.__resize(content, width)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            resized = None
+        if resized:
+            return self.__save(self.__get_file_name(url, width), resized)
+        # 原图比缩略图小或无法解析时直接使用原图，记录为该宽度的缓存，之后查询直接命中
+        return self.__link(self.__get_file_name(url, width), path)
+
+    def get_image(self, url, width=0):
+        """
+        获取图片的缓存文件，没有缓存时下载
+        :param url: 图片地址
+        :param width: 缩略图宽度，0为原图
+        :return: 缓存文件路径，下载失败时返回None
+        """
+        if not url:
+            return None
+        width = self.get_width(width)
+        path = self.__lookup(self.__get_file_name(url, width))
+        if path:
+            return path
+        path, _ = self._flight.do((url, width), self.__fetch, url, width)
+        return path
+
+    def prefetch(self, urls, width=0):
+        """
+        后台预先下载图片
+        """
+        for url in set(urls or []):
+            if url:
+                self._prefetch_executor.submit(self.__prefetch, url, width)
+
+    def __prefetch(self, url, width):
+        try:
+            self.get_image(url, width)
+        except Exception as err:
+            log.debug(f"【Web】预加载图片失败：{url} - {str(err)}")
+
+    def get_statistics(self):
+        """
+        查询缓存统计信息
+        """
+        with self._lock:
+            if not self._loaded:
+                self.__load()
+            return {
+                "count": len(self._files),
+                "bytes": self._bytes,
+                "maxbytes": self._maxbytes,
+                "time": int(time.time())
+            }
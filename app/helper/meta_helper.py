@@ -5,14 +5,267 @@ import time
 from enum import Enum
 from threading import RLock
 
+import log
+from app.db import MediaDb
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
+from app.utils.types import MediaType
 from config import Config
 
 lock = RLock()
 
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 读取缓存时刷新过期时间的最小间隔，避免每次读取都写库
+EXPIRE_REFRESH_INTERVAL = 24 * 3600
+# 迁移旧缓存文件时每批插入的条数
+MIGRATE_BATCH_SIZE = 1000
+
+
+class _PickleMetaStore(object):
+    """
+    TMDB缓存全部保存在内存中，定时整体序列化到tmdb.dat文件
+    """
+
+    def __init__(self, meta_path, tmdb_cache_expire):
+        self._meta_path = meta_path
+        self._tmdb_cache_expire = tmdb_cache_expire
+        self._meta_data = self.load_meta_data(meta_path)
+
+    @staticmethod
+    def load_meta_data(path):
+        """
+        从文件中加载缓存
+        """
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                return data
+            return {}
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return {}
+
+    def clear(self):
+        self._meta_data = {}
+        if os.path.exists(self._meta_path):
+            os.remove(self._meta_path)
+
+    def get(self, key):
+        info: dict = self._meta_data.get(key)
+        if info:
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+            if not expire or int(time.time()) < expire:
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+            elif expire and self._tmdb_cache_expire:
+                self.delete(key)
+        return info
+
+    def dump(self, search, begin_pos, num):
+        search_metas = [(k, v) for k, v in self._meta_data.items()
+                        if search.lower() in k.lower() and v.get("id") != 0]
+        return len(search_metas), search_metas[begin_pos: begin_pos + num]
+
+    def delete(self, key):
+        return self._meta_data.pop(key, None)
+
+    def delete_by_tmdbid(self, tmdbid):
+        for key in list(self._meta_data):
+            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
+                self._meta_data.pop(key)
+
+    def delete_unknown(self):
+        for key in list(self._meta_data):
+            if str(self._meta_data.get(key, {}).get("id")) == '0':
+                self._meta_data.pop(key)
+
+    def modify_title(self, key, title):
+        if self._meta_data.get(key):
+            self._meta_data[key]['title'] = title
+            self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+        return self._meta_data.get(key)
+
+    def update(self, meta_data):
+        for key, item in meta_data.items():
+            if not self._meta_data.get(key):
+                item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self._meta_data[key] = item
+
+    def save(self, force=False):
+        meta_data = self.load_meta_data(self._meta_path)
+        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
+
+        if not force \
+                and not self._random_sample(new_meta_data) \
+                and meta_data.keys() == new_meta_data.keys():
+            return
+
+        with open(self._meta_path, 'wb') as f:
+            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
+
+    def _random_sample(self, new_meta_data):
+        """
+        采样分析是否需要保存
+        """
+        ret = False
+        if len(new_meta_data) < 25:
+            keys = list(new_meta_data.keys())
+            for k in keys:
+                info = new_meta_data.get(k)
+                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+                if not expire:
+                    ret = True
+                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                elif int(time.time()) >= expire:
+                    ret = True
+                    if self._tmdb_cache_expire:
+                        new_meta_data.pop(k)
+        else:
+            count = 0
+            keys = random.sample(list(new_meta_data.keys()), 25)
+            for k in keys:
+                info = new_meta_data.get(k)
+                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+                if not expire:
+                    ret = True
+                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                elif int(time.time()) >= expire:
+                    ret = True
+                    if self._tmdb_cache_expire:
+                        new_meta_data.pop(k)
+                        count += 1
+            if count >= 5:
+                ret |= self._random_sample(new_meta_data)
+        return ret
+
+
+class _DbMetaStore(object):
+    """
+    TMDB缓存保存在media.db的TMDB_CACHE表中，按KEY、TMDBID、过期时间建立索引，逐条增量写入，按需读取；
+    未识别（id为0）的记录只保存在内存中，与原有行为一致不做持久化
+    """
+
+    def __init__(self, meta_path, tmdb_cache_expire):
+        self._meta_path = meta_path
+        self._tmdb_cache_expire = tmdb_cache_expire
+        self._mediadb = MediaDb()
+        self._unknown_data = {}
+        self.__migrate(meta_path)
+
+    def __migrate(self, meta_path):
+        """
+        将旧的tmdb.dat缓存文件导入数据库，导入后重命名为tmdb.dat.bak
+        """
+        if not os.path.exists(meta_path):
+            return
+        meta_data = _PickleMetaStore.load_meta_data(meta_path)
+        log.info(f"【Meta】开始迁移TMDB缓存文件 {meta_path}，共 {len(meta_data)} 条...")
+        items = [self.__to_row(key, info) for key, info in meta_data.items() if str(info.get("id")) != '0']
+        for i in range(0, len(items), MIGRATE_BATCH_SIZE):
+            if not self._mediadb.insert_tmdb_cache(items[i: i + MIGRATE_BATCH_SIZE]):
+                log.error("【Meta】TMDB缓存迁移失败，下次启动时将重新迁移")
+                return
+        try:
+            os.replace(meta_path, f"{meta_path}.bak")
+        except OSError as e:
+            ExceptionUtils.exception_traceback(e)
+        log.info("【Meta】TMDB缓存迁移完成")
+
+    @staticmethod
+    def __to_row(key, info):
+        media_type = info.get("type")
+        return {
+            "KEY": key,
+            "TMDBID": str(info.get("id")),
+            "TYPE": media_type.value if isinstance(media_type, Enum) else media_type,
+            "TITLE": info.get("title"),
+            "YEAR": info.get("year"),
+            "POSTER_PATH": info.get("poster_path"),
+            "BACKDROP_PATH": info.get("backdrop_path"),
+            "EXPIRE_TIME": info.get(CACHE_EXPIRE_TIMESTAMP_STR) or int(time.time()) + EXPIRE_TIMESTAMP
+        }
+
+    @staticmethod
+    def __to_info(row):
+        if not row:
+            return None
+        tmdbid = row.TMDBID
+        media_type = row.TYPE
+        if media_type in [t.value for t in MediaType]:
+            media_type = MediaType(media_type)
+        return {
+            "id": int(tmdbid) if tmdbid and tmdbid.isdigit() else tmdbid,
+            "type": media_type,
+            "year": row.YEAR,
+            "title": row.TITLE,
+            "poster_path": row.POSTER_PATH,
+            "backdrop_path": row.BACKDROP_PATH,
+            CACHE_EXPIRE_TIMESTAMP_STR: row.EXPIRE_TIME
+        }
+
+    def clear(self):
+        self._unknown_data = {}
+        self._mediadb.clear_tmdb_cache()
+
+    def get(self, key):
+        info = self._unknown_data.get(key)
+        if info:
+            return info
+        info = self.__to_info(self._mediadb.get_tmdb_cache(key))
+        if info:
+            now = int(time.time())
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+            if not expire or now < expire:
+                if not expire or expire - now < EXPIRE_TIMESTAMP - EXPIRE_REFRESH_INTERVAL:
+                    info[CACHE_EXPIRE_TIMESTAMP_STR] = now + EXPIRE_TIMESTAMP
+                    self._mediadb.update_tmdb_cache(key, EXPIRE_TIME=now + EXPIRE_TIMESTAMP)
+            elif self._tmdb_cache_expire:
+                self.delete(key)
+        return info
+
+    def dump(self, search, begin_pos, num):
+        total_count, rows = self._mediadb.search_tmdb_cache(search=search, offset=begin_pos, limit=num)
+        return total_count, [(row.KEY, self.__to_info(row)) for row in rows]
+
+    def delete(self, key):
+        info = self._unknown_data.pop(key, None)
+        if info:
+            return info
+        info = self.__to_info(self._mediadb.get_tmdb_cache(key))
+        if info:
+            self._mediadb.delete_tmdb_cache(key=key)
+        return info
+
+    def delete_by_tmdbid(self, tmdbid):
+        self._mediadb.delete_tmdb_cache(tmdbid=tmdbid)
+
+    def delete_unknown(self):
+        self._unknown_data = {}
+
+    def modify_title(self, key, title):
+        if not self._mediadb.get_tmdb_cache(key):
+            return self._unknown_data.get(key)
+        self._mediadb.update_tmdb_cache(key, TITLE=title, EXPIRE_TIME=int(time.time()) + EXPIRE_TIMESTAMP)
+        return self.__to_info(self._mediadb.get_tmdb_cache(key))
+
+    def update(self, meta_data):
+        items = []
+        for key, item in meta_data.items():
+            if str(item.get("id")) == '0':
+                if not self._unknown_data.get(key):
+                    item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                    self._unknown_data[key] = item
+            else:
+                self._unknown_data.pop(key, None)
+                item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                items.append(self.__to_row(key, item))
+        self._mediadb.insert_tmdb_cache(items)
+
+    def save(self, force=False):
+        # 已逐条写入数据库，只需清理过期记录
+        if self._tmdb_cache_expire:
+            self._mediadb.delete_tmdb_cache(expire_time=int(time.time()))
 
 
 @singleton
@@ -25,10 +278,11 @@ class MetaHelper(object):
         "type": MediaType
     }
     """
-    _meta_data = {}
+    _store = None
 
     _meta_path = None
     _tmdb_cache_expire = False
+    _tmdb_cache_backend = None
 
     def __init__(self):
         self.init_config()
@@ -37,15 +291,28 @@ class MetaHelper(object):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
+            tmdb_cache_backend = laboratory.get("tmdb_cache_backend") or "db"
+        else:
+            tmdb_cache_backend = "db"
         self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        with lock:
+            if self._store and tmdb_cache_backend == self._tmdb_cache_backend:
+                self._store._tmdb_cache_expire = self._tmdb_cache_expire
+                return
+            if self._store:
+                self._store.save(force=True)
+            self._tmdb_cache_backend = tmdb_cache_backend
+            if tmdb_cache_backend == "pickle":
+                self._store = _PickleMetaStore(self._meta_path, self._tmdb_cache_expire)
+            else:
+                self._store = _DbMetaStore(self._meta_path, self._tmdb_cache_expire)
 
     def clear_meta_data(self):
         """
         清空所有TMDB缓存
         """
         with lock:
-            self._meta_data = {}
+            self._store.clear()
 
     def get_meta_data_path(self):
         """
@@ -58,15 +325,7 @@ class MetaHelper(object):
         根据KEY值获取缓存值
         """
         with lock:
-            info: dict = self._meta_data.get(key)
-            if info:
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire or int(time.time()) < expire:
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
-                elif expire and self._tmdb_cache_expire:
-                    self.delete_meta_data(key)
-            return info or {}
+            return self._store.get(key) or {}
 
     def dump_meta_data(self, search, page, num):
         """
@@ -82,16 +341,16 @@ class MetaHelper(object):
             begin_pos = (page - 1) * num
 
         with lock:
-            search_metas = [(k, {
-                "id": v.get("id"),
-                "title": v.get("title"),
-                "year": v.get("year"),
-                "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
-                "poster_path": v.get("poster_path"),
-                "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            total_count, metas = self._store.dump(search, begin_pos, num)
+        return total_count, [(k, {
+            "id": v.get("id"),
+            "title": v.get("title"),
+            "year": v.get("year"),
+            "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
+            "poster_path": v.get("poster_path"),
+            "backdrop_path": v.get("backdrop_path")
+        }, str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
+            for k, v in metas]
 
     def delete_meta_data(self, key):
         """
@@ -100,25 +359,21 @@ class MetaHelper(object):
         @return: 被删除的缓存内容
         """
         with lock:
-            return self._meta_data.pop(key, None)
+            return self._store.delete(key)
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空对应TMDBID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self._store.delete_by_tmdbid(tmdbid)
 
     def delete_unknown_meta(self):
         """
         清除未识别的缓存记录，以便重新搜索TMDB
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == '0':
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self._store.delete_unknown()
 
     def modify_meta_data(self, key, title):
         """
@@ -128,25 +383,7 @@ class MetaHelper(object):
         @return: 被修改后缓存内容
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
-
-    @staticmethod
-    def __load_meta_data(path):
-        """
-        从文件中加载缓存
-        """
-        try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            return {}
+            return self._store.modify_title(key, title)
 
     def update_meta_data(self, meta_data):
         """
@@ -155,66 +392,20 @@ class MetaHelper(object):
         if not meta_data:
             return
         with lock:
-            for key, item in meta_data.items():
-                if not self._meta_data.get(key):
-                    item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = item
+            self._store.update(meta_data)
 
     def save_meta_data(self, force=False):
         """
-        保存缓存数据到文件
-        """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
-
-    def _random_sample(self, new_meta_data):
-        """
-        采样分析是否需要保存
+        保存缓存数据
         """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(new_meta_data.keys(), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            self._store.save(force=force)
 
     def get_cache_title(self, key):
         """
         获取缓存的标题
         """
-        cache_media_info = self._meta_data.get(key)
+        cache_media_info = self.get_meta_data_by_key(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -223,7 +414,5 @@ class MetaHelper(object):
         """
         重新设置缓存标题
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            self._store.modify_title(key, cn_title)
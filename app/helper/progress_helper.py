@@ -1,3 +1,5 @@
+import copy
+import threading
 from enum import Enum
 
 from app.utils.commons import singleton
@@ -7,9 +9,13 @@ from app.utils.types import ProgressKey
 @singleton
 class ProgressHelper(object):
     _process_detail = {}
+    # 各进度的版本号，每次变化加一
+    _versions = {}
 
     def __init__(self):
         self._process_detail = {}
+        self._versions = {}
+        self._cond = threading.Condition()
 
     def init_config(self):
         pass
@@ -23,30 +29,58 @@ class ProgressHelper(object):
             "text": "请稍候..."
         }
 
+    def __notify(self, ptype):
+        """
+        进度变化，唤醒等待的订阅方
+        """
+        self._versions[ptype] = self._versions.get(ptype, 0) + 1
+        self._cond.notify_all()
+
     def start(self, ptype=ProgressKey.Search):
-        self.__reset(ptype)
         if isinstance(ptype, Enum):
             ptype = ptype.value
-        self._process_detail[ptype]['enable'] = True
+        with self._cond:
+            self.__reset(ptype)
+            self._process_detail[ptype]['enable'] = True
+            self.__notify(ptype)
 
     def end(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
-        if not self._process_detail.get(ptype):
-            return
-        self._process_detail[ptype]['enable'] = False
+        with self._cond:
+            if not self._process_detail.get(ptype):
+                return
+            self._process_detail[ptype]['enable'] = False
+            self.__notify(ptype)
 
     def update(self, value=None, text=None, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
-        if not self._process_detail.get(ptype, {}).get('enable'):
-            return
-        if value:
-            self._process_detail[ptype]['value'] = value
-        if text:
-            self._process_detail[ptype]['text'] = text
+        with self._cond:
+            if not self._process_detail.get(ptype, {}).get('enable'):
+                return
+            if value:
+                self._process_detail[ptype]['value'] = value
+            if text:
+                self._process_detail[ptype]['text'] = text
+            self.__notify(ptype)
 
     def get_process(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
         return self._process_detail.get(ptype)
+
+    def wait_process(self, ptype=ProgressKey.Search, version=None, timeout=None):
+        """
+        等待进度变化
+        :param ptype: 进度类型
+        :param version: 上次读取返回的版本号，为空时立即返回当前进度
+        :param timeout: 最长等待秒数
+        :return: 新的版本号、进度详情
+        """
+        if isinstance(ptype, Enum):
+            ptype = ptype.value
+        with self._cond:
+            if version is not None:
+                self._cond.wait_for(lambda: self._versions.get(ptype, 0) != version, timeout)
+            return self._versions.get(ptype, 0), copy.deepcopy(self._process_detail.get(ptype))
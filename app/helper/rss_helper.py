@@ -2,12 +2,16 @@ import xml.dom.minidom
 
 from app.db import MainDb, DbPersist
 from app.db.models import RSSTORRENTS
-from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils
+from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils, SeenIndex
 from config import Config
 
 
 class RssHelper:
     _db = MainDb()
+    # 已处理的RSS下载链接索引
+    _enclosure_index = SeenIndex(
+        loader=lambda: [item.ENCLOSURE for item in MainDb().query(RSSTORRENTS.ENCLOSURE).yield_per(10000)]
+    )
 
     @staticmethod
     def parse_rssxml(url, proxy=False):
@@ -96,11 +100,18 @@ class RssHelper:
                 ExceptionUtils.exception_traceback(e2)
         return ret_array
 
-    @DbPersist(_db)
     def insert_rss_torrents(self, media_info):
         """
         将RSS的记录插入数据库
         """
+        if self.__insert_rss_torrents(media_info):
+            # 提交后才加入索引，事务单元回滚时索引中不残留
+            self._db.after_commit(lambda: self._enclosure_index.add(media_info.enclosure))
+            return True
+        return False
+
+    @DbPersist(_db)
+    def __insert_rss_torrents(self, media_info):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=media_info.org_string,
@@ -114,14 +125,13 @@ class RssHelper:
 
     def is_rssd_by_enclosure(self, enclosure):
         """
-        查询RSS是否处理过，根据下载链接
+        查询RSS是否处理过，根据下载链接，通过内存索引排除未处理的链接，命中时再查询数据库确认
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
-            return True
-        else:
+        if not self._enclosure_index.contains(enclosure):
             return False
+        return self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0
 
     def is_rssd_by_simple(self, torrent_name, enclosure):
         """
@@ -135,31 +145,48 @@ class RssHelper:
             ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
         return True if ret > 0 else False
 
-    @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
         """
         将RSS的记录插入数据库
         """
+        if self.__simple_insert_rss_torrents(title, enclosure):
+            # 提交后才加入索引，事务单元回滚时索引中不残留
+            self._db.after_commit(lambda: self._enclosure_index.add(enclosure))
+            return True
+        return False
+
+    @DbPersist(_db)
+    def __simple_insert_rss_torrents(self, title, enclosure):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=title,
                 ENCLOSURE=enclosure
             ))
 
-    @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure=None):
         """
         删除RSS的记录
         """
+        ret = self.__simple_delete_rss_torrents(title, enclosure)
+        self._enclosure_index.invalidate()
+        return ret
+
+    @DbPersist(_db)
+    def __simple_delete_rss_torrents(self, title, enclosure=None):
         if enclosure:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title,
                                                RSSTORRENTS.ENCLOSURE == enclosure).delete()
         else:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title).delete()
 
-    @DbPersist(_db)
     def truncate_rss_history(self):
         """
         清空RSS历史记录
         """
+        ret = self.__truncate_rss_history()
+        self._enclosure_index.invalidate()
+        return ret
+
+    @DbPersist(_db)
+    def __truncate_rss_history(self):
         self._db.query(RSSTORRENTS).delete()
@@ -0,0 +1,137 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, BoundedSemaphore
+
+import log
+from app.conf.moduleconf import ModuleConf
+from app.helper.progress_helper import ProgressHelper
+from app.utils import StringUtils, ExceptionUtils
+from app.utils.commons import singleton
+from app.utils.types import RmtMode, ProgressKey
+from config import Config
+
+# 默认转移线程数
+DEFAULT_TRANSFER_WORKERS = 4
+# 默认单个设备同时转移的文件数
+DEFAULT_DEVICE_CONCURRENCY = 1
+
+
+@singleton
+class TransferHelper:
+    """
+    文件转移执行器，不同磁盘/存储的转移任务并发执行，同一磁盘上的转移任务按设备并发数限制排队执行
+    """
+    progress = None
+
+    _executor = None
+    _max_workers = DEFAULT_TRANSFER_WORKERS
+    _device_concurrency = DEFAULT_DEVICE_CONCURRENCY
+    # 设备号 -> 信号量
+    _device_semaphores = {}
+    _lock = Lock()
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self.progress = ProgressHelper()
+        media = Config().get_config('media') or {}
+        max_workers = self.__get_int(media.get('transfer_max_workers'), DEFAULT_TRANSFER_WORKERS)
+        device_concurrency = self.__get_int(media.get('transfer_device_concurrency'), DEFAULT_DEVICE_CONCURRENCY)
+        with self._lock:
+            if not self._executor or max_workers != self._max_workers:
+                if self._executor:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                    thread_name_prefix="FileTransfer")
+            self._max_workers = max_workers
+            if device_concurrency != self._device_concurrency:
+                # 正在执行的任务继续持有旧的信号量，新任务使用新的并发数
+                self._device_semaphores = {}
+            self._device_concurrency = device_concurrency
+
+    @staticmethod
+    def __get_int(value, default):
+        if isinstance(value, int) and value > 0:
+            return value
+        if isinstance(value, str) and value.isdigit() and int(value) > 0:
+            return int(value)
+        return default
+
+    @staticmethod
+    def get_device_key(target_file, rmt_mode):
+        """
+        计算转移目的所在的设备，远程存储按转移方式区分，本地路径取最近的已存在上级目录的设备号
+        :param target_file: 目标文件路径
+        :param rmt_mode: RmtMode转移方式
+        """
+        if rmt_mode in ModuleConf.REMOTE_RMT_MODES:
+            return rmt_mode.value
+        path = os.path.dirname(os.path.normpath(target_file))
+        while path:
+            try:
+                return os.stat(path).st_dev
+            except OSError:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        return None
+
+    def __get_device_semaphore(self, device_key):
+        with self._lock:
+            semaphore = self._device_semaphores.get(device_key)
+            if not semaphore:
+                semaphore = BoundedSemaphore(self._device_concurrency)
+                self._device_semaphores[device_key] = semaphore
+            return semaphore
+
+    def execute(self, func, file_item, target_file, rmt_mode):
+        """
+        提交一个转移任务并等待完成
+        :param func: 实际执行转移的函数，参数为(file_item, target_file, rmt_mode)，返回(retcode, retmsg)
+        :param file_item: 文件路径
+        :param target_file: 目标文件路径
+        :param rmt_mode: RmtMode转移方式
+        :return: retcode, retmsg
+        """
+        # 硬链接和软链接只修改元数据，不需要按设备排队
+        if rmt_mode in [RmtMode.LINK, RmtMode.SOFTLINK]:
+            return self.__submit(func, file_item, target_file, rmt_mode).result()
+        # 在调用线程中等待设备空闲，避免工作线程被同一设备的任务占满而阻塞其它设备
+        with self.__get_device_semaphore(self.get_device_key(target_file, rmt_mode)):
+            return self.__submit(func, file_item, target_file, rmt_mode).result()
+
+    def __submit(self, func, file_item, target_file, rmt_mode):
+        """
+        提交到当前线程池，与init_config替换线程池互斥，不会提交到已关闭的线程池
+        """
+        with self._lock:
+            return self._executor.submit(self.__run, func, file_item, target_file, rmt_mode)
+
+    def __run(self, func, file_item, target_file, rmt_mode):
+        file_size = 0
+        if rmt_mode not in [RmtMode.LINK, RmtMode.SOFTLINK]:
+            try:
+                if os.path.isfile(file_item):
+                    file_size = os.path.getsize(file_item)
+            except OSError:
+                pass
+        start_time = time.time()
+        try:
+            retcode, retmsg = func(file_item, target_file, rmt_mode)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            retcode, retmsg = -1, str(err)
+        seconds = time.time() - start_time
+        if retcode == 0 and file_size:
+            speed = file_size / seconds if seconds > 0 else file_size
+            text = "%s %s完成，大小 %s，耗时 %.1f 秒，速度 %s/s" % (os.path.basename(file_item),
+                                                           rmt_mode.value,
+                                                           StringUtils.str_filesize(file_size),
+                                                           seconds,
+                                                           StringUtils.str_filesize(speed))
+            log.debug("【Rmt】%s" % text)
+            self.progress.update(ptype=ProgressKey.FileTransfer, text=text)
+        return retcode, retmsg
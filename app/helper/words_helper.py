@@ -6,11 +6,27 @@ from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
 
 
+def _compile_pattern(pattern):
+    """
+    预编译识别词正则，编译失败时返回错误信息，由使用时按原有顺序报告
+    :return: 编译后的正则, 错误信息
+    """
+    try:
+        return re.compile(r'%s' % pattern), ""
+    except Exception as err:
+        ExceptionUtils.exception_traceback(err)
+        return None, str(err)
+
+
 @singleton
 class WordsHelper:
     dbhelper = None
     # 识别词
     words_info = []
+    # 识别词版本号，识别词变化时递增
+    version = 0
+    # 预编译的识别词规则及非正则屏蔽/替换词的合并预筛选正则
+    _program = ((), None)
 
     def __init__(self):
         self.init_config()
@@ -18,54 +34,115 @@ class WordsHelper:
     def init_config(self):
         self.dbhelper = DbHelper()
         self.words_info = self.dbhelper.get_custom_words(enabled=1)
+        self.build_program()
 
-    def process(self, title):
-        # 错误信息
-        msg = []
-        # 应用屏蔽
-        used_ignored_words = []
-        # 应用替换
-        used_replaced_words = []
-        # 应用集偏移
-        used_offset_words = []
-        # 应用识别词
+    def build_program(self):
+        """
+        将启用的识别词预编译为规则列表，识别词变化后需重新调用
+        """
+        rules = []
+        literals = []
         for word_info in self.words_info:
             match word_info.TYPE:
                 case 1:
                     # 屏蔽
                     ignored = word_info.REPLACED
-                    ignored_word = ignored
-                    title, ignore_msg, ignore_flag = self.replace_regex(title, ignored, "") \
-                        if word_info.REGEX else self.replace_noregex(title, ignored, "")
-                    if ignore_flag:
-                        used_ignored_words.append(ignored_word)
-                    elif ignore_msg:
-                        msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
+                    if word_info.REGEX:
+                        rules.append((1, True, ignored, _compile_pattern(ignored), "", ignored))
+                    else:
+                        literals.append(ignored)
+                        rules.append((1, False, ignored, None, "", ignored))
                 case 2:
                     # 替换
                     replaced, replace = word_info.REPLACED, word_info.REPLACE
                     replaced_word = f"{replaced} ⇒ {replace}"
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace) \
-                        if word_info.REGEX else self.replace_noregex(title, replaced, replace)
-                    if replace_flag:
-                        used_replaced_words.append(replaced_word)
-                    elif replace_msg:
-                        msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
-
+                    if word_info.REGEX:
+                        rules.append((2, True, replaced, _compile_pattern(replaced), replace, replaced_word))
+                    else:
+                        literals.append(replaced)
+                        rules.append((2, False, replaced, None, replace, replaced_word))
                 case 3:
                     # 替换+集偏移
                     replaced, replace, front, back, offset = \
                         word_info.REPLACED, word_info.REPLACE, word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    replaced_word = f"{replaced} ⇒ {replace}"
-                    offset_word = f"{front} + {back} >> {offset}"
+                    rules.append((3, _compile_pattern(replaced), replace,
+                                  front, back, offset, self.__compile_offset(front, back),
+                                  f"{replaced} ⇒ {replace}", f"{front} + {back} >> {offset}"))
+                case 4:
+                    # 集数偏移
+                    front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
+                    rules.append((4, front, back, offset, self.__compile_offset(front, back),
+                                  f"{front} + {back} >> {offset}"))
+                case _:
+                    pass
+        # 所有非正则词合并为一个预筛选正则，标题中不包含任何一个时直接跳过这些词
+        literal_re = None
+        if literals:
+            try:
+                literal_re = re.compile("|".join(re.escape(literal)
+                                                 for literal in sorted(set(literals), key=len, reverse=True)))
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+        self._program = (tuple(rules), literal_re)
+        self.version += 1
+
+    @staticmethod
+    def __compile_offset(front, back):
+        """
+        预编译集偏移使用的正则
+        """
+        return (_compile_pattern(back) if back else (None, ""),
+                _compile_pattern(front) if front else (None, ""),
+                _compile_pattern(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back)))
+
+    def process(self, title):
+        # 错误信息
+        msg = []
+        # 应用屏蔽
+        used_ignored_words = []
+        # 应用替换
+        used_replaced_words = []
+        # 应用集偏移
+        used_offset_words = []
+        rules, literal_re = self._program
+        # 非正则词预筛选结果，标题变化后需重新计算
+        literal_found = None
+        # 应用识别词
+        for rule in rules:
+            match rule[0]:
+                case 1 | 2:
+                    wtype, is_regex, replaced, pattern, replace, word = rule
+                    if is_regex:
+                        title, replace_msg, replace_flag = self.__replace_compiled(title, pattern, replace)
+                    else:
+                        if literal_found is None:
+                            literal_found = literal_re is None or literal_re.search(title) is not None
+                        if not literal_found:
+                            continue
+                        title, replace_msg, replace_flag = self.replace_noregex(title, replaced, replace)
+                    if replace_flag:
+                        literal_found = None
+                        if wtype == 1:
+                            used_ignored_words.append(word)
+                        else:
+                            used_replaced_words.append(word)
+                    elif replace_msg:
+                        if wtype == 1:
+                            msg.append(f"自定义屏蔽词 {word} 设置有误：{replace_msg}")
+                        else:
+                            msg.append(f"自定义替换词 {word} 格式有误：{replace_msg}")
+                case 3:
+                    _, pattern, replace, front, back, offset, offset_patterns, replaced_word, offset_word = rule
                     replaced_offset_word = f"{replaced_word} @@@ {offset_word}"
                     # 记录替换前title
                     title_cache = title
                     # 替换
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace)
+                    title, replace_msg, replace_flag = self.__replace_compiled(title, pattern, replace)
                     # 替换应用成功进行集数偏移
                     if replace_flag:
-                        title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
+                        literal_found = None
+                        title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset,
+                                                                             offset_patterns)
                         # 集数偏移应用成功
                         if offset_flag:
                             used_replaced_words.append(replaced_word)
@@ -78,11 +155,11 @@ class WordsHelper:
                     elif replace_msg:
                         msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
                 case 4:
-                    # 集数偏移
-                    front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    offset_word = f"{front} + {back} >> {offset}"
-                    title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
+                    _, front, back, offset, offset_patterns, offset_word = rule
+                    title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset,
+                                                                         offset_patterns)
                     if offset_flag:
+                        literal_found = None
                         used_offset_words.append(offset_word)
                     elif offset_msg:
                         msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
@@ -90,6 +167,24 @@ class WordsHelper:
                     pass
         return title, msg, {"ignored": used_ignored_words, "replaced": used_replaced_words, "offset": used_offset_words}
 
+    @staticmethod
+    def __replace_compiled(title, compiled, replace) -> (str, str, bool):
+        """
+        使用预编译的正则替换，只扫描一次标题
+        :param compiled: _compile_pattern的返回值
+        """
+        pattern, err_msg = compiled
+        if not pattern:
+            return title, err_msg, False
+        try:
+            new_title, count = pattern.subn(r'%s' % replace, title)
+            if not count:
+                return title, "", False
+            return new_title, "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
     @staticmethod
     def replace_regex(title, replaced, replace) -> (str, str, bool):
         try:
@@ -113,13 +208,32 @@ class WordsHelper:
             return title, str(err), False
 
     @staticmethod
-    def episode_offset(title, front, back, offset) -> (str, str, bool):
+    def episode_offset(title, front, back, offset, patterns=None) -> (str, str, bool):
+        """
+        集数偏移
+        :param patterns: 预编译的(back, front, 集数)正则，为空时现场编译
+        """
         try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, "", False
-            if front and not re.findall(r'%s' % front, title):
-                return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+            if patterns:
+                (back_re, back_msg), (front_re, front_msg), (offset_word_info_re, offset_msg) = patterns
+                if back:
+                    if not back_re:
+                        return title, back_msg, False
+                    if not back_re.search(title):
+                        return title, "", False
+                if front:
+                    if not front_re:
+                        return title, front_msg, False
+                    if not front_re.search(title):
+                        return title, "", False
+                if not offset_word_info_re:
+                    return title, offset_msg, False
+            else:
+                if back and not re.findall(r'%s' % back, title):
+                    return title, "", False
+                if front and not re.findall(r'%s' % front, title):
+                    return title, "", False
+                offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
             episode_nums_str = re.findall(offset_word_info_re, title)
             if not episode_nums_str:
                 return title, "", False
@@ -1,4 +1,6 @@
+import copy
 import datetime
+from contextlib import contextmanager
 from threading import Lock
 import xml.dom.minidom
 from abc import ABCMeta, abstractmethod
@@ -8,7 +10,7 @@ from app.filter import Filter
 from app.helper import ProgressHelper, DbHelper
 from app.media import Media
 from app.media.meta import MetaInfo
-from app.utils import DomUtils, RequestUtils, StringUtils, ExceptionUtils
+from app.utils import DomUtils, RequestUtils, StringUtils, ExceptionUtils, SingleFlight
 from app.utils.types import MediaType, SearchType, ProgressKey
 
 
@@ -26,12 +28,53 @@ class _IIndexClient(metaclass=ABCMeta):
     dbhelper = None
     lock = Lock()
 
+    # 批量搜索的嵌套深度，大于0时相同的站点搜索共享结果
+    _shared_depth = 0
+    # 批量搜索期间已完成的站点搜索结果
+    _shared_results = {}
+    _shared_lock = Lock()
+    _shared_flight = SingleFlight()
+
     def __init__(self):
         self.media = Media()
         self.filter = Filter()
         self.progress = ProgressHelper()
         self.dbhelper = DbHelper()
 
+    @contextmanager
+    def shared_search(self):
+        """
+        批量搜索：期间相同站点、相同关键字的搜索只访问一次站点，结果在最外层批量搜索结束时丢弃
+        """
+        with _IIndexClient._shared_lock:
+            _IIndexClient._shared_depth += 1
+        try:
+            yield
+        finally:
+            with _IIndexClient._shared_lock:
+                _IIndexClient._shared_depth -= 1
+                if not _IIndexClient._shared_depth:
+                    _IIndexClient._shared_results = {}
+
+    def _shared_fetch(self, key, func, *args, **kwargs):
+        """
+        访问站点获取原始搜索结果，批量搜索期间相同键的搜索共享结果，并发的相同搜索只执行一次；
+        结果为None时表示未访问站点，不共享
+        """
+        # 锁内只读取状态，访问站点在锁外进行，不阻塞其它搜索
+        with _IIndexClient._shared_lock:
+            shared = _IIndexClient._shared_depth > 0
+            if shared and key in _IIndexClient._shared_results:
+                return copy.deepcopy(_IIndexClient._shared_results[key])
+        if not shared:
+            return func(*args, **kwargs)
+        result, _ = _IIndexClient._shared_flight.do(key, func, *args, **kwargs)
+        if result is not None:
+            with _IIndexClient._shared_lock:
+                if _IIndexClient._shared_depth:
+                    _IIndexClient._shared_results[key] = copy.deepcopy(result)
+        return result
+
     @abstractmethod
     def match(self, ctype):
         """
@@ -92,7 +135,7 @@ class _IIndexClient(metaclass=ABCMeta):
                                                         replace_word=" ",
                                                         allow_space=True)
         api_url = f"{indexer.domain}?apikey={self.api_key}&t=search&q={search_word}"
-        result_array = self.__parse_torznabxml(api_url)
+        result_array = self._shared_fetch((self.client_id, api_url), self.__parse_torznabxml, api_url)
 
         # 索引花费时间
         seconds = (datetime.datetime.now() - start_time).seconds
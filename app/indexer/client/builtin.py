@@ -150,10 +150,6 @@ class BuiltinIndexer(_IIndexClient):
         """
         if not indexer or not key_word:
             return None
-        # 站点流控
-        if self.sites.check_ratelimit(indexer.siteid):
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
-            return []
         # fix 共用同一个dict时会导致某个站点的更新全局全效
         if filter_args is None:
             _filter_args = {}
@@ -167,8 +163,6 @@ class BuiltinIndexer(_IIndexClient):
             _filter_args.update({"rule": indexer.rule})
         # 计算耗时
         start_time = datetime.datetime.now()
-
-        log.info(f"【{self.client_name}】开始搜索Indexer：{indexer.name} ...")
         # 特殊符号处理
         search_word = StringUtils.handler_special_chars(text=key_word,
                                                         replace_word=" ",
@@ -177,7 +171,44 @@ class BuiltinIndexer(_IIndexClient):
         if indexer.language == "en" and StringUtils.is_chinese(search_word):
             log.warn(f"【{self.client_name}】{indexer.name} 无法使用中文名搜索")
             return []
-        # 开始索引
+        mtype = match_media.type if match_media and match_media.tmdb_info else None
+        # 开始索引，批量搜索时相同站点、相同关键字的搜索共享结果
+        fetch_result = self._shared_fetch((self.client_id, indexer.id, search_word, mtype),
+                                          self.__fetch, indexer, search_word, mtype)
+        # 站点流控
+        if fetch_result is None:
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
+            return []
+        error_flag, result_array = fetch_result
+        # 返回结果
+        if len(result_array) == 0:
+            log.warn(f"【{self.client_name}】{indexer.name} 未搜索到数据")
+            # 更新进度
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 未搜索到数据")
+            return []
+        else:
+            log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
+            # 更新进度
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
+            # 过滤
+            return self.filter_search_results(result_array=result_array,
+                                              order_seq=order_seq,
+                                              indexer=indexer,
+                                              filter_args=_filter_args,
+                                              match_media=match_media,
+                                              start_time=start_time)
+
+    def __fetch(self, indexer, search_word, mtype):
+        """
+        访问站点搜索，只有实际访问站点时才计入流控和索引统计
+        :return: 是否发生错误, 种子列表，触发站点流控时返回None
+        """
+        # 站点流控
+        if self.sites.check_ratelimit(indexer.siteid):
+            return None
+        # 计算耗时
+        start_time = datetime.datetime.now()
+        log.info(f"【{self.client_name}】开始搜索Indexer：{indexer.name} ...")
         result_array = []
         try:
             if 'm-team' in indexer.domain:
@@ -185,19 +216,16 @@ class BuiltinIndexer(_IIndexClient):
             elif indexer.parser == "TNodeSpider":
                 error_flag, result_array = TNodeSpider(indexer).search(keyword=search_word)
             elif indexer.parser == "RenderSpider":
-                error_flag, result_array = RenderSpider(indexer).search(
-                    keyword=search_word,
-                    mtype=match_media.type if match_media and match_media.tmdb_info else None)
+                error_flag, result_array = RenderSpider(indexer).search(keyword=search_word, mtype=mtype)
             elif indexer.parser == "TorrentLeech":
                 error_flag, result_array = TorrentLeech(indexer).search(keyword=search_word)
             else:
                 if PluginsSpider().status(indexer=indexer):
                     error_flag, result_array = PluginsSpider().search(keyword=search_word, indexer=indexer)
                 else:
-                    error_flag, result_array = self.__spider_search(
-                        keyword=search_word,
-                        indexer=indexer,
-                        mtype=match_media.type if match_media and match_media.tmdb_info else None)
+                    error_flag, result_array = self.__spider_search(keyword=search_word,
+                                                                    indexer=indexer,
+                                                                    mtype=mtype)
         except Exception as err:
             error_flag = True
             print(str(err))
@@ -209,23 +237,7 @@ class BuiltinIndexer(_IIndexClient):
                                                 itype=self.client_id,
                                                 seconds=seconds,
                                                 result='N' if error_flag else 'Y')
-        # 返回结果
-        if len(result_array) == 0:
-            log.warn(f"【{self.client_name}】{indexer.name} 未搜索到数据")
-            # 更新进度
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 未搜索到数据")
-            return []
-        else:
-            log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
-            # 更新进度
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
-            # 过滤
-            return self.filter_search_results(result_array=result_array,
-                                              order_seq=order_seq,
-                                              indexer=indexer,
-                                              filter_args=_filter_args,
-                                              match_media=match_media,
-                                              start_time=start_time)
+        return error_flag, result_array or []
 
     def list(self, url, page=0, keyword=None):
         """
@@ -1,5 +1,7 @@
 import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from threading import Lock, BoundedSemaphore
 
 import log
 from app.helper import ProgressHelper, SubmoduleHelper, DbHelper
@@ -9,6 +11,12 @@ from app.utils.types import SearchType, IndexerType, ProgressKey
 from app.sites import Sites
 from config import Config
 
+# 站点搜索线程池的线程数
+SEARCH_WORKERS = 64
+# 默认每个站点同时进行的搜索数
+DEFAULT_SITE_SEARCH_CONCURRENCY = 2
+
+
 @singleton
 class Indexer(object):
     _indexer_schemas = []
@@ -17,6 +25,13 @@ class Indexer(object):
     progress = None
     dbhelper = None
 
+    # 所有搜索共用的站点搜索线程池
+    _executor = None
+    _executor_lock = Lock()
+    # 站点ID -> 站点并发搜索额度
+    _site_semaphores = {}
+    _site_concurrency = DEFAULT_SITE_SEARCH_CONCURRENCY
+
     def __init__(self):
         self._indexer_schemas = SubmoduleHelper.import_submodules(
             'app.indexer.client',
@@ -32,6 +47,15 @@ class Indexer(object):
         self._client = self.__get_client(indexer)
         if self._client:
             self._client_type = self._client.get_type()
+        site_concurrency = Config().get_config("pt").get('search_site_concurrency')
+        if str(site_concurrency).isdigit() and int(site_concurrency) > 0:
+            site_concurrency = int(site_concurrency)
+        else:
+            site_concurrency = DEFAULT_SITE_SEARCH_CONCURRENCY
+        with self._executor_lock:
+            if site_concurrency != self._site_concurrency:
+                self._site_semaphores = {}
+            self._site_concurrency = site_concurrency
 
     def __build_class(self, ctype, conf):
         for indexer_schema in self._indexer_schemas:
@@ -155,6 +179,9 @@ class Indexer(object):
         if not indexers:
             log.error("没有配置索引器，无法搜索！")
             return []
+        # 不在设定搜索范围的站点不提交搜索
+        if filter_args and filter_args.get("site"):
+            indexers = [index for index in indexers if index.name in filter_args.get("site")]
         # 计算耗时
         start_time = datetime.datetime.now()
         if filter_args and filter_args.get("site"):
@@ -165,28 +192,30 @@ class Indexer(object):
             log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
             self.progress.update(ptype=ProgressKey.Search,
                                  text="开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
-        # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
-        all_task = []
-        for index in indexers:
-            order_seq = 100 - int(index.pri)
-            task = executor.submit(self._client.search,
-                                   order_seq,
-                                   index,
-                                   key_word,
-                                   filter_args,
-                                   match_media,
-                                   in_from)
-            all_task.append(task)
-        ret_array = []
-        finish_count = 0
-        for future in as_completed(all_task):
-            result = future.result()
-            finish_count += 1
-            self.progress.update(ptype=ProgressKey.Search,
-                                 value=round(100 * (finish_count / len(all_task))))
-            if result:
-                ret_array = ret_array + result
+        # 多线程，各站点的索引统计在全部搜索完成后一次性写入
+        with self.dbhelper.indexer_statistics_batch() as statistics:
+            executor = self.__get_executor()
+            all_task = []
+            for index in indexers:
+                order_seq = 100 - int(index.pri)
+                task = executor.submit(self.__search_indexer,
+                                       statistics,
+                                       order_seq,
+                                       index,
+                                       key_word,
+                                       filter_args,
+                                       match_media,
+                                       in_from)
+                all_task.append(task)
+            ret_array = []
+            finish_count = 0
+            for future in as_completed(all_task):
+                result = future.result()
+                finish_count += 1
+                self.progress.update(ptype=ProgressKey.Search,
+                                     value=round(100 * (finish_count / len(all_task))))
+                if result:
+                    ret_array = ret_array + result
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(f"【{self._client_type.value}】所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
@@ -197,6 +226,45 @@ class Indexer(object):
                              value=100)
         return ret_array
 
+    def __get_executor(self):
+        """
+        获取共用的站点搜索线程池，首次使用时创建
+        """
+        with self._executor_lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS,
+                                                    thread_name_prefix="IndexerSearch")
+            return self._executor
+
+    def __get_site_semaphore(self, indexer):
+        """
+        获取站点的并发搜索额度，所有同时进行的搜索共用
+        """
+        with self._executor_lock:
+            site_key = indexer.id or indexer.name
+            semaphore = self._site_semaphores.get(site_key)
+            if not semaphore:
+                semaphore = BoundedSemaphore(self._site_concurrency)
+                self._site_semaphores[site_key] = semaphore
+            return semaphore
+
+    def __search_indexer(self, statistics, order_seq, indexer, *args):
+        """
+        在站点的并发额度内搜索单个站点，索引统计加入发起搜索线程的收集
+        """
+        with self.dbhelper.indexer_statistics_batch(statistics), self.__get_site_semaphore(indexer):
+            return self._client.search(order_seq, indexer, *args)
+
+    @contextmanager
+    def search_batch(self):
+        """
+        批量搜索，期间相同站点、相同关键字的搜索共享结果，索引统计在结束时一次性写入
+        :return: 索引统计收集列表，其它线程中的搜索通过indexer_statistics_batch加入
+        """
+        with self.dbhelper.indexer_statistics_batch() as statistics, \
+                (self._client.shared_search() if self._client else nullcontext()):
+            yield statistics
+
     def get_indexer_statistics(self):
         """
         获取索引器统计信息
@@ -12,8 +12,8 @@ import log
 from app.helper import MetaHelper
 from app.helper.openai_helper import OpenAiHelper
 from app.media.meta.metainfo import MetaInfo
-from app.media.tmdbv3api import TMDb, Search, Movie, TV, Person, Find, TMDbException, Discover, Trending, Episode, Genre
-from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman
+from app.media.tmdbv3api import TMDb, TMDbConfig, Search, Movie, TV, Person, Find, TMDbException, Discover, Trending, Episode, Genre
+from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman, SingleFlight
 from app.utils.types import MediaType, MatchMode
 from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, KEYWORD_SEARCH_WEIGHT_1, \
     KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD
@@ -39,6 +39,8 @@ class Media:
     _chatgpt_enable = None
     _default_language = None
     _tmdb_include_adult = None
+    # 合并并发的相同查询，各实例共享
+    _flight = SingleFlight()
 
     def __init__(self):
         self.init_config()
@@ -57,34 +59,43 @@ class Media:
         self._default_language = media.get("tmdb_language", "zh") or "zh"
         # TMDB是否包含成人内容
         self._tmdb_include_adult = media.get("tmdb_include_adult")
+        # TMDB请求速率限制
+        try:
+            TMDb.set_rate_limit(int(media.get("tmdb_rate_limit", 40) or 0))
+        except (TypeError, ValueError):
+            TMDb.set_rate_limit(40)
         # TMDB
         if app.get('rmt_tmdbkey'):
+            # TMDB配置，各查询对象共享，不可修改
+            tmdb_config = TMDbConfig(
+                # APIKEY
+                api_key=app.get('rmt_tmdbkey'),
+                # 域名
+                domain=Config().get_tmdbapi_url(),
+                # 语种
+                language=self._default_language,
+                # 代理
+                proxies=TMDbConfig.parse_proxies(Config().get_proxies()),
+                # TMDB是否包含成人内容
+                include_adult=str(self._tmdb_include_adult).lower() == "true",
+                # 开启缓存
+                cache=True,
+                # 调试模式
+                debug=False
+            )
+            TMDb.set_default_config(tmdb_config)
             # TMDB主体
-            self.tmdb = TMDb()
-            # 域名
-            self.tmdb.domain = Config().get_tmdbapi_url()
-            # 开启缓存
-            self.tmdb.cache = True
-            # APIKEY
-            self.tmdb.api_key = app.get('rmt_tmdbkey')
-            # 语种
-            self.tmdb.language = self._default_language
-            # 代理
-            self.tmdb.proxies = Config().get_proxies()
-            # TMDB是否包含成人内容
-            self.tmdb.include_adult = self._tmdb_include_adult
-            # 调试模式
-            self.tmdb.debug = False
+            self.tmdb = TMDb(config=tmdb_config)
             # 查询对象
-            self.search = Search()
-            self.movie = Movie()
-            self.tv = TV()
-            self.episode = Episode()
-            self.find = Find()
-            self.person = Person()
-            self.trending = Trending()
-            self.discover = Discover()
-            self.genre = Genre()
+            self.search = Search(config=tmdb_config)
+            self.movie = Movie(config=tmdb_config)
+            self.tv = TV(config=tmdb_config)
+            self.episode = Episode(config=tmdb_config)
+            self.find = Find(config=tmdb_config)
+            self.person = Person(config=tmdb_config)
+            self.trending = Trending(config=tmdb_config)
+            self.discover = Discover(config=tmdb_config)
+            self.genre = Genre(config=tmdb_config)
         # 元数据缓存
         self.meta = MetaHelper()
         # ChatGPT
@@ -102,15 +113,12 @@ class Media:
 
     def __set_language(self, language):
         """
-        设置语言
-        :param language: zh/en
+        设置当前线程后续TMDB查询使用的语言，不影响其它线程的查询
+        :param language: zh/en，为空时使用默认语言
         """
         if not self.tmdb:
             return
-        if language:
-            self.tmdb.language = language
-        else:
-            self.tmdb.language = self._default_language
+        self.tmdb.language = language or None
 
     @staticmethod
     def __compare_tmdb_names(file_name, tmdb_names):
@@ -582,6 +590,23 @@ class Media:
             return None
         # 设置语言
         self.__set_language(language)
+        # 并发查询同一媒体时只请求一次
+        mtype = MediaType.MOVIE if mtype == MediaType.MOVIE else MediaType.TV
+        tmdb_info, _ = self._flight.do(("tmdb_info", mtype, str(tmdbid), language, append_to_response, chinese),
+                                       self.__get_tmdb_info, mtype, tmdbid, append_to_response, chinese)
+        return tmdb_info
+
+    @classmethod
+    def get_flight_statistics(cls):
+        """
+        查询合并查询的统计信息
+        """
+        return cls._flight.get_statistics()
+
+    def __get_tmdb_info(self, mtype: MediaType, tmdbid, append_to_response=None, chinese=True):
+        """
+        查询TMDB详情并转换类型、标题
+        """
         if mtype == MediaType.MOVIE:
             tmdb_info = self.__get_tmdb_movie_detail(tmdbid, append_to_response)
             if tmdb_info:
@@ -745,75 +770,21 @@ class Media:
             meta_info.type = mtype
         media_key = self.__make_cache_key(meta_info)
         if not cache or not self.meta.get_meta_data_by_key(media_key):
-            # 缓存没有或者强制不使用缓存
-            if meta_info.type != MediaType.TV and not meta_info.year:
-                file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
-            else:
-                if meta_info.type == MediaType.TV:
-                    # 确定是电视
-                    file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                         first_media_year=meta_info.year,
-                                                         search_type=meta_info.type,
-                                                         media_year=meta_info.year,
-                                                         season_number=meta_info.begin_season
-                                                         )
-                    if not file_media_info and meta_info.year and self._rmt_match_mode == MatchMode.NORMAL and not strict:
-                        # 非严格模式下去掉年份再查一次
-                        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                             search_type=meta_info.type
-                                                             )
-                else:
-                    # 有年份先按电影查
-                    file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                         first_media_year=meta_info.year,
-                                                         search_type=MediaType.MOVIE
-                                                         )
-                    # 没有再按电视剧查
-                    if not file_media_info:
-                        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                             first_media_year=meta_info.year,
-                                                             search_type=MediaType.TV
-                                                             )
-                    if not file_media_info and self._rmt_match_mode == MatchMode.NORMAL and not strict:
-                        # 非严格模式下去掉年份和类型再查一次
-                        file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
-            if not file_media_info and self._search_tmdbweb:
-                # 从网站查询
-                file_media_info = self.__search_tmdb_web(file_media_name=meta_info.get_name(),
-                                                         mtype=meta_info.type)
-            if not file_media_info and self._chatgpt_enable:
-                # 通过ChatGPT查询
-                mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=title,
-                                                                                 mtype=meta_info.type)
-                # 修正类型和集数
+            # 缓存没有或者强制不使用缓存，并发识别同一媒体时只查询一次，ChatGPT按种子名称查询，需区分名称
+            flight_key = ("media_info", media_key, title if self._chatgpt_enable else None,
+                          language, strict, chinese, append_to_response)
+            (file_media_info, chatgpt_info), _ = self._flight.do(flight_key,
+                                                                 self.__search_media_info,
+                                                                 meta_info, media_key, title, strict, chinese,
+                                                                 append_to_response)
+            if chatgpt_info:
+                # 按ChatGPT识别结果修正类型和集数，并发等待的调用各自修正
+                mtype, seasons, episodes = chatgpt_info
                 meta_info.type = mtype
                 if not meta_info.get_season_string():
-                    meta_info.set_season(seaons)
+                    meta_info.set_season(seasons)
                 if not meta_info.get_episode_string():
                     meta_info.set_episode(episodes)
-            if not file_media_info and self._search_keyword:
-                # 关键字猜测
-                cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
-                is_movie = False
-                if not cache_name:
-                    cache_name, is_movie = self.__search_engine(meta_info.get_name())
-                    cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
-                if cache_name:
-                    log.info("【Meta】开始辅助查询：%s ..." % cache_name)
-                    if is_movie:
-                        file_media_info = self.__search_tmdb(file_media_name=cache_name, search_type=MediaType.MOVIE)
-                    else:
-                        file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
-            # 补充全量信息
-            if file_media_info and not file_media_info.get("genres"):
-                file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
-                                                     tmdbid=file_media_info.get("id"),
-                                                     chinese=chinese,
-                                                     append_to_response=append_to_response)
-            # 保存到缓存
-            if file_media_info is not None:
-                self.__insert_media_cache(media_key=media_key,
-                                          file_media_info=file_media_info)
         else:
             # 使用缓存信息
             cache_info = self.meta.get_meta_data_by_key(media_key)
@@ -828,6 +799,81 @@ class Media:
         meta_info.set_tmdb_info(file_media_info)
         return meta_info
 
+    def __search_media_info(self, meta_info, media_key, title, strict=None, chinese=True, append_to_response=None):
+        """
+        按识别出的名称、年份、类型搜索TMDB信息并保存到缓存
+        :param meta_info: 识别信息
+        :param media_key: 缓存的key
+        :param title: 种子名称
+        :return: TMDB信息，ChatGPT识别出的类型、季、集（未通过ChatGPT查询时为None）
+        """
+        chatgpt_info = None
+        if meta_info.type != MediaType.TV and not meta_info.year:
+            file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
+        else:
+            if meta_info.type == MediaType.TV:
+                # 确定是电视
+                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                     first_media_year=meta_info.year,
+                                                     search_type=meta_info.type,
+                                                     media_year=meta_info.year,
+                                                     season_number=meta_info.begin_season
+                                                     )
+                if not file_media_info and meta_info.year and self._rmt_match_mode == MatchMode.NORMAL and not strict:
+                    # 非严格模式下去掉年份再查一次
+                    file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                         search_type=meta_info.type
+                                                         )
+            else:
+                # 有年份先按电影查
+                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                     first_media_year=meta_info.year,
+                                                     search_type=MediaType.MOVIE
+                                                     )
+                # 没有再按电视剧查
+                if not file_media_info:
+                    file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                         first_media_year=meta_info.year,
+                                                         search_type=MediaType.TV
+                                                         )
+                if not file_media_info and self._rmt_match_mode == MatchMode.NORMAL and not strict:
+                    # 非严格模式下去掉年份和类型再查一次
+                    file_media_info = self.__search_multi_tmdb(file_media_name=meta_info.get_name())
+        if not file_media_info and self._search_tmdbweb:
+            # 从网站查询
+            file_media_info = self.__search_tmdb_web(file_media_name=meta_info.get_name(),
+                                                     mtype=meta_info.type)
+        if not file_media_info and self._chatgpt_enable:
+            # 通过ChatGPT查询
+            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=title,
+                                                                             mtype=meta_info.type)
+            # 类型和集数由调用方修正
+            chatgpt_info = (mtype, seaons, episodes)
+        if not file_media_info and self._search_keyword:
+            # 关键字猜测
+            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
+            is_movie = False
+            if not cache_name:
+                cache_name, is_movie = self.__search_engine(meta_info.get_name())
+                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
+            if cache_name:
+                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
+                if is_movie:
+                    file_media_info = self.__search_tmdb(file_media_name=cache_name, search_type=MediaType.MOVIE)
+                else:
+                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
+        # 补充全量信息
+        if file_media_info and not file_media_info.get("genres"):
+            file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
+                                                 tmdbid=file_media_info.get("id"),
+                                                 chinese=chinese,
+                                                 append_to_response=append_to_response)
+        # 保存到缓存
+        if file_media_info is not None:
+            self.__insert_media_cache(media_key=media_key,
+                                      file_media_info=file_media_info)
+        return file_media_info, chatgpt_info
+
     def __insert_media_cache(self, media_key, file_media_info):
         """
         将TMDB信息插入缓存
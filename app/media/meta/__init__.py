@@ -6,3 +6,4 @@ from .metavideov2 import MetaVideoV2
 from .release_groups import ReleaseGroupsMatcher
 from .mediaItem import MediaMainItem, MediaEpisodeItem, MediaVideoItem,\
 MediaAudioItem, MediaLocalizationItem, MediaOtherItem, MediaItem
+from .metacache import MetaCache
@@ -9,6 +9,8 @@ class CustomizationMatcher(object):
     """
     customization = None
     custom_separator = None
+    # 设置版本号，更新自定义设置时递增
+    version = 0
 
     def __init__(self):
         self.customization = None
@@ -42,3 +44,4 @@ class CustomizationMatcher(object):
         """
         self.customization = customization
         self.custom_separator = separator
+        self.version += 1
@@ -0,0 +1,108 @@
+import copy
+from collections import OrderedDict
+from threading import Lock
+
+from app.utils.commons import singleton
+from config import Config
+
+# 默认缓存的识别结果数量
+DEFAULT_META_CACHE_SIZE = 2000
+
+
+@singleton
+class MetaCache(object):
+    """
+    名称识别结果缓存，按标题及识别相关设置缓存MetaInfo的识别结果，返回副本避免调用方修改缓存内容
+    """
+    _enabled = False
+    _maxsize = DEFAULT_META_CACHE_SIZE
+    _cache = OrderedDict()
+    # 缓存对应的识别设置，设置变化时清空缓存
+    _settings = None
+    _hits = 0
+    _misses = 0
+    _lock = Lock()
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self.init_config()
+
+    def init_config(self):
+        laboratory = Config().get_config('laboratory') or {}
+        self._enabled = laboratory.get('meta_cache_enable', False) or False
+        maxsize = laboratory.get('meta_cache_size')
+        if isinstance(maxsize, str) and maxsize.isdigit():
+            maxsize = int(maxsize)
+        self._maxsize = maxsize if isinstance(maxsize, int) and maxsize > 0 else DEFAULT_META_CACHE_SIZE
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @staticmethod
+    def __copy(meta_info):
+        """
+        浅拷贝识别结果，并复制一层列表、字典等可变属性
+        """
+        meta_copy = copy.copy(meta_info)
+        for key, value in meta_info.__dict__.items():
+            if isinstance(value, (list, dict, set)):
+                setattr(meta_copy, key, copy.copy(value))
+        return meta_copy
+
+    def get(self, key, settings):
+        """
+        查询缓存的识别结果
+        :param key: 识别参数
+        :param settings: 识别词、制作组等设置的版本
+        :return: 识别结果副本，未命中时返回None
+        """
+        with self._lock:
+            if settings != self._settings:
+                self._cache.clear()
+                self._settings = settings
+            meta_info = self._cache.get(key)
+            if meta_info is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+        return self.__copy(meta_info)
+
+    def set(self, key, settings, meta_info):
+        """
+        缓存识别结果
+        """
+        if not meta_info:
+            return
+        meta_copy = self.__copy(meta_info)
+        with self._lock:
+            if settings != self._settings:
+                return
+            self._cache[key] = meta_copy
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._settings = None
+            self._hits = 0
+            self._misses = 0
+
+    def get_statistics(self):
+        """
+        查询缓存统计
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "size": len(self._cache),
+                "maxsize": self._maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total * 100, 1) if total else 0
+            }
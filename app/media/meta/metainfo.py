@@ -3,9 +3,12 @@ import regex as re
 
 import log
 from app.helper import WordsHelper
+from app.media.meta.customization import CustomizationMatcher
 from app.media.meta.metaanime import MetaAnime
+from app.media.meta.metacache import MetaCache
 from app.media.meta.metavideo import MetaVideo
 from app.media.meta.metavideov2 import MetaVideoV2
+from app.media.meta.release_groups import ReleaseGroupsMatcher
 from app.utils.types import MediaType
 from app.utils import StringUtils
 from config import Config, RMT_MEDIAEXT
@@ -33,6 +36,24 @@ def MetaInfo(title,
     ffmpeg_video_meta_enable = False
     if media:
         ffmpeg_video_meta_enable = media.get('ffmpeg_video_meta', False) or False
+    laboratory = Config().get_config('laboratory')
+    recognize_enhance_enable = False
+    if laboratory:
+        recognize_enhance_enable = laboratory.get('recognize_enhance_enable', False) or False
+
+    # 查询识别缓存，需要读取文件元数据时不使用缓存
+    meta_cache = MetaCache()
+    cache_key = cache_settings = None
+    if meta_cache.enabled and not (ffmpeg_video_meta_enable and filePath):
+        cache_key = (title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
+        cache_settings = (recognize_enhance_enable,
+                          WordsHelper().version,
+                          ReleaseGroupsMatcher().version,
+                          CustomizationMatcher().version)
+        meta_info = meta_cache.get(cache_key, cache_settings)
+        if meta_info:
+            return meta_info
+
     # 记录原始名称
     org_title = title
     # 应用自定义识别词，获取识别词处理后名称
@@ -52,11 +73,6 @@ def MetaInfo(title,
     else:
         fileflag = False
 
-    laboratory = Config().get_config('laboratory')
-    recognize_enhance_enable = False
-    if laboratory:
-        recognize_enhance_enable = laboratory.get('recognize_enhance_enable', False) or False
-
     if recognize_enhance_enable:
          meta_info = MetaVideoV2(rev_title, subtitle, fileflag, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
     else:
@@ -73,6 +89,9 @@ def MetaInfo(title,
     meta_info.replaced_words = used_info.get("replaced")
     meta_info.offset_words = used_info.get("offset")
 
+    if cache_key:
+        meta_cache.set(cache_key, cache_settings, meta_info)
+
     return meta_info
 
 
@@ -1,6 +1,147 @@
+from functools import lru_cache
+
 import regex as re
 from app.utils.commons import singleton
 
+# 制作组前允许出现的分隔符
+RELEASE_GROUP_PREFIX_CHARS = "-@[￡【&"
+# 单个制作组正则展开的字面前缀数量上限
+MAX_LITERAL_PREFIXES = 64
+
+
+def _skip_until(pattern, i, stops):
+    """
+    跳过正则中的转义、字符集及嵌套分组，直到遇到同一层级的结束字符
+    """
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            if depth == 0 and c in stops:
+                return i
+            depth -= 1
+        elif depth == 0 and c in stops:
+            return i
+        i += 1
+    return i
+
+
+def _parse_sequence(pattern, i):
+    """
+    解析一个分支，返回该分支所有可能的字面前缀[(前缀, 是否完整)]及结束位置
+    """
+    results = [("", True)]
+    while i < len(pattern) and pattern[i] not in "|)":
+        c = pattern[i]
+        atom = None
+        if c == "\\":
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                atom, i = [(pattern[i + 1], True)], i + 2
+        elif c == "(" and pattern.startswith("(?:", i):
+            atom, i = _parse_alternation(pattern, i + 3)
+            if i >= len(pattern) or pattern[i] != ")":
+                raise ValueError("unbalanced parenthesis")
+            i += 1
+        elif c not in "()[].^$*+?{}":
+            atom, i = [(c, True)], i + 1
+        if atom is None:
+            break
+        quantifier = pattern[i] if i < len(pattern) else ""
+        if quantifier in ("?", "*", "{"):
+            break
+        combined = []
+        for prefix, complete in results:
+            if complete:
+                combined.extend((prefix + atom_prefix, atom_complete) for atom_prefix, atom_complete in atom)
+            else:
+                combined.append((prefix, complete))
+        if len(combined) > MAX_LITERAL_PREFIXES:
+            break
+        results = combined
+        if quantifier == "+":
+            break
+    else:
+        return results, i
+    return [(prefix, False) for prefix, _ in results], _skip_until(pattern, i, "|)")
+
+
+def _parse_alternation(pattern, i):
+    """
+    解析多个分支
+    """
+    results = []
+    while True:
+        branch, i = _parse_sequence(pattern, i)
+        results.extend(branch)
+        if i < len(pattern) and pattern[i] == "|":
+            i += 1
+            continue
+        return results, i
+
+
+def literal_prefixes(pattern):
+    """
+    计算制作组正则所有匹配结果必然以之开头的小写字面前缀
+    :return: 前缀集合，无法确定（存在空前缀或解析失败）时返回None
+    """
+    try:
+        results, i = _parse_alternation(pattern, 0)
+        if i < len(pattern):
+            return None
+    except (ValueError, IndexError):
+        return None
+    prefixes = set()
+    for prefix, _ in results:
+        if not prefix:
+            return None
+        prefixes.add(prefix.lower())
+    return prefixes
+
+
+class _LiteralPrefilter(object):
+    """
+    制作组字面前缀预筛选，只检查分隔符后面的文本是否以某个前缀开头，没有任何候选时跳过正则匹配
+    """
+
+    _prefix_re = re.compile(r"[%s]" % re.escape(RELEASE_GROUP_PREFIX_CHARS))
+
+    def __init__(self, prefixes):
+        self._prefixes = {}
+        for prefix in prefixes:
+            self._prefixes.setdefault(len(prefix), set()).add(prefix)
+        self._lengths = sorted(self._prefixes)
+
+    def may_match(self, title):
+        title = title.lower()
+        for delimiter in self._prefix_re.finditer(title):
+            start = delimiter.end()
+            for length in self._lengths:
+                if title[start:start + length] in self._prefixes[length]:
+                    return True
+        return False
+
+
+@lru_cache(maxsize=64)
+def _compile_groups(groups):
+    """
+    编译制作组正则及字面前缀预筛选，按制作组字符串缓存
+    :return: 正则, 预筛选器（无法预筛选时为None）
+    """
+    groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+    prefixes = literal_prefixes(groups)
+    return groups_re, _LiteralPrefilter(prefixes) if prefixes else None
+
 
 @singleton
 class ReleaseGroupsMatcher(object):
@@ -8,8 +149,14 @@ class ReleaseGroupsMatcher(object):
     识别制作组、字幕组
     """
     __release_groups = None
+    # 当前使用的制作组正则及预筛选器，仅在update_custom时重建
+    __program = None
     custom_release_groups = None
     custom_separator = None
+    # 设置版本号，更新自定义设置时递增
+    version = 0
+    # 是否启用字面前缀预筛选
+    use_prefilter = True
     RELEASE_GROUPS = {
         "0ff": ['FF(?:(?:A|WE)B|CD|E(?:DU|B)|TV)'],
         "1pt": [],
@@ -79,6 +226,7 @@ class ReleaseGroupsMatcher(object):
             for release_group in site_groups:
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
+        self.__program = _compile_groups(self.__release_groups)
 
     def match(self, title=None, groups=None):
         """
@@ -88,16 +236,16 @@ class ReleaseGroupsMatcher(object):
         """
         if not title:
             return ""
-        if not groups:
-            if self.custom_release_groups:
-                groups = f"{self.__release_groups}|{self.custom_release_groups}"
-            else:
-                groups = self.__release_groups
+        if groups:
+            groups_re, prefilter = _compile_groups(groups)
+        else:
+            groups_re, prefilter = self.__program
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+        if self.use_prefilter and prefilter and not prefilter.may_match(title):
+            return ""
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
-        for item in re.findall(groups_re, title):
+        for item in groups_re.findall(title):
             if item not in unique_groups:
                 unique_groups.append(item)
         separator = self.custom_separator or "@"
@@ -109,3 +257,8 @@ class ReleaseGroupsMatcher(object):
         """
         self.custom_release_groups = release_groups
         self.custom_separator = separator
+        self.version += 1
+        if release_groups:
+            self.__program = _compile_groups(f"{self.__release_groups}|{release_groups}")
+        else:
+            self.__program = _compile_groups(self.__release_groups)
@@ -12,6 +12,7 @@ from app.helper import FfmpegHelper
 from app.media import Media
 from app.media.douban import DouBan
 from app.media.meta import MetaInfo
+from app.media.tmdbv3api import TMDb, Priority
 from app.utils import DomUtils, RequestUtils, ExceptionUtils, NfoReader, SystemUtils, StringUtils
 from app.utils.commons import retry
 from app.utils.types import MediaType, SystemConfigKey, RmtMode
@@ -39,6 +40,7 @@ class Scraper:
         if not os.path.exists(self._temp_path):
             os.makedirs(self._temp_path, exist_ok=True)
 
+    @TMDb.priority(Priority.BACKGROUND)
     def folder_scraper(self, path, exclude_path=None, mode=None):
         """
         刮削指定文件夹或文件
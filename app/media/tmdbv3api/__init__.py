@@ -1,4 +1,5 @@
-from .tmdb import TMDb
+from .tmdb import TMDb, TMDbConfig
+from .scheduler import Priority
 from .exceptions import TMDbException
 from .objs.movie import Movie
 from .objs.search import Search
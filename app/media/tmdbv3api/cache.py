@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache(object):
+    """
+    TMDB响应缓存，只保存响应的JSON文本，按字节数和条数限制容量，超出时淘汰最久未使用的条目；
+    过期时间保存在最小堆中，每次访问只弹出已到期的堆顶，不遍历全部条目
+    """
+
+    def __init__(self, ttl, maxsize, maxbytes):
+        """
+        :param ttl: 缓存有效期（秒）
+        :param maxsize: 最大条数
+        :param maxbytes: 最大字节数
+        """
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        # key -> (body, expire_time)
+        self._cache = OrderedDict()
+        # (expire_time, seq, key)
+        self._expire_heap = []
+        self._seq = itertools.count()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key):
+        """
+        查询缓存，命中时返回新解析的JSON对象，调用方可以随意修改
+        """
+        with self._lock:
+            self.__expire(time.time())
+            item = self._cache.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+            body = item[0]
+        return json.loads(body)
+
+    def set(self, key, body):
+        """
+        缓存响应的JSON文本
+        :param key: 缓存键
+        :param body: 响应内容（bytes）
+        """
+        if not body or len(body) > self._maxbytes:
+            return
+        now = time.time()
+        expire_time = now + self._ttl
+        with self._lock:
+            self.__expire(now)
+            self.__remove(key)
+            self._cache[key] = (body, expire_time)
+            self._bytes += len(body)
+            heapq.heappush(self._expire_heap, (expire_time, next(self._seq), key))
+            while len(self._cache) > self._maxsize or self._bytes > self._maxbytes:
+                old_key, _ = next(iter(self._cache.items()))
+                self.__remove(old_key)
+                self._evictions += 1
+            # 被淘汰或覆盖的条目在堆中留有过期记录，堆过大时重建
+            if len(self._expire_heap) > 2 * len(self._cache) + 64:
+                self._expire_heap = [(expire, seq, k) for expire, seq, k in self._expire_heap
+                                     if k in self._cache and self._cache[k][1] == expire]
+                heapq.heapify(self._expire_heap)
+
+    def __remove(self, key):
+        item = self._cache.pop(key, None)
+        if item:
+            self._bytes -= len(item[0])
+
+    def __expire(self, now):
+        while self._expire_heap and self._expire_heap[0][0] <= now:
+            expire_time, _, key = heapq.heappop(self._expire_heap)
+            item = self._cache.get(key)
+            # 只删除过期时间一致的条目，条目重新缓存后旧的过期记录失效
+            if item and item[1] == expire_time:
+                self.__remove(key)
+                self._expirations += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_heap = []
+            self._bytes = 0
+
+    def get_statistics(self):
+        """
+        查询缓存统计信息
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._maxsize,
+                "bytes": self._bytes,
+                "maxbytes": self._maxbytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits * 100 / total, 1) if total else 0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
@@ -24,8 +24,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["companies"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["companies"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def collections(self, params):
         """
@@ -33,8 +33,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["collections"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["collections"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def keywords(self, params):
         """
@@ -42,8 +42,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["keywords"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["keywords"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def movies(self, params):
         """
@@ -51,8 +51,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["movies"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["movies"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def multi(self, params):
         """
@@ -60,8 +60,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["multi"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["multi"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def people(self, params):
         """
@@ -69,8 +69,8 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["people"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["people"], urlencode(params),
+                                        language=self.__get_language(params)))
 
     def tv_shows(self, params):
         """
@@ -78,14 +78,18 @@ class Search(TMDb):
         :param params:
         :return:
         """
-        self.__update_language(params)
-        return self._get_obj(self._call(self._urls["tv_shows"], urlencode(params)))
+        return self._get_obj(self._call(self._urls["tv_shows"], urlencode(params),
+                                        language=self.__get_language(params)))
 
-    def __update_language(self, params):
+    @staticmethod
+    def __get_language(params):
+        """
+        根据搜索关键字确定本次搜索使用的语种，关键字为空时返回None使用当前设置的语种
+        """
         if not isinstance(params, dict):
-            return
+            return None
         query = params.get("query", "") or ""
         if not StringUtils.is_string_and_not_empty(query):
-            return
+            return None
         is_chinese = StringUtils.is_chinese(query)
-        self.language = "zh" if is_chinese else "en"
+        return "zh" if is_chinese else "en"
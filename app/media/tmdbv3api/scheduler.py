@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """
+    请求优先级，数值越小越优先
+    """
+    # 页面上的交互查询
+    INTERACTIVE = 0
+    # 未指定优先级的查询
+    NORMAL = 1
+    # 订阅刷新、媒体库同步、刮削等后台批量任务
+    BACKGROUND = 2
+
+
+class RateScheduler(object):
+    """
+    TMDB请求调度器：令牌桶限制所有线程的总请求速率，令牌不足时按优先级排队，
+    同优先级先到先得；服务端要求限速时暂停发放令牌，而不是让各线程各自休眠
+    """
+
+    def __init__(self, rate=40, burst=40):
+        """
+        :param rate: 每秒发放的令牌数，小于等于0时不限速
+        :param burst: 令牌桶容量
+        """
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        # (优先级, 序号)
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {priority: {"waiting": 0, "granted": 0, "wait_time": 0.0, "max_wait": 0.0}
+                       for priority in Priority}
+
+    def configure(self, rate, burst=None):
+        """
+        修改速率和令牌桶容量
+        """
+        with self._cond:
+            self.__refill(time.monotonic())
+            self._rate = rate
+            self._burst = max(burst or rate or 1, 1)
+            self._tokens = min(self._tokens, self._burst)
+            self._cond.notify_all()
+
+    def get_priority(self):
+        """
+        当前线程的请求优先级
+        """
+        priority = getattr(self._local, "priority", None)
+        return Priority.NORMAL if priority is None else priority
+
+    def set_priority(self, priority: Priority = None):
+        """
+        设置当前线程后续请求的优先级，为空时恢复默认
+        """
+        self._local.priority = priority
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        """
+        在代码块内以指定优先级发起请求，可嵌套，也可作为装饰器使用
+        """
+        old_priority = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = old_priority
+
+    def __refill(self, now):
+        if now <= self._updated:
+            # 暂停期间不发放令牌
+            return
+        if self._rate > 0:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, priority: Priority = None):
+        """
+        获取一个令牌，没有令牌或有更高优先级的请求在等待时阻塞
+        :return: 等待的秒数
+        """
+        priority = self.get_priority() if priority is None else priority
+        stats = self._stats[priority]
+        start = time.monotonic()
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            stats["waiting"] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.__refill(now)
+                    if self._waiters[0] == entry:
+                        if now < self._paused_until:
+                            timeout = self._paused_until - now
+                        elif self._rate <= 0 or self._tokens >= 1:
+                            break
+                        else:
+                            timeout = (1 - self._tokens) / self._rate
+                    else:
+                        # 排在后面的请求等待前面的请求拿到令牌后被唤醒
+                        timeout = None
+                    self._cond.wait(timeout)
+                if self._rate > 0:
+                    self._tokens -= 1
+                heapq.heappop(self._waiters)
+            finally:
+                stats["waiting"] -= 1
+                if entry in self._waiters:
+                    # 等待中被中断
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            wait_time = time.monotonic() - start
+            stats["granted"] += 1
+            stats["wait_time"] += wait_time
+            stats["max_wait"] = max(stats["max_wait"], wait_time)
+        return wait_time
+
+    def pause(self, seconds):
+        """
+        服务端要求限速时暂停发放令牌
+        """
+        with self._cond:
+            now = time.monotonic()
+            self.__refill(now)
+            self._paused_until = max(self._paused_until, now + max(seconds, 0))
+            # 暂停结束后从空桶开始发放令牌
+            self._tokens = 0
+            self._updated = max(self._updated, self._paused_until)
+            self._cond.notify_all()
+
+    def get_statistics(self):
+        """
+        查询各优先级的排队和等待统计
+        """
+        with self._cond:
+            self.__refill(time.monotonic())
+            lanes = {}
+            for priority, stats in self._stats.items():
+                lanes[priority.name.lower()] = {
+                    "waiting": stats["waiting"],
+                    "granted": stats["granted"],
+                    "avg_wait": round(stats["wait_time"] * 1000 / stats["granted"], 1) if stats["granted"] else 0,
+                    "max_wait": round(stats["max_wait"] * 1000, 1)
+                }
+            return {
+                "rate": self._rate,
+                "burst": self._burst,
+                "tokens": round(self._tokens, 1),
+                "paused": max(round(self._paused_until - time.monotonic(), 1), 0),
+                "lanes": lanes
+            }
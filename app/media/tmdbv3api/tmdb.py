@@ -1,137 +1,182 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import os
+import threading
 import time
-from functools import lru_cache
+from typing import NamedTuple
 
 import requests
 import requests.exceptions
+from requests.adapters import HTTPAdapter
 
 from .as_obj import AsObj
+from .cache import ResponseCache
 from .exceptions import TMDbException
-from app.utils.commons import ttl_lru
+from .scheduler import RateScheduler, Priority
 
 logger = logging.getLogger(__name__)
 
 
+# 当前线程使用的语种
+_local = threading.local()
+
+
+class TMDbConfig(NamedTuple):
+    """
+    TMDB客户端配置，创建后不可修改，多个线程可安全共享
+    """
+    api_key: str = None
+    domain: str = "https://api.themoviedb.org/3"
+    language: str = "zh"
+    # 代理，((协议, 地址), ...)
+    proxies: tuple = ()
+    include_adult: bool = False
+    cache: bool = True
+    debug: bool = False
+    wait_on_rate_limit: bool = True
+
+    @staticmethod
+    def parse_proxies(proxies):
+        """
+        将代理配置字典转换为配置中的代理元组，忽略未配置的协议
+        """
+        if not proxies:
+            return ()
+        return tuple(sorted((key, value) for key, value in proxies.items() if value))
+
+    @property
+    def proxies_dict(self):
+        return dict(self.proxies) if self.proxies else None
+
+
 class TMDb(object):
-    TMDB_API_KEY = "TMDB_API_KEY"
-    TMDB_LANGUAGE = "TMDB_LANGUAGE"
-    TMDB_WAIT_ON_RATE_LIMIT = "TMDB_WAIT_ON_RATE_LIMIT"
-    TMDB_DEBUG_ENABLED = "TMDB_DEBUG_ENABLED"
-    TMDB_CACHE_ENABLED = "TMDB_CACHE_ENABLED"
-    TMDB_PROXIES = "TMDB_PROXIES"
-    TMDB_DOMAIN = "TMDB_DOMAIN"
-    TMDB_INCLUDE_ADULT = "TMDB_INCLUDE_ADULT"
-    REQUEST_CACHE_MAXSIZE = 512
-
-    def __init__(self, obj_cached=True, session=None):
-        self._session = requests.Session() if session is None else session
-        self._remaining = 40
-        self._reset = None
+    REQUEST_CACHE_MAXSIZE = 2048
+    REQUEST_CACHE_MAXBYTES = 64 * 1024 * 1024
+    REQUEST_CACHE_TTL = 60 * 60 * 6
+    # 未指定配置的实例使用的默认配置
+    _default_config = TMDbConfig()
+    # 所有实例共享的HTTP会话，保持长连接
+    _shared_session = None
+    _session_lock = threading.Lock()
+    # 所有实例共享的响应缓存
+    _response_cache = ResponseCache(ttl=REQUEST_CACHE_TTL,
+                                    maxsize=REQUEST_CACHE_MAXSIZE,
+                                    maxbytes=REQUEST_CACHE_MAXBYTES)
+    # 所有实例共享的请求调度器，限制总请求速率
+    _scheduler = RateScheduler()
+
+    def __init__(self, obj_cached=True, session=None, config: TMDbConfig = None):
+        self._session = self.__get_shared_session() if session is None else session
         self.obj_cached = obj_cached
-        if os.environ.get(self.TMDB_LANGUAGE) is None:
-            os.environ[self.TMDB_LANGUAGE] = "zh"
-        if not os.environ.get(self.TMDB_DOMAIN):
-            os.environ[self.TMDB_DOMAIN] = "https://api.themoviedb.org/3"
+        self._config = config or TMDb._default_config
+        # 最近一次请求的分页信息，按线程保存
+        self._result_info = threading.local()
+
+    @classmethod
+    def __get_shared_session(cls):
+        with cls._session_lock:
+            if not cls._shared_session:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._shared_session = session
+            return cls._shared_session
+
+    @classmethod
+    def set_default_config(cls, config: TMDbConfig):
+        """
+        设置默认配置
+        """
+        cls._default_config = config
+
+    @classmethod
+    def set_rate_limit(cls, rate, burst=None):
+        """
+        设置所有实例每秒最多发起的请求数，0为不限制
+        """
+        cls._scheduler.configure(rate, burst)
+
+    @classmethod
+    def priority(cls, priority: Priority):
+        """
+        在代码块内以指定优先级发起请求，也可作为装饰器使用
+        with TMDb.priority(Priority.BACKGROUND):
+            ...
+        """
+        return cls._scheduler.priority(priority)
+
+    @classmethod
+    def set_priority(cls, priority: Priority = None):
+        """
+        设置当前线程后续请求的优先级，为空时恢复默认
+        """
+        cls._scheduler.set_priority(priority)
+
+    @classmethod
+    def get_scheduler_statistics(cls):
+        """
+        查询请求调度的排队和等待统计
+        """
+        return cls._scheduler.get_statistics()
+
+    @property
+    def config(self):
+        return self._config
 
     @property
     def page(self):
-        return os.environ["page"]
+        return getattr(self._result_info, "page", None)
 
     @property
     def total_results(self):
-        return os.environ["total_results"]
+        return getattr(self._result_info, "total_results", None)
 
     @property
     def total_pages(self):
-        return os.environ["total_pages"]
+        return getattr(self._result_info, "total_pages", None)
 
     @property
     def api_key(self):
-        return os.environ.get(self.TMDB_API_KEY)
+        return self._config.api_key
 
     @property
     def domain(self):
-        return os.environ.get(self.TMDB_DOMAIN)
-
-    @domain.setter
-    def domain(self, domain):
-        os.environ[self.TMDB_DOMAIN] = str(domain or '')
+        return self._config.domain
 
     @property
     def proxies(self):
-        return os.environ.get(self.TMDB_PROXIES)
-
-    @proxies.setter
-    def proxies(self, proxies):
-        if proxies:
-            proxies_strs = []
-            for key, value in proxies.items():
-                if not value:
-                    continue
-                proxies_strs.append("'%s': '%s'" % (key, value))
-            if proxies_strs:
-                os.environ[self.TMDB_PROXIES] = "{%s}" % ",".join(proxies_strs)
-            else:
-                os.environ[self.TMDB_PROXIES] = 'None'
-
-    @api_key.setter
-    def api_key(self, api_key):
-        os.environ[self.TMDB_API_KEY] = str(api_key)
+        return self._config.proxies_dict
 
     @property
     def language(self):
-        return os.environ.get(self.TMDB_LANGUAGE)
+        """
+        当前线程设置的语种，未设置时使用配置中的默认语种
+        """
+        return getattr(_local, "language", None) or self._config.language
 
     @language.setter
     def language(self, language):
-        os.environ[self.TMDB_LANGUAGE] = language
+        """
+        设置当前线程后续请求使用的语种，不影响其它线程
+        """
+        _local.language = language
 
     @property
     def include_adult(self):
-        if os.environ.get(self.TMDB_INCLUDE_ADULT) == "True" or os.environ.get(self.TMDB_INCLUDE_ADULT) == True:
-            return "true"
-        else:
-            return "false"
-
-    @include_adult.setter
-    def include_adult(self, include_adult):
-        os.environ[self.TMDB_INCLUDE_ADULT] = str(include_adult)
+        return "true" if self._config.include_adult else "false"
 
     @property
     def wait_on_rate_limit(self):
-        if os.environ.get(self.TMDB_WAIT_ON_RATE_LIMIT) == "False":
-            return False
-        else:
-            return True
-
-    @wait_on_rate_limit.setter
-    def wait_on_rate_limit(self, wait_on_rate_limit):
-        os.environ[self.TMDB_WAIT_ON_RATE_LIMIT] = str(wait_on_rate_limit)
+        return self._config.wait_on_rate_limit
 
     @property
     def debug(self):
-        if os.environ.get(self.TMDB_DEBUG_ENABLED) == "True":
-            return True
-        else:
-            return False
-
-    @debug.setter
-    def debug(self, debug):
-        os.environ[self.TMDB_DEBUG_ENABLED] = str(debug)
+        return self._config.debug
 
     @property
     def cache(self):
-        if os.environ.get(self.TMDB_CACHE_ENABLED) == "False":
-            return False
-        else:
-            return True
-
-    @cache.setter
-    def cache(self, cache):
-        os.environ[self.TMDB_CACHE_ENABLED] = str(cache)
+        return self._config.cache
 
     @staticmethod
     def _get_obj(result, key="results", all_details=False):
@@ -142,22 +187,59 @@ class TMDb(object):
         else:
             return [AsObj(**res) for res in result[key]]
 
-    @staticmethod
-    @lru_cache(maxsize=REQUEST_CACHE_MAXSIZE)
-    def cached_request(method, url, data, proxies):
-        return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
+    def _request(self, method, url, data=None):
+        return self._session.request(method, url, data=data, proxies=self.proxies, timeout=10, verify=False)
 
     @staticmethod
-    @ttl_lru(seconds=60 * 60 * 6, maxsize=REQUEST_CACHE_MAXSIZE)
-    def ttl_cached_request(method, url, data, proxies):
-        return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
+    def __get_retry_after(headers):
+        """
+        计算服务端要求等待的秒数
+        """
+        if "Retry-After" in headers:
+            try:
+                return max(int(headers["Retry-After"]), 1)
+            except ValueError:
+                pass
+        if "X-RateLimit-Reset" in headers:
+            return max(int(headers["X-RateLimit-Reset"]) - int(time.time()), 1)
+        return 1
+
+    def __send(self, method, url, data=None):
+        """
+        从调度器获取令牌后发送请求，服务端要求限速时暂停调度器，被拒绝的请求排队重试
+        """
+        req = None
+        for _ in range(3):
+            self._scheduler.acquire()
+            req = self._request(method, url, data)
+            remaining = req.headers.get("X-RateLimit-Remaining")
+            if req.status_code != 429 and (remaining is None or int(remaining) > 0):
+                return req
+            sleep_time = self.__get_retry_after(req.headers)
+            if not self.wait_on_rate_limit:
+                raise TMDbException("Rate limit reached. Try again in %d seconds." % sleep_time)
+            logger.warning("Rate limit reached. Pausing requests for: %d" % sleep_time)
+            self._scheduler.pause(sleep_time)
+            if req.status_code != 429:
+                return req
+        return req
 
     def cache_clear(self):
-        return self.cached_request.cache_clear()
+        return self._response_cache.clear()
+
+    @classmethod
+    def get_cache_statistics(cls):
+        """
+        查询响应缓存统计信息
+        """
+        return cls._response_cache.get_statistics()
 
     def _call(
-            self, action, append_to_response, call_cached=True, method="GET", data=None
+            self, action, append_to_response, call_cached=True, method="GET", data=None, language=None
     ):
+        """
+        :param language: 本次请求使用的语种，为空时使用当前线程设置的语种
+        """
         if self.api_key is None or self.api_key == "":
             raise TMDbException("No API key found.")
 
@@ -167,49 +249,31 @@ class TMDb(object):
             self.api_key,
             self.include_adult,
             append_to_response,
-            self.language,
+            language or self.language,
         )
 
-        if self.cache and self.obj_cached and call_cached and method != "POST":
-            req = self.ttl_cached_request(method, url, data, self.proxies)
-        else:
-            req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10, verify=False)
-
-        headers = req.headers
-
-        if "X-RateLimit-Remaining" in headers:
-            self._remaining = int(headers["X-RateLimit-Remaining"])
-
-        if "X-RateLimit-Reset" in headers:
-            self._reset = int(headers["X-RateLimit-Reset"])
-
-        if self._remaining < 1:
-            current_time = int(time.time())
-            sleep_time = self._reset - current_time
-
-            if self.wait_on_rate_limit:
-                logger.warning("Rate limit reached. Sleeping for: %d" % sleep_time)
-                time.sleep(abs(sleep_time))
-                self._call(action, append_to_response, call_cached, method, data)
-            else:
-                raise TMDbException(
-                    "Rate limit reached. Try again in %d seconds." % sleep_time
-                )
+        use_cache = self.cache and self.obj_cached and call_cached and method != "POST" and data is None
+        json = self._response_cache.get((method, url)) if use_cache else None
+        if json is None:
+            req = self.__send(method, url, data)
+            json = req.json()
 
-        json = req.json()
+            # 只缓存成功的响应
+            if use_cache and req.status_code == 200:
+                self._response_cache.set((method, url), req.content)
 
         if "page" in json:
-            os.environ["page"] = str(json["page"])
+            self._result_info.page = json["page"]
 
         if "total_results" in json:
-            os.environ["total_results"] = str(json["total_results"])
+            self._result_info.total_results = json["total_results"]
 
         if "total_pages" in json:
-            os.environ["total_pages"] = str(json["total_pages"])
+            self._result_info.total_pages = json["total_pages"]
 
         if self.debug:
             logger.info(json)
-            logger.info(self.cached_request.cache_info())
+            logger.info(self.get_cache_statistics())
 
         if "errors" in json:
             raise TMDbException(json["errors"])
@@ -6,6 +6,7 @@ from app.conf import SystemConfig
 from app.db import MediaDb
 from app.helper import ProgressHelper, SubmoduleHelper
 from app.media import Media
+from app.media.tmdbv3api import TMDb, Priority
 from app.message import Message
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
@@ -214,6 +215,7 @@ class MediaServer:
             return []
         return self.server.get_tv_episodes(item_id=item_id)
 
+    @TMDb.priority(Priority.BACKGROUND)
     def sync_mediaserver(self):
         """
         同步媒体库所有数据到本地数据库
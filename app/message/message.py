@@ -7,6 +7,7 @@ import log
 from app.conf import ModuleConf
 from app.helper import DbHelper, SubmoduleHelper
 from app.message.message_center import MessageCenter
+from app.message.message_queue import MessageQueue
 from app.utils import StringUtils, ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import SearchType, MediaType
@@ -23,6 +24,8 @@ class Message(object):
     _active_interactive_clients = {}
     _client_configs = {}
     _domain = None
+    # 后台发送队列
+    _queue = None
 
     def __init__(self):
         self._message_schemas = SubmoduleHelper.import_submodules(
@@ -30,6 +33,7 @@ class Message(object):
             filter_func=lambda _, obj: hasattr(obj, 'schema')
         )
         log.debug(f"【Message】加载消息服务：{self._message_schemas}")
+        self._queue = MessageQueue(sender=self.__deliver)
         self.init_config()
 
     def init_config(self):
@@ -100,7 +104,44 @@ class Message(object):
             log.error(f"【Message】{ctype} 发送测试消息失败：%s" % ret_msg)
         return state
 
-    def __sendmsg(self, client, title, text="", image="", url="", user_id=""):
+    def __sendmsg(self, client, title, text="", image="", url="", user_id="", digest_key=None, digest_title=None):
+        """
+        通用消息发送，放入消息端的后台队列后立即返回
+        :param client: 消息端
+        :param title: 消息标题
+        :param text: 消息内容
+        :param image: 图片URL
+        :param url: 消息跳转地址
+        :param user_id: 用户ID，如有则只发给这个用户
+        :param digest_key: 合并的key，短时间内相同key的消息汇总为一条发送
+        :param digest_title: 汇总消息的标题
+        :return: 是否已放入队列
+        """
+        if not client or not client.get('client'):
+            return None
+        self._queue.put(client=client,
+                        message={
+                            "title": title,
+                            "text": text,
+                            "image": image,
+                            "url": url,
+                            "user_id": user_id
+                        },
+                        digest_key=digest_key,
+                        digest_title=digest_title)
+        return True
+
+    def __deliver(self, client, message):
+        """
+        在后台队列中实际发送消息
+        """
+        if message.get("medias") is not None:
+            return self.__deliver_list_msg(client=client, **message)
+        # 失败重试时传入同一消息，记录已发送的分段，从未发送的分段继续
+        message.setdefault("progress", {})
+        return self.__deliver_msg(client=client, **message)
+
+    def __deliver_msg(self, client, title, text="", image="", url="", user_id="", progress=None):
         """
         通用消息发送
         :param client: 消息端
@@ -109,6 +150,7 @@ class Message(object):
         :param image: 图片URL
         :param url: 消息跳转地址
         :param user_id: 用户ID，如有则只发给这个用户
+        :param progress: 发送进度，记录已发送的分段数，重试时跳过已发送的分段
         :return: 发送状态、错误信息
         """
         if not client or not client.get('client'):
@@ -133,20 +175,25 @@ class Message(object):
             texts = StringUtils.split_text(text, max_length)
         else:
             texts = [text]
-        # 循环发送
-        for txt in texts:
-            if not title:
-                title = txt
+        if progress is None:
+            progress = {}
+        # 循环发送，标题只随第一段发送
+        for i, txt in enumerate(texts):
+            if i < progress.get("sent", 0):
+                continue
+            seg_title = title if i == 0 else None
+            if not seg_title:
+                seg_title = txt
                 txt = ""
-            state, ret_msg = client.get('client').send_msg(title=title,
+            state, ret_msg = client.get('client').send_msg(title=seg_title,
                                                            text=txt,
                                                            image=image,
                                                            url=url,
                                                            user_id=user_id)
-            title = None
             if not state:
                 log.error(f"【Message】{cname} 消息发送失败：%s" % ret_msg)
                 return state
+            progress["sent"] = i + 1
         return True
 
     def send_channel_msg(self, channel, title, text="", image="", url="", user_id=""):
@@ -177,6 +224,20 @@ class Message(object):
         return False
 
     def __send_list_msg(self, client, medias, user_id, title):
+        """
+        发送选择类消息，放入消息端的后台队列后立即返回
+        """
+        if not client or not client.get('client'):
+            return None
+        self._queue.put(client=client,
+                        message={
+                            "medias": medias,
+                            "user_id": user_id,
+                            "title": title
+                        })
+        return True
+
+    def __deliver_list_msg(self, client, medias, user_id, title):
         """
         发送选择类消息
         """
@@ -344,7 +405,10 @@ class Message(object):
                         title=msg_title,
                         text=msg_str,
                         image=item_info.get_message_image(),
-                        url='history')
+                        url='history',
+                        digest_key=f"transfer_tv:{item_info.tmdb_id or item_info.get_title_string()}"
+                                   f":{item_info.get_season_string()}",
+                        digest_title=f"{item_info.get_title_string()} {item_info.get_season_string()} 已入库")
 
     def send_simplify_transfer_movie_message(self, in_from: Enum, media_info, exist_filenum, category_flag):
         """
@@ -452,7 +516,10 @@ class Message(object):
                         title=msg_title,
                         text=msg_str,
                         image=item_info.get_message_image(),
-                        url='history')
+                        url='history',
+                        digest_key=f"transfer_tv:{item_info.tmdb_id or item_info.get_title_string()}"
+                                   f":{item_info.get_season_string()}",
+                        digest_title=f"{item_info.get_title_string()} {item_info.get_season_string()} 已入库")
 
     def send_download_fail_message(self, item, error_msg):
         """
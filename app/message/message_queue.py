@@ -0,0 +1,168 @@
+import time
+from collections import OrderedDict
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+import log
+from app.utils import ExceptionUtils
+
+
+class _ClientWorker(object):
+    """
+    单个消息端的发送线程，按顺序发送，失败时退避重试，可合并的消息在时间窗口内汇总为一条
+    """
+
+    def __init__(self, name, sender, retry_times, retry_delay, digest_window):
+        self._name = name
+        self._sender = sender
+        self._retry_times = retry_times
+        self._retry_delay = retry_delay
+        self._digest_window = digest_window
+        self._queue = Queue()
+        # 汇总中的消息：key -> {client, title, messages, deadline}
+        self._digests = OrderedDict()
+        self._lock = Lock()
+        self._sent = 0
+        self._failed = 0
+        self._retries = 0
+        self._digested = 0
+        self._thread = Thread(target=self.__run, name=f"Message-{name}", daemon=True)
+        self._thread.start()
+
+    def put(self, client, message, digest_key=None, digest_title=None):
+        if not digest_key or self._digest_window <= 0:
+            self._queue.put((client, message))
+            return
+        with self._lock:
+            digest = self._digests.get(digest_key)
+            if digest:
+                digest["client"] = client
+                digest["messages"].append(message)
+                self._digested += 1
+            else:
+                self._digests[digest_key] = {
+                    "client": client,
+                    "title": digest_title,
+                    "messages": [message],
+                    "deadline": time.time() + self._digest_window
+                }
+
+    def __run(self):
+        while True:
+            try:
+                client, message = self._queue.get(block=True, timeout=self.__next_timeout())
+                self.__deliver(client, message)
+            except Empty:
+                pass
+            self.__flush_digests()
+
+    def __next_timeout(self):
+        with self._lock:
+            if not self._digests:
+                return 1
+            deadline = min(digest.get("deadline") for digest in self._digests.values())
+        return min(max(deadline - time.time(), 0.01), 1)
+
+    def __flush_digests(self):
+        now = time.time()
+        with self._lock:
+            keys = [key for key, digest in self._digests.items() if digest.get("deadline") <= now]
+            digests = [self._digests.pop(key) for key in keys]
+        for digest in digests:
+            messages = digest.get("messages")
+            if len(messages) == 1:
+                message = messages[0]
+            else:
+                message = dict(messages[0])
+                message.update({
+                    "title": "%s（%s条）" % (digest.get("title") or messages[0].get("title"), len(messages)),
+                    "text": "\n".join(msg.get("title") for msg in messages)
+                })
+            self.__deliver(digest.get("client"), message)
+
+    def __deliver(self, client, message):
+        for i in range(self._retry_times + 1):
+            try:
+                state = self._sender(client, message)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                state = False
+            # 消息端不可用时不重试
+            if state or state is None:
+                self._sent += 1 if state else 0
+                return state
+            if i < self._retry_times:
+                self._retries += 1
+                time.sleep(self._retry_delay * (2 ** i))
+        self._failed += 1
+        log.error(f"【Message】{self._name} 消息发送失败，已重试 {self._retry_times} 次：{message.get('title')}")
+        return False
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                "name": self._name,
+                "queued": self._queue.qsize(),
+                "digesting": sum(len(digest.get("messages")) for digest in self._digests.values()),
+                "sent": self._sent,
+                "failed": self._failed,
+                "retries": self._retries,
+                "digested": self._digested
+            }
+
+
+class MessageQueue(object):
+    """
+    消息发送队列：每个消息端一个后台发送线程，调用方不等待发送结果，
+    慢或超时的消息端不影响其它消息端和调用方
+    """
+    # 失败重试次数
+    RETRY_TIMES = 3
+    # 首次重试等待秒数，之后每次翻倍
+    RETRY_DELAY = 5
+    # 可合并消息的汇总时间窗口（秒）
+    DIGEST_WINDOW = 30
+
+    def __init__(self, sender, retry_times=RETRY_TIMES, retry_delay=RETRY_DELAY, digest_window=DIGEST_WINDOW):
+        """
+        :param sender: 实际发送消息的函数，参数为 消息端、消息，返回 True成功/False失败/None消息端不可用
+        :param retry_times: 失败重试次数
+        :param retry_delay: 首次重试等待秒数
+        :param digest_window: 可合并消息的汇总时间窗口（秒），0为不合并
+        """
+        self._sender = sender
+        self._retry_times = retry_times
+        self._retry_delay = retry_delay
+        self._digest_window = digest_window
+        self._workers = {}
+        self._lock = Lock()
+
+    def put(self, client, message: dict, digest_key=None, digest_title=None):
+        """
+        消息入队
+        :param client: 消息端
+        :param message: 消息内容
+        :param digest_key: 合并的key，时间窗口内相同key的消息汇总为一条
+        :param digest_title: 汇总消息的标题
+        """
+        if not client:
+            return
+        cid = str(client.get("id"))
+        with self._lock:
+            worker = self._workers.get(cid)
+            if not worker:
+                worker = _ClientWorker(name=client.get("name") or cid,
+                                       sender=self._sender,
+                                       retry_times=self._retry_times,
+                                       retry_delay=self._retry_delay,
+                                       digest_window=self._digest_window)
+                self._workers[cid] = worker
+        worker.put(client, message, digest_key=digest_key, digest_title=digest_title)
+
+    def get_statistics(self):
+        """
+        查询各消息端的发送统计
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+        return [worker.get_statistics() for worker in workers]
@@ -0,0 +1,203 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+import log
+from app.utils import ExceptionUtils
+from app.utils.types import EventType
+
+# 默认合并的事件：只是触发一次任务，队列中已有相同的事件时无需重复执行
+DEFAULT_COALESCE_EVENTS = [
+    EventType.PluginReload,
+    EventType.DoubanSync,
+    EventType.AutoSeedStart,
+    EventType.RefreshMediaServer,
+    EventType.SiteSignin
+]
+
+
+class _HandlerStatistics(object):
+    """
+    事件处理函数的耗时统计
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_time": round(self.total_time * 1000 / self.count, 1) if self.count else 0,
+            "max_time": round(self.max_time * 1000, 1)
+        }
+
+
+class _PluginWorker(object):
+    """
+    单个插件的事件队列，按到达顺序逐个处理
+    """
+
+    def __init__(self, pid, runner, maxsize, timeout, coalesce_events):
+        self._pid = pid
+        self._runner = runner
+        self._timeout = timeout
+        self._coalesce_events = coalesce_events
+        self._queue = Queue(maxsize=maxsize)
+        # 队列中等待处理的可合并事件
+        self._pending = set()
+        self._lock = Lock()
+        self._active = True
+        # 超时的处理函数无法中止，只用一个线程处理，超时后等待其完成再处理后续事件
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"PluginHandler-{pid}")
+        self._thread = Thread(target=self.__run, name=f"PluginEvent-{pid}", daemon=True)
+        self._handlers = {}
+        self._dropped = 0
+        self._coalesced = 0
+        self._timeouts = 0
+        self._errors = 0
+        # 处理函数超时未返回，队列暂停处理
+        self._stalled = False
+        self._thread.start()
+
+    def __coalesce_key(self, method, event):
+        if event.event_type not in self._coalesce_events:
+            return None
+        return method, event.event_type, repr(sorted((event.event_data or {}).items(), key=lambda x: str(x[0])))
+
+    def put(self, method, event):
+        """
+        事件入队，队列中已有相同的可合并事件时忽略，队列已满时丢弃
+        """
+        key = self.__coalesce_key(method, event)
+        with self._lock:
+            if key and key in self._pending:
+                self._coalesced += 1
+                return False
+            try:
+                self._queue.put_nowait((method, event, key))
+            except Full:
+                self._dropped += 1
+                log.warn(f"【Plugin】插件 {self._pid} 事件队列已满，丢弃事件：{event.event_type}")
+                return False
+            if key:
+                self._pending.add(key)
+        return True
+
+    def __run(self):
+        while self._active:
+            try:
+                method, event, key = self._queue.get(block=True, timeout=1)
+            except Empty:
+                continue
+            if key:
+                with self._lock:
+                    self._pending.discard(key)
+            self.__handle(method, event)
+
+    def __handle(self, method, event):
+        start = time.time()
+        future = self._executor.submit(self._runner, self._pid, method, event)
+        if not wait([future], timeout=self._timeout).done:
+            with self._lock:
+                self._timeouts += 1
+                self._stalled = True
+            log.warn(f"【Plugin】插件 {self._pid} 处理事件 {event.event_type} 超过 {self._timeout} 秒，"
+                     f"等待处理完成后再处理后续事件")
+        try:
+            future.result()
+        except Exception as err:
+            self._errors += 1
+            ExceptionUtils.exception_traceback(err)
+            log.error(f"【Plugin】插件 {self._pid} 处理事件 {event.event_type} 出错：{str(err)}")
+        with self._lock:
+            self._handlers.setdefault(method, _HandlerStatistics()).record(time.time() - start)
+            if self._stalled:
+                self._stalled = False
+                log.info(f"【Plugin】插件 {self._pid} 处理事件 {event.event_type} 完成，继续处理后续事件")
+
+    def stop(self):
+        self._active = False
+        # 超时未返回的处理函数无法中止，不等待其完成
+        if not self._stalled:
+            self._thread.join(timeout=self._timeout)
+        self._executor.shutdown(wait=False)
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                "pid": self._pid,
+                "queued": self._queue.qsize(),
+                "dropped": self._dropped,
+                "coalesced": self._coalesced,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+                "stalled": self._stalled,
+                "handlers": {method: stat.to_dict() for method, stat in self._handlers.items()}
+            }
+
+
+class EventBus(object):
+    """
+    插件事件分发：每个插件一个有界队列和处理线程，慢插件不影响其它插件，同一插件内按顺序处理
+    """
+    # 每个插件队列的最大长度
+    QUEUE_MAXSIZE = 100
+    # 单个事件处理的超时时间（秒）
+    HANDLER_TIMEOUT = 600
+
+    def __init__(self, runner, maxsize=QUEUE_MAXSIZE, timeout=HANDLER_TIMEOUT, coalesce_events=None):
+        """
+        :param runner: 处理事件的函数，参数为 插件ID、方法名、事件
+        :param maxsize: 每个插件队列的最大长度
+        :param timeout: 单个事件处理的超时时间（秒）
+        :param coalesce_events: 可合并的事件类型
+        """
+        self._runner = runner
+        self._maxsize = maxsize
+        self._timeout = timeout
+        if coalesce_events is None:
+            coalesce_events = DEFAULT_COALESCE_EVENTS
+        self._coalesce_events = {etype.value for etype in coalesce_events}
+        self._workers = {}
+        self._lock = Lock()
+
+    def dispatch(self, pid, method, event):
+        """
+        将事件分发到插件的队列
+        """
+        with self._lock:
+            worker = self._workers.get(pid)
+            if not worker:
+                worker = _PluginWorker(pid=pid,
+                                       runner=self._runner,
+                                       maxsize=self._maxsize,
+                                       timeout=self._timeout,
+                                       coalesce_events=self._coalesce_events)
+                self._workers[pid] = worker
+        return worker.put(method, event)
+
+    def stop(self):
+        """
+        停止所有插件的处理线程，未处理的事件丢弃
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers = {}
+        for worker in workers:
+            worker.stop()
+
+    def get_statistics(self):
+        """
+        查询各插件的队列长度和处理耗时
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+        return [worker.get_statistics() for worker in workers]
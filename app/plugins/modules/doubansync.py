@@ -10,6 +10,7 @@ from jinja2 import Template
 from app.downloader import Downloader
 from app.media import DouBan
 from app.media.meta import MetaInfo
+from app.media.tmdbv3api import TMDb, Priority
 from app.plugins import EventHandler
 from app.plugins.modules._base import _IPluginModule
 from app.searcher import Searcher
@@ -451,6 +452,7 @@ class DoubanSync(_IPluginModule):
         return self.delete_history(key=douban_id)
 
     @EventHandler.register(EventType.DoubanSync)
+    @TMDb.priority(Priority.BACKGROUND)
     def sync(self, event=None):
         """
         同步豆瓣数据
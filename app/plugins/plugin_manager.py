@@ -5,6 +5,7 @@ from threading import Thread
 import log
 from app.conf import SystemConfig
 from app.helper import SubmoduleHelper
+from app.plugins.event_bus import EventBus
 from app.plugins.event_manager import EventManager
 from app.utils import SystemUtils, PathUtils, ImageUtils
 from app.utils.commons import singleton
@@ -33,6 +34,8 @@ class PluginManager:
     _config_key = "plugin.%s"
     # 事件处理线程
     _thread = None
+    # 插件事件分发
+    _eventbus = None
     # 开关
     _active = False
 
@@ -66,10 +69,20 @@ class PluginManager:
                 for handler in handlers:
                     try:
                         names = handler.__qualname__.split(".")
-                        self.run_plugin(names[0], names[1], event)
+                        # 分发到插件各自的队列，慢插件不阻塞其它插件
+                        self._eventbus.dispatch(names[0], names[1], event)
                     except Exception as e:
                         log.error(f"事件处理出错：{str(e)} - {traceback.format_exc()}")
 
+    def __handle_event(self, pid, method, event):
+        """
+        在插件的事件队列线程中处理事件，异常由事件分发记录
+        """
+        plugin = self._running_plugins.get(pid)
+        if not plugin or not hasattr(plugin, method):
+            return
+        getattr(plugin, method)(event)
+
     def start_service(self):
         """
         启动
@@ -78,6 +91,7 @@ class PluginManager:
         self.__load_plugins()
         # 将事件管理器设为启动
         self._active = True
+        self._eventbus = EventBus(runner=self.__handle_event)
         self._thread = Thread(target=self.__run)
         # 启动事件处理线程
         self._thread.start()
@@ -91,6 +105,9 @@ class PluginManager:
         # 等待事件处理线程退出
         if self._thread:
             self._thread.join()
+        # 停止插件事件队列
+        if self._eventbus:
+            self._eventbus.stop()
         # 停止所有插件
         self.__stop_plugins()
 
@@ -157,6 +174,14 @@ class PluginManager:
             if hasattr(plugin, "stop_service"):
                 plugin.stop_service()
 
+    def get_event_statistics(self):
+        """
+        查询各插件的事件队列长度和处理耗时
+        """
+        if not self._eventbus:
+            return []
+        return self._eventbus.get_statistics()
+
     def get_plugin_config(self, pid):
         """
         获取插件配置
@@ -1,4 +1,6 @@
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 import log
@@ -13,9 +15,176 @@ from app.subscribe import Subscribe
 from app.utils import ExceptionUtils, Torrent
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType
+from config import Config
 
 lock = Lock()
 
+# 默认同时下载RSS的站点数
+DEFAULT_RSS_FETCH_WORKERS = 8
+
+
+class _RssIndex(object):
+    """
+    单次RSS运行的订阅索引：按TMDBID、名称索引非模糊订阅，模糊订阅的正则合并为一个预筛选正则，
+    每个种子只需按原顺序校验少量候选订阅，匹配结果与逐个遍历订阅一致
+    """
+
+    def __init__(self, rss_movies, rss_tvs):
+        self.rss_movies = rss_movies
+        self.rss_tvs = rss_tvs
+        self._movies = self.__build(rss_movies, year_checked=True)
+        self._tvs = self.__build(rss_tvs)
+
+    @staticmethod
+    def __build(rss_infos, year_checked=False):
+        """
+        建立单个类型的索引：订阅列表、TMDBID索引、名称索引、必检订阅、模糊订阅、模糊预筛选正则、订阅站点
+        :param year_checked: 非模糊订阅是否按前后一年校验年份（电影）
+        """
+        subscribes = []
+        tmdbids = {}
+        names = {}
+        always = []
+        fuzzy = []
+        fuzzy_prefilter = []
+        sites = []
+        for pos, rss_info in enumerate((rss_infos or {}).values()):
+            name = rss_info.get('name')
+            year = rss_info.get('year')
+            tmdbid = rss_info.get('tmdbid')
+            regex = None
+            if not rss_info.get('fuzzy_match'):
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    tmdbids.setdefault(str(tmdbid), []).append(pos)
+                elif year_checked and year and not _RssIndex.__is_int(year):
+                    # 年份无法转换时校验会出错，与逐个遍历时一样对每个种子都校验
+                    always.append(pos)
+                else:
+                    names.setdefault(name, []).append(pos)
+            else:
+                # 正则错误时保留异常，校验到该订阅时再抛出
+                try:
+                    regex = re.compile(name, re.I)
+                except Exception as err:
+                    regex = err
+                # 合法且不含反向引用、内联标志的正则才能合并预筛选
+                prefilter = isinstance(regex, re.Pattern) \
+                    and not re.search(r"\\\d|\(\?P=|\(\?[a-zA-Z]", name)
+                fuzzy.append((pos, name, prefilter))
+                if prefilter:
+                    fuzzy_prefilter.append(name)
+            subscribes.append((rss_info, regex))
+            sites.append(frozenset(rss_info.get('rss_sites') or []))
+        combined = None
+        if fuzzy_prefilter:
+            try:
+                combined = re.compile("|".join(f"(?:{name})" for name in fuzzy_prefilter), re.I)
+            except re.error:
+                combined = None
+                fuzzy = [(pos, name, False) for pos, name, _ in fuzzy]
+        return subscribes, tmdbids, names, always, fuzzy, combined, sites
+
+    @staticmethod
+    def __is_int(value):
+        try:
+            int(value)
+            return True
+        except (TypeError, ValueError):
+            return False
+
+    def match(self, media_info):
+        """
+        查找种子命中的第一个订阅
+        :return: 是否命中, 命中的订阅信息
+        """
+        if media_info.type == MediaType.MOVIE and self.rss_movies:
+            index, is_movie = self._movies, True
+        elif self.rss_tvs:
+            index, is_movie = self._tvs, False
+        else:
+            return False, {}
+        subscribes, tmdbids, names, always, fuzzy, combined, sites = index
+        candidates = set(always)
+        candidates.update(tmdbids.get(str(media_info.tmdb_id)) or [])
+        candidates.update(names.get(media_info.title) or [])
+        if fuzzy:
+            search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
+            prefilter_match = bool(combined and combined.search(search_title))
+            candidates.update(pos for pos, name, prefilter in fuzzy
+                              if not prefilter or prefilter_match or name in search_title)
+        else:
+            search_title = None
+        for pos in sorted(candidates):
+            # 过滤订阅站点
+            if sites[pos] and media_info.site not in sites[pos]:
+                continue
+            rss_info, regex = subscribes[pos]
+            if is_movie:
+                matched = self.__match_movie(rss_info, regex, media_info, search_title)
+            else:
+                matched = self.__match_tv(rss_info, regex, media_info, search_title)
+            if matched:
+                return True, rss_info
+        return False, {}
+
+    @staticmethod
+    def __match_fuzzy(name, regex, search_title):
+        """
+        匹配关键字或正则表达式
+        """
+        if isinstance(regex, Exception):
+            raise regex
+        return regex.search(search_title) or name in search_title
+
+    @staticmethod
+    def __match_movie(rss_info, regex, media_info, search_title):
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        tmdbid = rss_info.get('tmdbid')
+        # 非模糊匹配
+        if not rss_info.get('fuzzy_match'):
+            # 有tmdbid时使用tmdbid匹配
+            if tmdbid and not tmdbid.startswith("DB:"):
+                return str(media_info.tmdb_id) == str(tmdbid)
+            # 豆瓣年份与tmdb取向不同
+            if year and str(media_info.year) not in [str(year),
+                                                     str(int(year) + 1),
+                                                     str(int(year) - 1)]:
+                return False
+            return name == media_info.title
+        # 模糊匹配年份
+        if year and str(year) != str(media_info.year):
+            return False
+        return _RssIndex.__match_fuzzy(name, regex, search_title)
+
+    @staticmethod
+    def __match_tv(rss_info, regex, media_info, search_title):
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        season = rss_info.get('season')
+        tmdbid = rss_info.get('tmdbid')
+        # 非模糊匹配
+        if not rss_info.get('fuzzy_match'):
+            if tmdbid and not tmdbid.startswith("DB:"):
+                if str(media_info.tmdb_id) != str(tmdbid):
+                    return False
+            else:
+                # 匹配年份，年份可以为空
+                if year and str(year) != str(media_info.year):
+                    return False
+                # 匹配名称
+                if name != media_info.title:
+                    return False
+            # 匹配季，季可以为空
+            return not season or season == media_info.get_season_string()
+        # 模糊匹配季，季可以为空
+        if season and season != "S00" and season != media_info.get_season_string():
+            return False
+        # 匹配年份
+        if year and str(year) != str(media_info.year):
+            return False
+        return _RssIndex.__match_fuzzy(name, regex, search_title)
+
 
 @singleton
 class Rss:
@@ -30,6 +199,11 @@ class Rss:
     subscribe = None
     message = None
 
+    _fetch_workers = DEFAULT_RSS_FETCH_WORKERS
+    # 各站点RSS下载耗时统计
+    _fetch_statistics = {}
+    _statistics_lock = Lock()
+
     def __init__(self):
         self.init_config()
 
@@ -43,6 +217,11 @@ class Rss:
         self.rsshelper = RssHelper()
         self.subscribe = Subscribe()
         self.message = Message()
+        fetch_workers = (Config().get_config('pt') or {}).get('rss_fetch_workers')
+        if str(fetch_workers).isdigit() and int(fetch_workers) > 0:
+            self._fetch_workers = int(fetch_workers)
+        else:
+            self._fetch_workers = DEFAULT_RSS_FETCH_WORKERS
 
     def rssdownload(self):
         """
@@ -100,7 +279,8 @@ class Rss:
             rss_download_torrents = []
             # 缺失的资源详情
             rss_no_exists = {}
-            # 遍历站点资源
+            # 需要下载RSS的站点
+            fetch_sites = []
             for site_info in rss_sites_info:
                 if not site_info:
                     continue
@@ -110,217 +290,293 @@ class Rss:
                 if check_sites and site_name not in check_sites:
                     continue
                 # 站点rss链接
-                rss_url = site_info.get("rssurl")
-                if not rss_url:
+                if not site_info.get("rssurl"):
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
                     continue
-                # 站点信息
-                site_id = site_info.get("id")
-                site_cookie = site_info.get("cookie")
-                site_ua = site_info.get("ua")
-                site_apikey = site_info.get("apikey")
-                # 是否解析种子详情
-                site_parse = site_info.get("parse")
-                # 是否使用代理
-                site_proxy = site_info.get("proxy")
-                # 使用的规则
-                site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
-                log.info(f"【Rss】正在处理：{site_name}")
-                if site_info.get("pri"):
-                    site_order = 100 - int(site_info.get("pri"))
-                else:
-                    site_order = 0
-                rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
-                if rss_acticles is None:
-                    # RSS链接过期
-                    log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
-                    # 发送消息
-                    self.message.send_site_message(title="【RSS链接过期提醒】",
-                                                   text=f"站点：{site_name}\n"
-                                                        f"链接：{rss_url}")
+                # 站点流控，只检查不计数，下载种子时再计数
+                if self.sites.check_ratelimit(site_info.get("id"), peek=True):
+                    log.info(f"【Rss】{site_name} 触发流控，跳过...")
                     continue
-                if not rss_acticles:
-                    log.warn(f"【Rss】{site_name} 未下载到数据")
+                fetch_sites.append(site_info)
+            if not fetch_sites:
+                return
+            # 订阅索引，本次运行的所有种子共用
+            rss_index = _RssIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
+            # 并发下载和解析各站点RSS，按站点顺序依次匹配
+            with ThreadPoolExecutor(max_workers=min(self._fetch_workers, len(fetch_sites)),
+                                    thread_name_prefix="RssFetch") as executor:
+                fetch_tasks = [executor.submit(self.__fetch_rss, site_info.get("name"), site_info.get("rssurl"))
+                               for site_info in fetch_sites]
+                for site_info, fetch_task in zip(fetch_sites, fetch_tasks):
+                    rss_no_exists = self.__process_site_rss(site_info=site_info,
+                                                            rss_acticles=fetch_task.result(),
+                                                            rss_movies=rss_movies,
+                                                            rss_tvs=rss_tvs,
+                                                            rss_index=rss_index,
+                                                            rss_download_torrents=rss_download_torrents,
+                                                            rss_no_exists=rss_no_exists)
+            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
+            # 开始择优下载
+            self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
+                                      rss_no_exists=rss_no_exists)
+
+    def __fetch_rss(self, site_name, rss_url):
+        """
+        下载并解析站点RSS，记录耗时
+        """
+        start_time = time.time()
+        failed = False
+        try:
+            rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
+            failed = rss_acticles is None
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            rss_acticles = []
+            failed = True
+        seconds = round(time.time() - start_time, 2)
+        log.debug(f"【Rss】{site_name} RSS下载耗时 {seconds} 秒")
+        with self._statistics_lock:
+            statistics = self._fetch_statistics.setdefault(site_name, {
+                "count": 0,
+                "failed": 0,
+                "seconds": 0,
+                "max_seconds": 0
+            })
+            statistics["count"] += 1
+            if failed:
+                statistics["failed"] += 1
+            statistics["seconds"] += seconds
+            statistics["last_seconds"] = seconds
+            statistics["max_seconds"] = max(statistics["max_seconds"], seconds)
+            statistics["articles"] = len(rss_acticles) if rss_acticles else 0
+            statistics["time"] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))
+        return rss_acticles
+
+    def get_fetch_statistics(self):
+        """
+        查询各站点RSS下载耗时统计
+        """
+        with self._statistics_lock:
+            return {
+                site_name: dict(statistics,
+                                avg_seconds=round(statistics["seconds"] / statistics["count"], 2))
+                for site_name, statistics in self._fetch_statistics.items()
+            }
+
+    def __process_site_rss(self, site_info, rss_acticles, rss_movies, rss_tvs, rss_index,
+                           rss_download_torrents, rss_no_exists):
+        """
+        匹配单个站点的RSS结果，匹配到的资源加入rss_download_torrents
+        :return: 更新后的缺失资源详情
+        """
+        # 站点名称
+        site_name = site_info.get("name")
+        # 站点rss链接
+        rss_url = site_info.get("rssurl")
+        # 站点信息
+        site_id = site_info.get("id")
+        site_cookie = site_info.get("cookie")
+        site_ua = site_info.get("ua")
+        site_apikey = site_info.get("apikey")
+        # 是否解析种子详情
+        site_parse = site_info.get("parse")
+        # 是否使用代理
+        site_proxy = site_info.get("proxy")
+        # 使用的规则
+        site_fliter_rule = site_info.get("rule")
+        # 开始处理RSS
+        log.info(f"【Rss】正在处理：{site_name}")
+        if site_info.get("pri"):
+            site_order = 100 - int(site_info.get("pri"))
+        else:
+            site_order = 0
+        if rss_acticles is None:
+            # RSS链接过期
+            log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
+            # 发送消息
+            self.message.send_site_message(title="【RSS链接过期提醒】",
+                                           text=f"站点：{site_name}\n"
+                                                f"链接：{rss_url}")
+            return rss_no_exists
+        if not rss_acticles:
+            log.warn(f"【Rss】{site_name} 未下载到数据")
+            return rss_no_exists
+        else:
+            log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
+        # 处理RSS结果
+        res_num = 0
+        for article in rss_acticles:
+            try:
+                # 种子名
+                title = article.get('title')
+                # 种子链接
+                enclosure = article.get('enclosure')
+                # 种子页面
+                page_url = article.get('link')
+                # 种子大小
+                size = article.get('size')
+                # 开始处理
+                log.info(f"【Rss】开始处理：{title}")
+                # 检查这个种子是不是下过了
+                if self.rsshelper.is_rssd_by_enclosure(enclosure):
+                    log.info(f"【Rss】{title} 已成功订阅过")
                     continue
+                # 识别种子名称，开始搜索TMDB
+                media_info = MetaInfo(title=title)
+                cache_info = self.media.get_cache_info(media_info)
+                if cache_info.get("id"):
+                    # 使用缓存信息
+                    media_info.tmdb_id = cache_info.get("id")
+                    media_info.type = cache_info.get("type")
+                    media_info.title = cache_info.get("title")
+                    media_info.year = cache_info.get("year")
                 else:
-                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
-                # 处理RSS结果
-                res_num = 0
-                for article in rss_acticles:
-                    try:
-                        # 种子名
-                        title = article.get('title')
-                        # 种子链接
-                        enclosure = article.get('enclosure')
-                        # 种子页面
-                        page_url = article.get('link')
-                        # 种子大小
-                        size = article.get('size')
-                        # 开始处理
-                        log.info(f"【Rss】开始处理：{title}")
-                        # 检查这个种子是不是下过了
-                        if self.rsshelper.is_rssd_by_enclosure(enclosure):
-                            log.info(f"【Rss】{title} 已成功订阅过")
-                            continue
-                        # 识别种子名称，开始搜索TMDB
-                        media_info = MetaInfo(title=title)
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
-                            # 使用缓存信息
-                            media_info.tmdb_id = cache_info.get("id")
-                            media_info.type = cache_info.get("type")
-                            media_info.title = cache_info.get("title")
-                            media_info.year = cache_info.get("year")
-                        else:
-                            # 重新查询TMDB
-                            media_info = self.media.get_media_info(title=title)
-                            if not media_info:
-                                log.warn(f"【Rss】{title} 无法识别出媒体信息！")
-                                continue
-                            elif not media_info.tmdb_info:
-                                log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
-                        # 大小及种子页面
-                        media_info.set_torrent_info(size=size,
-                                                    page_url=page_url,
-                                                    site=site_name,
-                                                    site_order=site_order,
-                                                    enclosure=enclosure)
-                        # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
-                        match_flag, match_msg, match_info = self.check_torrent_rss(
-                            media_info=media_info,
-                            rss_movies=rss_movies,
-                            rss_tvs=rss_tvs,
-                            site_id=site_id,
-                            site_filter_rule=site_fliter_rule,
-                            site_cookie=site_cookie,
-                            site_parse=site_parse,
-                            site_ua=site_ua,
-                            site_apikey=site_apikey,
-                            site_proxy=site_proxy)
-                        for msg in match_msg:
-                            log.info(f"【Rss】{msg}")
-
-                        # 未匹配
-                        if not match_flag:
-                            continue
+                    # 重新查询TMDB
+                    media_info = self.media.get_media_info(title=title)
+                    if not media_info:
+                        log.warn(f"【Rss】{title} 无法识别出媒体信息！")
+                        continue
+                    elif not media_info.tmdb_info:
+                        log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+                # 大小及种子页面
+                media_info.set_torrent_info(size=size,
+                                            page_url=page_url,
+                                            site=site_name,
+                                            site_order=site_order,
+                                            enclosure=enclosure)
+                # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
+                match_flag, match_msg, match_info = self.check_torrent_rss(
+                    media_info=media_info,
+                    rss_movies=rss_movies,
+                    rss_tvs=rss_tvs,
+                    site_id=site_id,
+                    site_filter_rule=site_fliter_rule,
+                    site_cookie=site_cookie,
+                    site_parse=site_parse,
+                    site_ua=site_ua,
+                    site_apikey=site_apikey,
+                    site_proxy=site_proxy,
+                    rss_index=rss_index)
+                for msg in match_msg:
+                    log.info(f"【Rss】{msg}")
 
-                        # 非模糊匹配命中，检查本地情况，检查删除订阅
-                        if not match_info.get("fuzzy_match"):
-                            # 匹配到订阅，如没有TMDB信息则重新查询
-                            if not media_info.tmdb_info and media_info.tmdb_id:
-                                media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
-                                                                                  tmdbid=media_info.tmdb_id))
-                            if not media_info.tmdb_info:
-                                continue
-                            # 非洗版时检查本地是否存在
-                            if not match_info.get("over_edition"):
-                                if media_info.type == MediaType.MOVIE:
-                                    exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        no_exists=rss_no_exists
-                                    )
-                                else:
-                                    # 从登记薄中获取缺失剧集
-                                    season = 1
-                                    if match_info.get("season"):
-                                        season = int(str(match_info.get("season")).replace("S", ""))
-                                    # 设定的总集数
-                                    total_ep = match_info.get("total")
-                                    # 设定的开始集数
-                                    current_ep = match_info.get("current_ep")
-                                    # 表登记的缺失集数
-                                    episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
-                                    if episodes is None:
-                                        episodes = []
-                                        if current_ep:
-                                            episodes = list(range(int(current_ep), int(total_ep) + 1))
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    else:
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    # 检查本地媒体库情况
-                                    exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        total_ep={season: total_ep}
-                                    )
-                                    # 取交集做为缺失集
-                                    rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
-                                                                                      source=library_no_exists,
-                                                                                      title=media_info.tmdb_id)
-                                    if rss_no_exists.get(media_info.tmdb_id):
-                                        log.info("【Rss】%s 订阅缺失季集：%s" % (
-                                            media_info.get_title_string(),
-                                            rss_no_exists.get(media_info.tmdb_id)
-                                        ))
-                                # 本地已存在
-                                if exist_flag:
-                                    continue
-                            # 洗版模式
-                            else:
-                                # 洗版时季集不完整的资源不要
-                                '''if media_info.type != MediaType.MOVIE \
-                                        and media_info.get_episode_list():
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        #f"正在洗版，过滤掉季集不完整的资源：{title}"
-                                        f"正在洗版，过滤掉季集不完整的资源：{title}"
-                                    )
-                                    continue'''
-                                if not self.subscribe.check_subscribe_over_edition(
-                                        rtype=media_info.type,
-                                        rssid=match_info.get("id"),
-                                        res_order=match_info.get("res_order")):
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        f"正在洗版，跳过低优先级或同优先级资源：{title}"
-                                    )
-                                    continue
-                        # 模糊匹配
-                        else:
-                            # 不做处理，直接下载
-                            pass
+                # 未匹配
+                if not match_flag:
+                    continue
 
-                        # 站点流控
-                        if self.sites.check_ratelimit(site_id):
+                # 非模糊匹配命中，检查本地情况，检查删除订阅
+                if not match_info.get("fuzzy_match"):
+                    # 匹配到订阅，如没有TMDB信息则重新查询
+                    if not media_info.tmdb_info and media_info.tmdb_id:
+                        media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
+                                                                          tmdbid=media_info.tmdb_id))
+                    if not media_info.tmdb_info:
+                        continue
+                    # 非洗版时检查本地是否存在
+                    if not match_info.get("over_edition"):
+                        if media_info.type == MediaType.MOVIE:
+                            exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                no_exists=rss_no_exists
+                            )
+                        else:
+                            # 从登记薄中获取缺失剧集
+                            season = 1
+                            if match_info.get("season"):
+                                season = int(str(match_info.get("season")).replace("S", ""))
+                            # 设定的总集数
+                            total_ep = match_info.get("total")
+                            # 设定的开始集数
+                            current_ep = match_info.get("current_ep")
+                            # 表登记的缺失集数
+                            episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
+                            if episodes is None:
+                                episodes = []
+                                if current_ep:
+                                    episodes = list(range(int(current_ep), int(total_ep) + 1))
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            else:
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            # 检查本地媒体库情况
+                            exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                total_ep={season: total_ep}
+                            )
+                            # 取交集做为缺失集
+                            rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
+                                                                              source=library_no_exists,
+                                                                              title=media_info.tmdb_id)
+                            if rss_no_exists.get(media_info.tmdb_id):
+                                log.info("【Rss】%s 订阅缺失季集：%s" % (
+                                    media_info.get_title_string(),
+                                    rss_no_exists.get(media_info.tmdb_id)
+                                ))
+                        # 本地已存在
+                        if exist_flag:
+                            continue
+                    # 洗版模式
+                    else:
+                        # 洗版时季集不完整的资源不要
+                        '''if media_info.type != MediaType.MOVIE \
+                                and media_info.get_episode_list():
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                #f"正在洗版，过滤掉季集不完整的资源：{title}"
+                                f"正在洗版，过滤掉季集不完整的资源：{title}"
+                            )
+                            continue'''
+                        if not self.subscribe.check_subscribe_over_edition(
+                                rtype=media_info.type,
+                                rssid=match_info.get("id"),
+                                res_order=match_info.get("res_order")):
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                f"正在洗版，跳过低优先级或同优先级资源：{title}"
+                            )
                             continue
+                # 模糊匹配
+                else:
+                    # 不做处理，直接下载
+                    pass
 
-                        # 设置种子信息
-                        media_info.set_torrent_info(res_order=match_info.get("res_order"),
-                                                    filter_rule=match_info.get("filter_rule"),
-                                                    over_edition=match_info.get("over_edition"),
-                                                    download_volume_factor=match_info.get("download_volume_factor"),
-                                                    upload_volume_factor=match_info.get("upload_volume_factor"),
-                                                    rssid=match_info.get("id"))
-                        # 设置下载参数
-                        media_info.set_download_info(download_setting=match_info.get("download_setting"),
-                                                     save_path=match_info.get("save_path"))
-                        # 插入数据库历史记录
-                        self.rsshelper.insert_rss_torrents(media_info)
-                        # 加入下载列表
-                        if media_info not in rss_download_torrents:
-                            rss_download_torrents.append(media_info)
-                            res_num = res_num + 1
-                    except Exception as e:
-                        ExceptionUtils.exception_traceback(e)
-                        log.error("【Rss】处理RSS发生错误：%s" % str(e))
-                        continue
-                log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
-            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
-            # 开始择优下载
-            self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
-                                      rss_no_exists=rss_no_exists)
+                # 站点流控
+                if self.sites.check_ratelimit(site_id):
+                    continue
+
+                # 设置种子信息
+                media_info.set_torrent_info(res_order=match_info.get("res_order"),
+                                            filter_rule=match_info.get("filter_rule"),
+                                            over_edition=match_info.get("over_edition"),
+                                            download_volume_factor=match_info.get("download_volume_factor"),
+                                            upload_volume_factor=match_info.get("upload_volume_factor"),
+                                            rssid=match_info.get("id"))
+                # 设置下载参数
+                media_info.set_download_info(download_setting=match_info.get("download_setting"),
+                                             save_path=match_info.get("save_path"))
+                # 插入数据库历史记录
+                self.rsshelper.insert_rss_torrents(media_info)
+                # 加入下载列表
+                if media_info not in rss_download_torrents:
+                    rss_download_torrents.append(media_info)
+                    res_num = res_num + 1
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                continue
+        log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
+        return rss_no_exists
 
     def check_torrent_rss(self,
                           media_info,
@@ -332,7 +588,8 @@ class Rss:
                           site_parse,
                           site_ua,
                           site_apikey,
-                          site_proxy):
+                          site_proxy,
+                          rss_index=None):
         """
         判断种子是否命中订阅
         :param media_info: 已识别的种子媒体信息
@@ -345,105 +602,21 @@ class Rss:
         :param site_ua: 站点请求UA
         :param site_apikey: 站点apikey
         :param site_proxy: 是否使用代理
+        :param rss_index: 本次运行的订阅索引，为空时按订阅清单临时建立
         :return: 匹配到的订阅ID、是否洗版、总集数、匹配规则的资源顺序、上传因子、下载因子，匹配的季（电视剧）
         """
-        # 默认值
-        # 匹配状态 0不在订阅范围内 -1不符合过滤条件 1匹配
-        match_flag = False
         # 匹配的rss信息
         match_msg = []
-        match_rss_info = {}
         # 上传因素
         upload_volume_factor = None
         # 下载因素
         download_volume_factor = None
         hit_and_run = False
 
-        # 匹配电影
-        if media_info.type == MediaType.MOVIE and rss_movies:
-            for rid, rss_info in rss_movies.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 过滤订阅站点
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # tmdbid或名称年份匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    # 有tmdbid时使用tmdbid匹配
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 豆瓣年份与tmdb取向不同
-                        if year and str(media_info.year) not in [str(year),
-                                                                 str(int(year) + 1),
-                                                                 str(int(year) - 1)]:
-                            continue
-                        if name != media_info.title:
-                            continue
-                # 模糊匹配
-                else:
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配关键字或正则表达式
-                    search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒体匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-
-                break
-        # 匹配电视剧
-        elif rss_tvs:
-            # 匹配种子标题
-            for rid, rss_info in rss_tvs.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 过滤订阅站点
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # 有tmdbid时精确匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                season = rss_info.get('season')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 匹配年份，年份可以为空
-                        if year and str(year) != str(media_info.year):
-                            continue
-                        # 匹配名称
-                        if name != media_info.title:
-                            continue
-                    # 匹配季，季可以为空
-                    if season and season != media_info.get_season_string():
-                        continue
-                # 模糊匹配
-                else:
-                    # 匹配季，季可以为空
-                    if season and season != "S00" and season != media_info.get_season_string():
-                        continue
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配关键字或正则表达式
-                    search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒体匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-                break
+        # 按订阅索引查找命中的订阅
+        if not rss_index:
+            rss_index = _RssIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
+        match_flag, match_rss_info = rss_index.match(media_info)
 
         # 名称匹配成功，开始过滤
         if match_flag:
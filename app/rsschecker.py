@@ -14,6 +14,7 @@ from app.filter import Filter
 from app.helper import DbHelper, RssHelper
 from app.media import Media
 from app.media.meta import MetaInfo
+from app.media.tmdbv3api import TMDb, Priority
 from app.message import Message
 from app.searcher import Searcher
 from app.subscribe import Subscribe
@@ -176,6 +177,7 @@ class RssChecker(object):
                 return {}
         return self._rss_tasks
 
+    @TMDb.priority(Priority.BACKGROUND)
     def check_task_rss(self, taskid):
         """
         处理自定义RSS任务，由定时服务调用
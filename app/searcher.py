@@ -161,16 +161,16 @@ class Searcher:
             return None, no_exists, 0, 0
         else:
             if in_from in self.message.get_search_types():
-                # 保存搜索记录
-                self.delete_all_search_torrents()
                 # 搜索结果排序
                 media_list = sorted(media_list, key=lambda x: "%s%s%s%s" % (str(x.title).ljust(100, ' '),
                                                                             str(x.res_order).rjust(3, '0'),
                                                                             str(x.site_order).rjust(3, '0'),
                                                                             str(x.seeders).rjust(10, '0')),
                                     reverse=True)
-                # 插入数据库
-                self.insert_search_results(media_list)
+                # 保存搜索记录，删除旧记录和插入新记录在同一事务中提交
+                with self.dbhelper.unit_of_work():
+                    self.delete_all_search_torrents()
+                    self.insert_search_results(media_list)
                 # 微信未开自动下载时返回
                 if not self._search_auto:
                     return None, no_exists, len(media_list), None
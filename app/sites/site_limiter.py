@@ -15,9 +15,10 @@ class SiteRateLimiter:
         self.last_visit_time = 0
         self.count = 0
 
-    def check_rate_limit(self) -> (bool, str):
+    def check_rate_limit(self, peek=False) -> (bool, str):
         """
         检查是否超出访问频率控制
+        :param peek: 只检查不计入访问次数
         :return: 超出返回True，否则返回False，超出时返回错误信息
         """
         current_time = time.time()
@@ -28,16 +29,19 @@ class SiteRateLimiter:
                              f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
         # 单位时间内访问次数
         if self.limit_interval and self.limit_count:
+            count = self.count
             if current_time - self.last_visit_time > self.limit_interval:
                 # 计数清零
-                self.count = 0
-            if self.count >= self.limit_count:
+                count = 0
+            if count >= self.limit_count:
                 return True, f"触发流控规则，{self.limit_interval} 秒内访问次数不得超过 {self.limit_count} 次，" \
                              f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
-            # 访问计数
-            self.count += 1
-        # 更新最后访问时间
-        self.last_visit_time = current_time
+            if not peek:
+                # 访问计数
+                self.count = count + 1
+        if not peek:
+            # 更新最后访问时间
+            self.last_visit_time = current_time
         # 未触发流控
         return False, ""
 
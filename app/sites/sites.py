@@ -160,15 +160,16 @@ class Sites:
         """
         return self._siteByUrls.get(StringUtils.get_url_domain(url))
 
-    def check_ratelimit(self, site_id):
+    def check_ratelimit(self, site_id, peek=False):
         """
         检查站点是否触发流控
         :param site_id: 站点ID
+        :param peek: 只检查不计入访问次数
         :return: True为触发了流控，False为未触发
         """
         if not self._limiters.get(site_id):
             return False
-        state, msg = self._limiters[site_id].check_rate_limit()
+        state, msg = self._limiters[site_id].check_rate_limit(peek=peek)
         if msg:
             log.warn(f"【Sites】站点 {self._siteByIds[site_id].get('name')} {msg}")
         return state
@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 import log
@@ -9,11 +10,12 @@ from app.helper import DbHelper, MetaHelper
 from app.indexer import Indexer
 from app.media import Media, DouBan
 from app.media.meta import MetaInfo
+from app.media.tmdbv3api import TMDb, Priority
 from app.message import Message
 from app.plugins import EventManager
 from app.searcher import Searcher
 from app.sites import Sites
-from app.utils import Torrent
+from app.utils import Torrent, ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType, EventType, SystemConfigKey, RssType
 from web.backend.web_utils import WebUtils
@@ -21,6 +23,9 @@ from config import Config
 
 lock = Lock()
 
+# 默认同时搜索的订阅数
+DEFAULT_SUBSCRIBE_SEARCH_WORKERS = 4
+
 
 @singleton
 class Subscribe:
@@ -36,6 +41,9 @@ class Subscribe:
     eventmanager = None
     indexer = None
 
+    _search_workers = DEFAULT_SUBSCRIBE_SEARCH_WORKERS
+    _search_executor = None
+
     def __init__(self):
         self.init_config()
 
@@ -51,6 +59,18 @@ class Subscribe:
         self.indexer = Indexer()
         self.filter = Filter()
         self.eventmanager = EventManager()
+        search_workers = (Config().get_config('pt') or {}).get('subscribe_search_workers')
+        if str(search_workers).isdigit() and int(search_workers) > 0:
+            search_workers = int(search_workers)
+        else:
+            search_workers = DEFAULT_SUBSCRIBE_SEARCH_WORKERS
+        # 线程数变化时重建搜索线程池，进行中的搜索在旧线程池中完成
+        if not self._search_executor or search_workers != self._search_workers:
+            if self._search_executor:
+                self._search_executor.shutdown(wait=False)
+            self._search_executor = ThreadPoolExecutor(max_workers=search_workers,
+                                                       thread_name_prefix="SubscribeSearch")
+        self._search_workers = search_workers
 
     @property
     def default_rss_setting_tv(self):
@@ -573,6 +593,7 @@ class Subscribe:
         }
         return json.dumps(note)
 
+    @TMDb.priority(Priority.BACKGROUND)
     def refresh_rss_metainfo(self):
         """
         定时将豆瓣订阅转换为TMDB的订阅，并更新订阅的TMDB信息
@@ -686,10 +707,12 @@ class Subscribe:
         """
         try:
             lock.acquire()
-            # 处理电影
-            self.subscribe_search_movie(state=state)
-            # 处理电视剧
-            self.subscribe_search_tv(state=state)
+            # 电影和电视剧在同一批量搜索中，相同站点、相同关键字的搜索只访问一次站点
+            with self.indexer.search_batch():
+                # 处理电影
+                self.subscribe_search_movie(state=state)
+                # 处理电视剧
+                self.subscribe_search_tv(state=state)
         finally:
             lock.release()
 
@@ -705,79 +728,80 @@ class Subscribe:
             rss_movies = self.get_subscribe_movies(state=state)
         if rss_movies:
             log.info("【Subscribe】共有 %s 个电影订阅需要搜索" % len(rss_movies))
-        for rid, rss_info in rss_movies.items():
-            # 跳过模糊匹配的
-            if rss_info.get("fuzzy_match"):
-                continue
-            # 搜索站点范围
-            rssid = rss_info.get("id")
-            name = rss_info.get("name")
-            year = rss_info.get("year") or ""
-            tmdbid = rss_info.get("tmdbid")
-            over_edition = rss_info.get("over_edition")
-            keyword = rss_info.get("keyword")
+        self.__search_subscribes(rss_infos=rss_movies, search_func=self.__search_movie)
 
-            # 开始搜索
-            self.dbhelper.update_rss_movie_state(rssid=rssid, state='S')
+    def __search_movie(self, rss_info):
+        """
+        搜索单个电影订阅，搜索完成后立即择优下载
+        """
+        # 搜索站点范围
+        rssid = rss_info.get("id")
+        name = rss_info.get("name")
+        year = rss_info.get("year") or ""
+        tmdbid = rss_info.get("tmdbid")
+        over_edition = rss_info.get("over_edition")
+        keyword = rss_info.get("keyword")
 
-            try:
-                # 识别
-                media_info = self.__get_media_info(tmdbid, name, year, MediaType.MOVIE)
-                # 未识别到媒体信息
-                if not media_info or not media_info.tmdb_info:
-                    self.dbhelper.update_rss_movie_state(rssid=rssid, state='R')
-                    continue
-                media_info.set_download_info(download_setting=rss_info.get("download_setting"),
-                                             save_path=rss_info.get("save_path"))
-                # 自定义搜索词
-                media_info.keyword = keyword
-                # 非洗版的情况检查是否存在
-                if not over_edition:
-                    # 检查是否存在
-                    exist_flag, no_exists, _ = self.downloader.check_exists_medias(meta_info=media_info)
-                    # 已经存在
-                    if exist_flag:
-                        log.info("【Subscribe】电影 %s 已存在" % media_info.get_title_string())
-                        self.finish_rss_subscribe(rssid=rssid, media=media_info)
-                        continue
-                else:
-                    # 洗版时按缺失来下载
-                    no_exists = {}
-                    # 把洗版标志加入搜索
-                    media_info.over_edition = over_edition
-                    # 将当前的优先级传入搜索
-                    media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=media_info.type,
-                                                                                   rssid=rssid)
-                # 开始搜索
-                filter_dict = {
-                    "restype": rss_info.get('filter_restype'),
-                    "pix": rss_info.get('filter_pix'),
-                    "team": rss_info.get('filter_team'),
-                    "rule": rss_info.get('filter_rule'),
-                    "include": rss_info.get('filter_include'),
-                    "exclude": rss_info.get('filter_exclude'),
-                    "site": rss_info.get("search_sites")
-                }
-                search_result, _, _, _ = self.searcher.search_one_media(
-                    media_info=media_info,
-                    in_from=SearchType.RSS,
-                    no_exists=no_exists,
-                    sites=rss_info.get("search_sites"),
-                    filters=filter_dict)
-                if search_result:
-                    # 洗版
-                    if over_edition:
-                        self.update_subscribe_over_edition(rtype=search_result.type,
-                                                           rssid=rssid,
-                                                           media=search_result)
-                    else:
-                        self.finish_rss_subscribe(rssid=rssid, media=media_info)
+        # 开始搜索
+        self.dbhelper.update_rss_movie_state(rssid=rssid, state='S')
+
+        try:
+            # 识别
+            media_info = self.__get_media_info(tmdbid, name, year, MediaType.MOVIE)
+            # 未识别到媒体信息
+            if not media_info or not media_info.tmdb_info:
+                self.dbhelper.update_rss_movie_state(rssid=rssid, state='R')
+                return
+            media_info.set_download_info(download_setting=rss_info.get("download_setting"),
+                                         save_path=rss_info.get("save_path"))
+            # 自定义搜索词
+            media_info.keyword = keyword
+            # 非洗版的情况检查是否存在
+            if not over_edition:
+                # 检查是否存在
+                exist_flag, no_exists, _ = self.downloader.check_exists_medias(meta_info=media_info)
+                # 已经存在
+                if exist_flag:
+                    log.info("【Subscribe】电影 %s 已存在" % media_info.get_title_string())
+                    self.finish_rss_subscribe(rssid=rssid, media=media_info)
+                    return
+            else:
+                # 洗版时按缺失来下载
+                no_exists = {}
+                # 把洗版标志加入搜索
+                media_info.over_edition = over_edition
+                # 将当前的优先级传入搜索
+                media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=media_info.type,
+                                                                               rssid=rssid)
+            # 开始搜索
+            filter_dict = {
+                "restype": rss_info.get('filter_restype'),
+                "pix": rss_info.get('filter_pix'),
+                "team": rss_info.get('filter_team'),
+                "rule": rss_info.get('filter_rule'),
+                "include": rss_info.get('filter_include'),
+                "exclude": rss_info.get('filter_exclude'),
+                "site": rss_info.get("search_sites")
+            }
+            search_result, _, _, _ = self.searcher.search_one_media(
+                media_info=media_info,
+                in_from=SearchType.RSS,
+                no_exists=no_exists,
+                sites=rss_info.get("search_sites"),
+                filters=filter_dict)
+            if search_result:
+                # 洗版
+                if over_edition:
+                    self.update_subscribe_over_edition(rtype=search_result.type,
+                                                       rssid=rssid,
+                                                       media=search_result)
                 else:
-                    self.dbhelper.update_rss_movie_state(rssid=rssid, state='R')
-            except Exception as err:
+                    self.finish_rss_subscribe(rssid=rssid, media=media_info)
+            else:
                 self.dbhelper.update_rss_movie_state(rssid=rssid, state='R')
-                log.error(f"【Subscribe】电影 {name} 订阅搜索失败：{str(err)}")
-                continue
+        except Exception as err:
+            self.dbhelper.update_rss_movie_state(rssid=rssid, state='R')
+            log.error(f"【Subscribe】电影 {name} 订阅搜索失败：{str(err)}")
 
     def subscribe_search_tv(self, rssid=None, state="D"):
         """
@@ -791,132 +815,164 @@ class Subscribe:
             rss_tvs = self.get_subscribe_tvs(state=state)
         if rss_tvs:
             log.info("【Subscribe】共有 %s 个电视剧订阅需要检索" % len(rss_tvs))
+        self.__search_subscribes(rss_infos=rss_tvs, search_func=self.__search_tv)
+
+    def __search_tv(self, rss_info):
+        """
+        搜索单个电视剧订阅，搜索完成后立即择优下载
+        """
+        # 缺失的剧集，各订阅单独计算
         rss_no_exists = {}
-        for rid, rss_info in rss_tvs.items():
-            # 跳过模糊匹配的
-            if rss_info.get("fuzzy_match"):
-                continue
-            rssid = rss_info.get("id")
-            name = rss_info.get("name")
-            year = rss_info.get("year") or ""
-            tmdbid = rss_info.get("tmdbid")
-            over_edition = rss_info.get("over_edition")
-            keyword = rss_info.get("keyword")
+        rssid = rss_info.get("id")
+        name = rss_info.get("name")
+        year = rss_info.get("year") or ""
+        tmdbid = rss_info.get("tmdbid")
+        over_edition = rss_info.get("over_edition")
+        keyword = rss_info.get("keyword")
 
-            # 开始搜索
-            self.dbhelper.update_rss_tv_state(rssid=rssid, state='S')
+        # 开始搜索
+        self.dbhelper.update_rss_tv_state(rssid=rssid, state='S')
 
-            try:
-                # 识别
-                media_info = self.__get_media_info(tmdbid, name, year, MediaType.TV)
-                # 未识别到媒体信息
-                if not media_info or not media_info.tmdb_info:
-                    self.dbhelper.update_rss_tv_state(rssid=rssid, state='R')
-                    continue
-                # 取下载设置
-                media_info.set_download_info(download_setting=rss_info.get("download_setting"),
-                                             save_path=rss_info.get("save_path"))
-                # 从登记薄中获取缺失剧集
-                season = 1
-                if rss_info.get("season"):
-                    season = int(str(rss_info.get("season")).replace("S", ""))
-                # 订阅季
-                media_info.begin_season = season
-                # 订阅ID
-                media_info.rssid = rssid
-                # 自定义集数
-                total_ep = rss_info.get("total")
-                current_ep = rss_info.get("current_ep")
-                # 自定义搜索词
-                media_info.keyword = keyword
-                # 表中记录的剩余订阅集数
-                episodes = self.get_subscribe_tv_episodes(rss_info.get("id"))
-                if episodes is None:
-                    episodes = []
-                    if current_ep:
-                        episodes = list(range(current_ep, total_ep + 1))
-                    rss_no_exists[media_info.tmdb_id] = [
-                        {
-                            "season": season,
-                            "episodes": episodes,
-                            "total_episodes": total_ep
-                        }
-                    ]
-                else:
-                    rss_no_exists[media_info.tmdb_id] = [
-                        {
-                            "season": season,
-                            "episodes": episodes,
-                            "total_episodes": total_ep
-                        }
-                    ]
-                # 非洗版时检查本地媒体库情况
-                if not over_edition:
-                    exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
-                        meta_info=media_info,
-                        total_ep={season: total_ep})
-                    # 当前剧集已存在，跳过
-                    if exist_flag:
-                        # 已全部存在
-                        if not library_no_exists \
-                                or not library_no_exists.get(media_info.tmdb_id):
-                            log.info("【Subscribe】电视剧 %s 订阅剧集已全部存在" % (
-                                media_info.get_title_string()))
-                            # 完成订阅
-                            self.finish_rss_subscribe(rssid=rss_info.get("id"),
-                                                      media=media_info)
-                        continue
-                    # 取交集做为缺失集
-                    rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
-                                                                      source=library_no_exists,
-                                                                      title=media_info.tmdb_id)
-                    if rss_no_exists.get(media_info.tmdb_id):
-                        log.info("【Subscribe】%s 订阅缺失季集：%s" % (
-                            media_info.get_title_string(),
-                            rss_no_exists.get(media_info.tmdb_id)
-                        ))
-                else:
-                    # 把洗版标志加入检索
-                    media_info.over_edition = over_edition
-                    # 将当前的优先级传入检索
-                    media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=MediaType.TV,
-                                                                                   rssid=rssid)
-                # 开始检索
-                filter_dict = {
-                    "restype": rss_info.get('filter_restype'),
-                    "pix": rss_info.get('filter_pix'),
-                    "team": rss_info.get('filter_team'),
-                    "rule": rss_info.get('filter_rule'),
-                    "include": rss_info.get('filter_include'),
-                    "exclude": rss_info.get('filter_exclude'),
-                    "site": rss_info.get("search_sites")
-                }
-                search_result, no_exists, _, _ = self.searcher.search_one_media(
-                    media_info=media_info,
-                    in_from=SearchType.RSS,
-                    no_exists=rss_no_exists,
-                    sites=rss_info.get("search_sites"),
-                    filters=filter_dict)
-                if search_result \
-                        or not no_exists \
-                        or not no_exists.get(media_info.tmdb_id):
-                    # 洗版
-                    if over_edition:
-                        self.update_subscribe_over_edition(rtype=media_info.type,
-                                                           rssid=rssid,
-                                                           media=search_result)
-                    else:
-                        # 完成订阅
-                        self.finish_rss_subscribe(rssid=rssid, media=media_info)
-                elif no_exists:
-                    # 更新状态
-                    self.update_subscribe_tv_lack(rssid=rssid,
-                                                  media_info=media_info,
-                                                  seasoninfo=no_exists.get(media_info.tmdb_id))
-            except Exception as err:
-                log.error(f"【Subscribe】电视剧 {name} 订阅搜索失败：{str(err)}")
+        try:
+            # 识别
+            media_info = self.__get_media_info(tmdbid, name, year, MediaType.TV)
+            # 未识别到媒体信息
+            if not media_info or not media_info.tmdb_info:
                 self.dbhelper.update_rss_tv_state(rssid=rssid, state='R')
+                return
+            # 取下载设置
+            media_info.set_download_info(download_setting=rss_info.get("download_setting"),
+                                         save_path=rss_info.get("save_path"))
+            # 从登记薄中获取缺失剧集
+            season = 1
+            if rss_info.get("season"):
+                season = int(str(rss_info.get("season")).replace("S", ""))
+            # 订阅季
+            media_info.begin_season = season
+            # 订阅ID
+            media_info.rssid = rssid
+            # 自定义集数
+            total_ep = rss_info.get("total")
+            current_ep = rss_info.get("current_ep")
+            # 自定义搜索词
+            media_info.keyword = keyword
+            # 表中记录的剩余订阅集数
+            episodes = self.get_subscribe_tv_episodes(rss_info.get("id"))
+            if episodes is None:
+                episodes = []
+                if current_ep:
+                    episodes = list(range(current_ep, total_ep + 1))
+                rss_no_exists[media_info.tmdb_id] = [
+                    {
+                        "season": season,
+                        "episodes": episodes,
+                        "total_episodes": total_ep
+                    }
+                ]
+            else:
+                rss_no_exists[media_info.tmdb_id] = [
+                    {
+                        "season": season,
+                        "episodes": episodes,
+                        "total_episodes": total_ep
+                    }
+                ]
+            # 非洗版时检查本地媒体库情况
+            if not over_edition:
+                exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
+                    meta_info=media_info,
+                    total_ep={season: total_ep})
+                # 当前剧集已存在，跳过
+                if exist_flag:
+                    # 已全部存在
+                    if not library_no_exists \
+                            or not library_no_exists.get(media_info.tmdb_id):
+                        log.info("【Subscribe】电视剧 %s 订阅剧集已全部存在" % (
+                            media_info.get_title_string()))
+                        # 完成订阅
+                        self.finish_rss_subscribe(rssid=rss_info.get("id"),
+                                                  media=media_info)
+                    return
+                # 取交集做为缺失集
+                rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
+                                                                  source=library_no_exists,
+                                                                  title=media_info.tmdb_id)
+                if rss_no_exists.get(media_info.tmdb_id):
+                    log.info("【Subscribe】%s 订阅缺失季集：%s" % (
+                        media_info.get_title_string(),
+                        rss_no_exists.get(media_info.tmdb_id)
+                    ))
+            else:
+                # 把洗版标志加入检索
+                media_info.over_edition = over_edition
+                # 将当前的优先级传入检索
+                media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=MediaType.TV,
+                                                                               rssid=rssid)
+            # 开始检索
+            filter_dict = {
+                "restype": rss_info.get('filter_restype'),
+                "pix": rss_info.get('filter_pix'),
+                "team": rss_info.get('filter_team'),
+                "rule": rss_info.get('filter_rule'),
+                "include": rss_info.get('filter_include'),
+                "exclude": rss_info.get('filter_exclude'),
+                "site": rss_info.get("search_sites")
+            }
+            search_result, no_exists, _, _ = self.searcher.search_one_media(
+                media_info=media_info,
+                in_from=SearchType.RSS,
+                no_exists=rss_no_exists,
+                sites=rss_info.get("search_sites"),
+                filters=filter_dict)
+            if search_result \
+                    or not no_exists \
+                    or not no_exists.get(media_info.tmdb_id):
+                # 洗版
+                if over_edition:
+                    self.update_subscribe_over_edition(rtype=media_info.type,
+                                                       rssid=rssid,
+                                                       media=search_result)
+                else:
+                    # 完成订阅
+                    self.finish_rss_subscribe(rssid=rssid, media=media_info)
+            elif no_exists:
+                # 更新状态
+                self.update_subscribe_tv_lack(rssid=rssid,
+                                              media_info=media_info,
+                                              seasoninfo=no_exists.get(media_info.tmdb_id))
+        except Exception as err:
+            log.error(f"【Subscribe】电视剧 {name} 订阅搜索失败：{str(err)}")
+            self.dbhelper.update_rss_tv_state(rssid=rssid, state='R')
+
+    def __search_subscribes(self, rss_infos, search_func):
+        """
+        并发搜索订阅：同一媒体的订阅依次搜索，不同媒体的订阅并发搜索，
+        所有订阅共用索引器的站点并发额度，每个订阅搜索完成后立即择优下载
+        :param rss_infos: 订阅清单
+        :param search_func: 搜索单个订阅的函数
+        """
+        # 按媒体分组，跳过模糊匹配的
+        groups = {}
+        for rss_info in (rss_infos or {}).values():
+            if rss_info.get("fuzzy_match"):
                 continue
+            groups.setdefault(rss_info.get("tmdbid") or rss_info.get("name"), []).append(rss_info)
+        if not groups:
+            return
+
+        def __search_group(group, statistics):
+            with self.dbhelper.indexer_statistics_batch(statistics):
+                for item in group:
+                    try:
+                        search_func(item)
+                    except Exception as e:
+                        ExceptionUtils.exception_traceback(e)
+                        log.error(f"【Subscribe】{item.get('name')} 订阅搜索出错：{str(e)}")
+
+        executor = self._search_executor
+        with self.indexer.search_batch() as statistics:
+            for task in [executor.submit(__search_group, group, statistics) for group in groups.values()]:
+                task.result()
 
     def update_rss_state(self, rtype, rssid, state):
         """
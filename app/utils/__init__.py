@@ -15,3 +15,5 @@ from .nfo_reader import NfoReader
 from .ip_utils import IpUtils
 from .image_utils import ImageUtils
 from .scheduler_utils import SchedulerUtils
+from .seen_index import SeenIndex
+from .single_flight import SingleFlight
@@ -0,0 +1,64 @@
+import hashlib
+from threading import Lock
+
+
+class SeenIndex(object):
+    """
+    已处理记录的内存索引，保存键的64位摘要，首次查询时从数据库整体加载，之后随插入提交同步更新；
+    删除记录时标记失效，下次查询时重新加载。未命中时记录一定不存在，命中时由调用方查询数据库确认
+    """
+
+    def __init__(self, loader):
+        """
+        :param loader: 返回数据库中全部键的函数
+        """
+        self._loader = loader
+        self._digests = set()
+        self._loaded = False
+        self._lock = Lock()
+
+    @staticmethod
+    def __digest(key):
+        return int.from_bytes(hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest(), "big")
+
+    def __load(self):
+        digests = set()
+        for key in self._loader() or []:
+            if key:
+                digests.add(self.__digest(key))
+        self._digests = digests
+        self._loaded = True
+
+    def contains(self, key):
+        """
+        查询键是否已存在
+        """
+        if not key:
+            return False
+        digest = self.__digest(key)
+        with self._lock:
+            if not self._loaded:
+                self.__load()
+            return digest in self._digests
+
+    def add(self, key):
+        """
+        新增键，写入提交后调用，未加载时忽略，加载时会从数据库读取
+        """
+        if not key:
+            return
+        digest = self.__digest(key)
+        with self._lock:
+            if self._loaded:
+                self._digests.add(digest)
+
+    def invalidate(self):
+        """
+        标记索引失效，下次查询时重新加载
+        """
+        with self._lock:
+            self._loaded = False
+            self._digests = set()
+
+    def __len__(self):
+        return len(self._digests)
@@ -0,0 +1,77 @@
+import copy
+from threading import Event, Lock
+
+
+class _Call(object):
+    """
+    一次进行中的调用
+    """
+
+    def __init__(self):
+        self.event = Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """
+    合并并发的相同调用：同一个键同时只执行一次，其它线程等待其完成后共享结果；
+    共享的结果会深拷贝后返回，各调用方可以随意修改
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+        self._total = 0
+        self._coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行调用，已有相同键的调用在进行中时等待并共享其结果
+        :param key: 调用的键，需可哈希
+        :param func: 调用的函数
+        :return: (结果, 是否共享了其它线程的结果)
+        """
+        leader = False
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call:
+                call.waiters += 1
+                self._coalesced += 1
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return copy.deepcopy(call.result), True
+        result = None
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                waiters = call.waiters
+            if waiters and not call.error:
+                # 保存结果的副本，避免本线程返回后修改结果影响其它线程
+                call.result = copy.deepcopy(result)
+            call.event.set()
+        return result, False
+
+    def get_statistics(self):
+        """
+        查询调用统计信息
+        """
+        with self._lock:
+            return {
+                "total": self._total,
+                "coalesced": self._coalesced,
+                "inflight": len(self._calls)
+            }
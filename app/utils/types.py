@@ -202,4 +202,4 @@ MovieTypes = ['MOV', '电影', MediaType.MOVIE]
 TvTypes = ['TV', '电视剧', MediaType.TV]
 
 # 内置索引器文件md5值
-BuiltinIndexerFileMd5 = "6b8bcaf28732232733f46b72117e1d87"
+BuiltinIndexerFileMd5 = "65fc00f434aa95b11d7e7b8828036b18"
@@ -1,3 +1,4 @@
+import atexit
 import logging
 import os
 import re
@@ -5,7 +6,8 @@ import threading
 import time
 from collections import deque
 from html import escape
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
 
 from config import Config
 
@@ -13,7 +15,37 @@ logging.getLogger('werkzeug').setLevel(logging.ERROR)
 lock = threading.Lock()
 
 LOG_QUEUE = deque(maxlen=200)
-LOG_INDEX = 0
+# 已写入的日志总数，作为各订阅方读取的游标
+LOG_SEQ = 0
+# 新日志通知
+LOG_CONDITION = threading.Condition()
+# 后台写日志的队列，各模块的日志输出
+LOG_WRITER_QUEUE = SimpleQueue()
+LOG_WRITER = None
+LOG_HANDLERS = {}
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    日志记录直接入队，格式化在后台线程中进行
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _ModuleHandler(logging.Handler):
+    """
+    后台线程中按模块将日志记录分发到对应的输出
+    """
+
+    def handle(self, record):
+        for handler in LOG_HANDLERS.get(record.name) or []:
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+        return True
 
 
 class Logger:
@@ -33,6 +65,7 @@ class Logger:
         logtype = self.__config.get_config('app').get('logtype') or "console"
         loglevel = self.__config.get_config('app').get('loglevel') or "info"
         self.logger.setLevel(level=self.__loglevels.get(loglevel))
+        handlers = []
         if logtype == "server":
             logserver = self.__config.get_config('app').get('logserver', '').split(':')
             if logserver:
@@ -44,7 +77,7 @@ class Logger:
                 log_server_handler = logging.handlers.SysLogHandler((logip, logport),
                                                                     logging.handlers.SysLogHandler.LOG_USER)
                 log_server_handler.setFormatter(logging.Formatter('%(filename)s: %(message)s'))
-                self.logger.addHandler(log_server_handler)
+                handlers.append(log_server_handler)
         elif logtype == "file":
             # 记录日志到文件
             logpath = os.environ.get('NASTOOL_LOG') or self.__config.get_config('app').get('logpath') or ""
@@ -56,11 +89,29 @@ class Logger:
                                                        backupCount=3,
                                                        encoding='utf-8')
                 log_file_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-                self.logger.addHandler(log_file_handler)
+                handlers.append(log_file_handler)
         # 记录日志到终端
         log_console_handler = logging.StreamHandler()
         log_console_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-        self.logger.addHandler(log_console_handler)
+        handlers.append(log_console_handler)
+        if self.__config.get_config('app').get('logqueue') is not False:
+            # 队列模式：调用方只将日志记录入队，由后台线程写入终端、文件或日志服务器
+            LOG_HANDLERS[module] = handlers
+            self.__start_writer()
+            self.logger.addHandler(_RecordQueueHandler(LOG_WRITER_QUEUE))
+        else:
+            for handler in handlers:
+                self.logger.addHandler(handler)
+
+    @staticmethod
+    def __start_writer():
+        global LOG_WRITER
+        if LOG_WRITER:
+            return
+        LOG_WRITER = QueueListener(LOG_WRITER_QUEUE, _ModuleHandler())
+        LOG_WRITER.start()
+        # 退出时写完队列中剩余的日志
+        atexit.register(LOG_WRITER.stop)
 
     @staticmethod
     def get_instance(module):
@@ -74,39 +125,78 @@ class Logger:
 
 
 def __append_log_queue(level, text):
-    global LOG_INDEX, LOG_QUEUE
-    with lock:
-        text = escape(text)
-        if text.startswith("【"):
+    """
+    写入页面日志队列，转义和提取来源在读取时进行
+    """
+    global LOG_SEQ
+    with LOG_CONDITION:
+        LOG_QUEUE.append({
+            "time": time.time(),
+            "level": level,
+            "raw": text})
+        LOG_SEQ += 1
+        LOG_CONDITION.notify_all()
+
+
+def __format_log(item):
+    """
+    转义日志内容并提取【】中的来源，同一条日志只处理一次
+    """
+    if "raw" in item:
+        text = escape(item.pop("raw"))
+        if text.startswith("【") and "】" in text:
             source = re.findall(r"(?<=【).*?(?=】)", text)[0]
             text = text.replace(f"【{source}】", "")
         else:
             source = "System"
-        LOG_QUEUE.append({
-            "time": time.strftime('%H:%M:%S', time.localtime(time.time())),
-            "level": level,
+        item.update({
+            "time": time.strftime('%H:%M:%S', time.localtime(item.get("time"))),
             "source": source,
-            "text": text})
-        LOG_INDEX += 1
+            "text": text
+        })
+    return item
+
+
+def get_logs(cursor=0, timeout=None):
+    """
+    获取游标之后的新日志，没有新日志时最多等待timeout秒
+    :param cursor: 上次读取返回的游标，为0时返回队列中的全部日志
+    :param timeout: 等待秒数，为空时不等待
+    :return: 新的游标、日志列表
+    """
+    with LOG_CONDITION:
+        if timeout and LOG_SEQ <= cursor:
+            LOG_CONDITION.wait_for(lambda: LOG_SEQ > cursor, timeout)
+        count = min(LOG_SEQ - cursor, len(LOG_QUEUE))
+        return LOG_SEQ, [__format_log(item) for item in list(LOG_QUEUE)[-count:]] if count > 0 else []
+
+
+def __log(level, text, module):
+    logger = Logger.get_instance(module).logger
+    # 先判断级别，未启用的级别不创建日志记录
+    if not logger.isEnabledFor(level):
+        return
+    # 调用位置固定为本文件，不再逐层查找调用栈
+    logger.handle(logger.makeRecord(logger.name, level, __file__, 0, text, None, None))
 
 
 def debug(text, module=None):
-    return Logger.get_instance(module).logger.debug(text)
+    __log(logging.DEBUG, text, module)
 
 
 def info(text, module=None):
     __append_log_queue("INFO", text)
-    return Logger.get_instance(module).logger.info(text)
+    __log(logging.INFO, text, module)
 
 
 def error(text, module=None):
     __append_log_queue("ERROR", text)
-    return Logger.get_instance(module).logger.error(text)
+    __log(logging.ERROR, text, module)
 
 
 def warn(text, module=None):
     __append_log_queue("WARN", text)
-    return Logger.get_instance(module).logger.warning(text)
+    __log(logging.WARNING, text, module)
 
 
 def console(text):
@@ -1,11 +1,126 @@
 import unittest
 
 from tests.test_metainfo import MetaInfoTest
+from tests.test_transfer_helper import TransferHelperTest
+from tests.test_words_helper import WordsHelperTest
+from tests.test_release_groups import ReleaseGroupsTest
+from tests.test_metacache import MetaCacheTest
+from tests.test_db_bulk import DbBulkTest
+from tests.test_db_engine import DbEngineTest
+from tests.test_db_index import DbIndexTest
+from tests.test_meta_helper import MetaHelperTest
+from tests.test_seen_index import SeenIndexTest
+from tests.test_tmdb import TmdbTest
+from tests.test_single_flight import SingleFlightTest
+from tests.test_event_bus import EventBusTest
+from tests.test_message_queue import MessageQueueTest
+from tests.test_dashboard import DashboardTest
+from tests.test_stream import StreamTest
+from tests.test_image_cache import ImageCacheTest
+from tests.test_log import LogTest
+from tests.test_torrent_mirror import TorrentMirrorTest
+from tests.test_brush_admission import BrushAdmissionTest
+from tests.test_filter import FilterTest
+from tests.test_rss_index import RssIndexTest
+from tests.test_rss_fetch import RssFetchTest
+from tests.test_subscribe_search import SubscribeSearchTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
+    # 测试文件转移执行器
+    suite.addTest(TransferHelperTest('test_device'))
+    suite.addTest(TransferHelperTest('test_reconfigure'))
+    # 测试自定义识别词
+    suite.addTest(WordsHelperTest('test_process'))
+    suite.addTest(WordsHelperTest('test_process_benchmark'))
+    # 测试制作组识别
+    suite.addTest(ReleaseGroupsTest('test_literal_prefixes'))
+    suite.addTest(ReleaseGroupsTest('test_match'))
+    suite.addTest(ReleaseGroupsTest('test_match_benchmark'))
+    # 测试名称识别缓存
+    suite.addTest(MetaCacheTest('test_hit_miss'))
+    suite.addTest(MetaCacheTest('test_invalidate'))
+    suite.addTest(MetaCacheTest('test_metainfo'))
+    # 测试数据库批量写入
+    suite.addTest(DbBulkTest('test_unit_of_work'))
+    suite.addTest(DbBulkTest('test_unit_of_work_failed'))
+    suite.addTest(DbBulkTest('test_indexer_statistics_batch'))
+    suite.addTest(DbBulkTest('test_bulk_insert_benchmark'))
+    # 测试数据库连接参数
+    suite.addTest(DbEngineTest('test_database_conf'))
+    suite.addTest(DbEngineTest('test_pragma'))
+    suite.addTest(DbEngineTest('test_pool_capacity'))
+    suite.addTest(DbEngineTest('test_contention_benchmark'))
+    # 测试数据库索引
+    suite.addTest(DbIndexTest('test_create_indexes'))
+    suite.addTest(DbIndexTest('test_duplicate_rows'))
+    # 测试TMDB缓存
+    suite.addTest(MetaHelperTest('test_migrate'))
+    suite.addTest(MetaHelperTest('test_get_update_delete'))
+    suite.addTest(MetaHelperTest('test_release_connection'))
+    # 测试已处理记录索引
+    suite.addTest(SeenIndexTest('test_index'))
+    suite.addTest(SeenIndexTest('test_rss_enclosure'))
+    suite.addTest(SeenIndexTest('test_rss_enclosure_unit_of_work'))
+    suite.addTest(SeenIndexTest('test_rss_enclosure_benchmark'))
+    # 测试TMDB客户端
+    suite.addTest(TmdbTest('test_config'))
+    suite.addTest(TmdbTest('test_concurrent_language'))
+    suite.addTest(TmdbTest('test_response_cache'))
+    suite.addTest(TmdbTest('test_cache_limit'))
+    suite.addTest(TmdbTest('test_scheduler_priority'))
+    suite.addTest(TmdbTest('test_scheduler_pause'))
+    suite.addTest(TmdbTest('test_rate_limited'))
+    # 测试合并并发查询
+    suite.addTest(SingleFlightTest('test_do'))
+    suite.addTest(SingleFlightTest('test_error'))
+    suite.addTest(SingleFlightTest('test_get_tmdb_info'))
+    suite.addTest(SingleFlightTest('test_get_media_info_chatgpt'))
+    # 测试插件事件分发
+    suite.addTest(EventBusTest('test_dispatch'))
+    suite.addTest(EventBusTest('test_coalesce'))
+    suite.addTest(EventBusTest('test_limits'))
+    # 测试消息发送队列
+    suite.addTest(MessageQueueTest('test_non_blocking'))
+    suite.addTest(MessageQueueTest('test_retry'))
+    suite.addTest(MessageQueueTest('test_retry_segments'))
+    suite.addTest(MessageQueueTest('test_digest'))
+    # 测试首页数据快照
+    suite.addTest(DashboardTest('test_snapshot'))
+    suite.addTest(DashboardTest('test_server_changed'))
+    # 测试实时日志和进度推送
+    suite.addTest(StreamTest('test_logs'))
+    suite.addTest(StreamTest('test_progress'))
+    # 测试图片缓存
+    suite.addTest(ImageCacheTest('test_variant'))
+    suite.addTest(ImageCacheTest('test_limit'))
+    suite.addTest(ImageCacheTest('test_persist'))
+    suite.addTest(ImageCacheTest('test_small_original'))
+    # 测试日志队列
+    suite.addTest(LogTest('test_queue'))
+    suite.addTest(LogTest('test_level'))
+    suite.addTest(LogTest('test_concurrent'))
+    # 测试下载器种子镜像
+    suite.addTest(TorrentMirrorTest('test_qbittorrent'))
+    suite.addTest(TorrentMirrorTest('test_invalidate_after_change'))
+    suite.addTest(TorrentMirrorTest('test_transmission'))
+    # 测试刷流准入检查
+    suite.addTest(BrushAdmissionTest('test_snapshot'))
+    suite.addTest(BrushAdmissionTest('test_site_tags'))
+    # 测试过滤规则
+    suite.addTest(FilterTest('test_check_rules'))
+    suite.addTest(FilterTest('test_check_rules_benchmark'))
+    # 测试RSS订阅索引
+    suite.addTest(RssIndexTest('test_match'))
+    suite.addTest(RssIndexTest('test_match_benchmark'))
+    # 测试RSS并发下载
+    suite.addTest(RssFetchTest('test_fetch'))
+    # 测试订阅批量搜索
+    suite.addTest(SubscribeSearchTest('test_indexer'))
+    suite.addTest(SubscribeSearchTest('test_unshared_fetch'))
+    suite.addTest(SubscribeSearchTest('test_subscribe'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
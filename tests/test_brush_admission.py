@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.brushtask import _BrushAdmission, BrushTask
+
+
+class _FakeDownloader(object):
+    def __init__(self):
+        self.calls = []
+        self.torrents = [
+            {"state": "downloading", "tags": ["刷流", "站点"]},
+            {"state": "downloading", "tags": ["其它"]},
+            {"state": "seeding", "tags": ["刷流", "站点"]}
+        ]
+
+    def get_downloader(self, downloader_id):
+        self.calls.append("speed")
+        return self
+
+    @staticmethod
+    def get_client_speed():
+        return {"up_speed": 1024, "dl_speed": 2048}
+
+    def __filter(self, tag, state=None):
+        return [torrent for torrent in self.torrents
+                if (not state or torrent["state"] == state) and all(t in torrent["tags"] for t in tag or [])]
+
+    def get_downloading_torrents(self, downloader_id, tag=None):
+        self.calls.append(("downloading", tuple(tag or [])))
+        return self.__filter(tag, "downloading")
+
+    def get_torrents(self, downloader_id, tag=None):
+        self.calls.append(("total", tuple(tag or [])))
+        return self.__filter(tag)
+
+
+class _FakeDbHelper(object):
+    def __init__(self):
+        self.calls = 0
+
+    def get_brushtask_totalsize(self, brush_id):
+        self.calls += 1
+        return 1024
+
+
+class BrushAdmissionTest(TestCase):
+    def test_snapshot(self):
+        downloader = _FakeDownloader()
+        dbhelper = _FakeDbHelper()
+        admission = _BrushAdmission(taskinfo={"id": 1, "downloader": 1}, dbhelper=dbhelper, downloader=downloader)
+        # 多次检查只查询一次
+        for _ in range(3):
+            self.assertEqual(admission.total_size, 1024)
+            self.assertEqual(admission.get_downloading_count(), 2)
+            self.assertEqual(admission.get_downloading_count(tag=["刷流", "站点"]), 1)
+            self.assertEqual(admission.get_task_count(tag=["刷流", "站点"]), 2)
+            self.assertEqual(admission.get_client_speed().get("up_speed"), 1024)
+        self.assertEqual(dbhelper.calls, 1)
+        self.assertEqual(len(downloader.calls), 4)
+        # 添加种子后本地累加，只有包含全部标签的计数增加
+        admission.add_torrent(size="2048", tags=["刷流"])
+        self.assertEqual(admission.total_size, 3072)
+        self.assertEqual(admission.get_downloading_count(), 3)
+        self.assertEqual(admission.get_downloading_count(tag=["刷流", "站点"]), 1)
+        admission.add_torrent(size=None, tags=["刷流", "站点"])
+        self.assertEqual((admission.get_downloading_count(), admission.get_task_count(tag=["刷流", "站点"])), (4, 3))
+        self.assertEqual(len(downloader.calls), 4)
+
+    def test_site_tags(self):
+        # 站点设置了标签时，添加种子后站点任务数按任务标签和站点标签累加，单次运行内不超过上限
+        brushtask = BrushTask()
+        taskinfo = {"id": 1, "downloader": 1, "name": "刷流任务", "label": "刷流"}
+        site_info = {"name": "站点", "tags": "站点"}
+        admission = _BrushAdmission(taskinfo=taskinfo, dbhelper=_FakeDbHelper(), downloader=_FakeDownloader())
+
+        def is_allow():
+            return brushtask._BrushTask__is_allow_new_torrent(admission=admission, taskinfo=taskinfo, dlcount=None,
+                                                               current_site_dlcount=None, current_site_count=3,
+                                                               site_info=site_info)
+
+        self.assertTrue(is_allow())
+        admission.add_torrent(size=None, tags=brushtask._BrushTask__get_site_labels(taskinfo, site_info))
+        self.assertFalse(is_allow())
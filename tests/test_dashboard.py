@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase
+
+from app.mediaserver import MediaServer
+from web.action import WebAction
+from web.backend.dashboard import Dashboard
+
+
+class DashboardTest(TestCase):
+    def setUp(self) -> None:
+        self.calls = []
+        self.originals = {}
+        self.mediaserver = MediaServer()
+
+        def slow(name, result):
+            def func(*args, **kwargs):
+                self.calls.append(name)
+                # 模拟远程媒体服务器的响应时间
+                time.sleep(0.2)
+                return result
+
+            return func
+
+        for name, result in [("get_library_mediacount", {"code": 0, "Movie": "1"}),
+                             ("get_library_playhistory", {"code": 0, "result": []}),
+                             ("get_library_spacesize", {"FreeSpace": 1})]:
+            self.originals[(WebAction, name)] = WebAction.__dict__[name]
+            setattr(WebAction, name, staticmethod(slow(name, result)))
+        for name in ["get_libraries", "get_resume", "get_latest"]:
+            self.originals[(self.mediaserver, name)] = None
+            setattr(self.mediaserver, name, slow(name, [name]))
+        self.dashboard = Dashboard()
+        self.dashboard._snapshot = None
+
+    def tearDown(self) -> None:
+        for (obj, name), original in self.originals.items():
+            if original is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, original)
+
+    def test_snapshot(self):
+        start = time.time()
+        snapshot = self.dashboard.get_snapshot()
+        # 并发查询，总耗时接近单个查询
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(len(self.calls), 6)
+        self.assertEqual(snapshot.get("MediaCounts").get("Movie"), "1")
+        self.assertEqual(snapshot.get("Latests"), ["get_latest"])
+        # 有效期内直接返回快照
+        self.dashboard.get_snapshot()
+        self.assertEqual(len(self.calls), 6)
+        # 过期后返回旧快照并在后台刷新
+        self.dashboard._snapshot_time = 0
+        start = time.time()
+        self.assertEqual(self.dashboard.get_snapshot(), snapshot)
+        self.assertLess(time.time() - start, 0.1)
+        time.sleep(0.5)
+        self.assertEqual(len(self.calls), 12)
+
+    def test_server_changed(self):
+        self.dashboard.get_snapshot()
+        # 快照过期且媒体服务器已切换时同步查询，之后过期仍能在后台刷新
+        self.dashboard._snapshot_time = 0
+        self.dashboard._snapshot_server = "changed"
+        self.dashboard.get_snapshot()
+        self.assertEqual(len(self.calls), 12)
+        self.dashboard._snapshot_time = 0
+        start = time.time()
+        self.dashboard.get_snapshot()
+        self.assertLess(time.time() - start, 0.1)
+        time.sleep(0.5)
+        self.assertEqual(len(self.calls), 18)
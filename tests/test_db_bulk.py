@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+from app.db import MainDb, DbPersist
+from app.db.models import INDEXERSTATISTICS
+from app.helper import DbHelper
+
+_db = MainDb()
+# 测试数据的索引器名称，用于清理
+TEST_INDEXER = "__test_db_bulk__"
+
+
+@DbPersist(_db)
+def _legacy_insert(item):
+    _db.insert(INDEXERSTATISTICS(**item))
+
+
+@DbPersist(_db)
+def _failed_insert(item):
+    _db.insert(INDEXERSTATISTICS(**item))
+    raise Exception("写入出错")
+
+
+class DbBulkTest(TestCase):
+    def setUp(self) -> None:
+        self.dbhelper = DbHelper()
+        self.rows = [{
+            "INDEXER": TEST_INDEXER,
+            "TYPE": "builtin",
+            "SECONDS": i % 30,
+            "RESULT": "Y" if i % 3 else "N",
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        } for i in range(500)]
+
+    def tearDown(self) -> None:
+        _db.query(INDEXERSTATISTICS).filter(INDEXERSTATISTICS.INDEXER == TEST_INDEXER).delete()
+        _db.commit()
+
+    def count(self):
+        return _db.query(INDEXERSTATISTICS).filter(INDEXERSTATISTICS.INDEXER == TEST_INDEXER).count()
+
+    def test_unit_of_work(self):
+        with self.dbhelper.unit_of_work():
+            for row in self.rows[:10]:
+                _legacy_insert(row)
+            # 未提交前其它线程看不到数据
+            counts = []
+            thread = threading.Thread(target=lambda: counts.append(self.count()))
+            thread.start()
+            thread.join()
+            self.assertEqual(counts, [0])
+        self.assertEqual(self.count(), 10)
+
+    def test_unit_of_work_failed(self):
+        # 单元内任一写入失败时，之前和之后的写入都不提交
+        with self.dbhelper.unit_of_work():
+            self.assertTrue(_legacy_insert(self.rows[0]))
+            with self.dbhelper.unit_of_work():
+                self.assertFalse(_failed_insert(self.rows[1]))
+            self.assertTrue(_legacy_insert(self.rows[2]))
+        self.assertEqual(self.count(), 0)
+        # 失败标记不影响下一个事务单元
+        with self.dbhelper.unit_of_work():
+            _legacy_insert(self.rows[0])
+        self.assertEqual(self.count(), 1)
+
+    def test_indexer_statistics_batch(self):
+        def search(statistics, seconds):
+            with self.dbhelper.indexer_statistics_batch(statistics):
+                self.dbhelper.insert_indexer_statistics(indexer=TEST_INDEXER, itype="builtin",
+                                                        seconds=seconds, result="Y")
+
+        def other_batch():
+            # 其它线程独立的收集不影响当前线程
+            with self.dbhelper.indexer_statistics_batch():
+                self.dbhelper.insert_indexer_statistics(indexer=TEST_INDEXER, itype="builtin",
+                                                        seconds=99, result="N")
+
+        with self.dbhelper.indexer_statistics_batch() as statistics:
+            threads = [threading.Thread(target=search, args=(statistics, i)) for i in range(30)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            thread = threading.Thread(target=other_batch)
+            thread.start()
+            thread.join()
+            self.assertEqual(self.count(), 1)
+            self.assertEqual(len(statistics), 30)
+            # 未加入收集的线程直接写入
+            thread = threading.Thread(target=self.dbhelper.insert_indexer_statistics,
+                                      kwargs={"indexer": TEST_INDEXER, "itype": "builtin",
+                                              "seconds": 0, "result": "N"})
+            thread.start()
+            thread.join()
+            self.assertEqual(self.count(), 2)
+        self.assertEqual(self.count(), 32)
+
+    def test_bulk_insert_benchmark(self):
+        start = time.perf_counter()
+        for row in self.rows:
+            _legacy_insert(row)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        with self.dbhelper.unit_of_work():
+            for row in self.rows:
+                _legacy_insert(row)
+        uow_time = time.perf_counter() - start
+        start = time.perf_counter()
+        with self.dbhelper.unit_of_work():
+            _db.bulk_insert(INDEXERSTATISTICS, self.rows)
+        bulk_time = time.perf_counter() - start
+        self.assertEqual(self.count(), 3 * len(self.rows))
+        print(f"\n写入 {len(self.rows)} 条记录，逐条提交 {len(self.rows) / legacy_time:.0f} 条/秒，"
+              f"事务单元 {len(self.rows) / uow_time:.0f} 条/秒，批量插入 {len(self.rows) / bulk_time:.0f} 条/秒")
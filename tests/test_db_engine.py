@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+from app.db.engine import create_sqlite_engine, get_database_conf
+
+# 原有的连接参数：默认日志模式，sqlite3模块默认等待5秒
+LEGACY_CONF = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "busy_timeout": 5000,
+    "cache_size": -2000,
+    "mmap_size": 0,
+    "pool_size": 100,
+    "max_overflow": 0
+}
+
+
+class DbEngineTest(TestCase):
+    def setUp(self) -> None:
+        self.temp_path = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_path, ignore_errors=True)
+
+    def test_database_conf(self):
+        conf = get_database_conf({"journal_mode": "WAL", "busy_timeout": "5000", "cache_size": "x",
+                                  "synchronous": "unknown"})
+        self.assertEqual(conf.get("journal_mode"), "wal")
+        self.assertEqual(conf.get("busy_timeout"), 5000)
+        self.assertEqual(conf.get("cache_size"), -16000)
+        self.assertEqual(conf.get("synchronous"), "normal")
+        # 连接池容量与原有一致
+        self.assertEqual((conf.get("pool_size"), conf.get("max_overflow")), (100, 0))
+
+    def test_pool_capacity(self):
+        # 长期运行的线程各自持有未提交的会话，连接池不能耗尽
+        engine = create_sqlite_engine(os.path.join(self.temp_path, "pool.db"), conf={"pool_timeout": 1})
+        session = scoped_session(sessionmaker(bind=engine))
+        errors = []
+        barrier = threading.Barrier(64)
+
+        def worker():
+            try:
+                session().execute(text("SELECT 1")).scalar()
+                barrier.wait(timeout=10)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.remove()
+
+        threads = [threading.Thread(target=worker) for _ in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        self.assertEqual(errors, [])
+
+    def test_pragma(self):
+        engine = create_sqlite_engine(os.path.join(self.temp_path, "pragma.db"), conf={})
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 30000)
+        engine.dispose()
+
+    def run_contention(self, name, conf, writers=4, readers=8, seconds=2.0):
+        """
+        多个写线程和读线程同时访问同一数据库，统计吞吐量和失败次数
+        """
+        engine = create_sqlite_engine(os.path.join(self.temp_path, f"{name}.db"), conf=conf)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE ITEMS (ID INTEGER PRIMARY KEY, NAME TEXT, VALUE INTEGER)"))
+        stats = {"writes": 0, "reads": 0, "errors": 0}
+        stats_lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def count(key):
+            with stats_lock:
+                stats[key] += 1
+
+        def writer(wid):
+            i = 0
+            while time.perf_counter() < deadline:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text("INSERT INTO ITEMS (NAME, VALUE) VALUES (:name, :value)"),
+                                     {"name": f"writer{wid}", "value": i})
+                    count("writes")
+                except Exception:
+                    count("errors")
+                i += 1
+
+        def reader():
+            while time.perf_counter() < deadline:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT COUNT(*), MAX(VALUE) FROM ITEMS")).fetchone()
+                    count("reads")
+                except Exception:
+                    count("errors")
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)] \
+            + [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        return stats
+
+    def test_contention_benchmark(self):
+        legacy = self.run_contention("legacy", LEGACY_CONF)
+        tuned = self.run_contention("tuned", {})
+        self.assertEqual(tuned.get("errors"), 0)
+        self.assertGreater(tuned.get("writes"), 0)
+        print(f"\n原参数：写入 {legacy['writes']} 次，读取 {legacy['reads']} 次，失败 {legacy['errors']} 次；"
+              f"WAL参数：写入 {tuned['writes']} 次，读取 {tuned['reads']} 次，失败 {tuned['errors']} 次")
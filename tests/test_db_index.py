@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from sqlalchemy import select, text, MetaData
+
+from app.db.engine import create_sqlite_engine, create_indexes
+from app.db.models import Base, BaseMedia, RSSTORRENTS, DOWNLOADHISTORY, SITEBRUSHTORRENTS, TRANSFERHISTORY, \
+    MEDIASYNCITEMS, SITESTATISTICSHISTORY
+
+
+class DbIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.temp_path = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(os.path.join(self.temp_path, "user.db"), conf={})
+        self.media_engine = create_sqlite_engine(os.path.join(self.temp_path, "media.db"), conf={})
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.media_engine.dispose()
+        shutil.rmtree(self.temp_path, ignore_errors=True)
+
+    @staticmethod
+    def create_tables_without_index(metadata, engine):
+        """
+        模拟旧版本数据库：只有表没有索引
+        """
+        plain = MetaData()
+        for table in metadata.sorted_tables:
+            table.to_metadata(plain)
+        for table in plain.sorted_tables:
+            table.indexes.clear()
+            for column in table.columns:
+                column.index = None
+                column.unique = None
+        plain.create_all(engine)
+
+    @staticmethod
+    def query_plan(engine, statement):
+        sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        with engine.connect() as conn:
+            return " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    def hot_queries(self):
+        return [
+            (self.engine, select(RSSTORRENTS).where(RSSTORRENTS.ENCLOSURE == "url")),
+            (self.engine, select(DOWNLOADHISTORY).where(DOWNLOADHISTORY.SAVE_PATH == "/path")
+             .order_by(DOWNLOADHISTORY.DATE.desc())),
+            (self.engine, select(DOWNLOADHISTORY).where(DOWNLOADHISTORY.DOWNLOADER == "qb",
+                                                        DOWNLOADHISTORY.DOWNLOAD_ID == "hash")),
+            (self.engine, select(SITEBRUSHTORRENTS).where(SITEBRUSHTORRENTS.TASK_ID == "1",
+                                                          SITEBRUSHTORRENTS.TORRENT_NAME == "name",
+                                                          SITEBRUSHTORRENTS.ENCLOSURE == "url")),
+            (self.engine, select(TRANSFERHISTORY).where(TRANSFERHISTORY.SOURCE_PATH == "/path",
+                                                        TRANSFERHISTORY.SOURCE_FILENAME == "file")),
+            (self.media_engine, select(MEDIASYNCITEMS).where(MEDIASYNCITEMS.SERVER == "emby",
+                                                             MEDIASYNCITEMS.TMDBID == "1")),
+            (self.media_engine, select(MEDIASYNCITEMS).where(MEDIASYNCITEMS.SERVER == "emby",
+                                                             MEDIASYNCITEMS.TITLE == "title",
+                                                             MEDIASYNCITEMS.YEAR == "2023")),
+        ]
+
+    def test_create_indexes(self):
+        self.create_tables_without_index(Base.metadata, self.engine)
+        self.create_tables_without_index(BaseMedia.metadata, self.media_engine)
+        for engine, statement in self.hot_queries():
+            self.assertNotIn("USING INDEX", self.query_plan(engine, statement))
+        created = create_indexes(Base.metadata, self.engine) + create_indexes(BaseMedia.metadata, self.media_engine)
+        self.assertIn("INDX_DOWNLOAD_HISTORY_SAVE_PATH", created)
+        self.assertIn("INDX_MEDIASYNC_ITEMS_STY", created)
+        # 已存在的索引不重复创建
+        self.assertEqual(create_indexes(Base.metadata, self.engine), [])
+        for engine, statement in self.hot_queries():
+            plan = self.query_plan(engine, statement)
+            self.assertIn("USING INDEX", plan, plan)
+
+    def test_duplicate_rows(self):
+        # 旧数据存在重复记录时跳过无法创建的唯一索引，其它索引照常创建
+        self.create_tables_without_index(Base.metadata, self.engine)
+        with self.engine.begin() as conn:
+            for _ in range(2):
+                conn.execute(SITESTATISTICSHISTORY.__table__.insert().values(SITE="站点", DATE="2023-01-01",
+                                                                             URL="https://site/"))
+        created = create_indexes(Base.metadata, self.engine)
+        self.assertNotIn("UN_INDX_SITE_STATISTICS_HISTORY_DS", created)
+        self.assertIn("INDX_DOWNLOAD_HISTORY_SAVE_PATH", created)
+        self.assertIn("INDX_SITE_STATISTICS_HISTORY_DS", created)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+from app.plugins.event_bus import EventBus
+from app.plugins.event_manager import Event
+from app.utils.types import EventType
+
+
+class EventBusTest(TestCase):
+    def setUp(self) -> None:
+        self.handled = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+
+        def runner(pid, method, event):
+            if pid == "SlowPlugin":
+                with self.lock:
+                    self.running += 1
+                    self.max_running = max(self.max_running, self.running)
+                self.release.wait(timeout=5)
+                with self.lock:
+                    self.running -= 1
+            if event.event_data.get("error"):
+                raise ValueError("failed")
+            with self.lock:
+                self.handled.append((pid, event.event_data.get("seq")))
+
+        self.bus = EventBus(runner=runner, maxsize=10, timeout=1)
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.bus.stop()
+
+    @staticmethod
+    def make_event(etype=EventType.DownloadAdd, **data):
+        event = Event(etype.value)
+        event.event_data = data
+        return event
+
+    def wait_handled(self, count, timeout=3):
+        start = time.time()
+        while len(self.handled) < count and time.time() - start < timeout:
+            time.sleep(0.01)
+
+    def test_dispatch(self):
+        for seq in range(5):
+            self.bus.dispatch("SlowPlugin", "send", self.make_event(seq=seq))
+            self.bus.dispatch("FastPlugin", "send", self.make_event(seq=seq))
+        # 慢插件不影响其它插件
+        self.wait_handled(5)
+        self.assertEqual(self.handled, [("FastPlugin", seq) for seq in range(5)])
+        self.release.set()
+        self.wait_handled(10)
+        # 同一插件内按顺序处理
+        self.assertEqual([seq for pid, seq in self.handled if pid == "SlowPlugin"], list(range(5)))
+        statistics = {item["pid"]: item for item in self.bus.get_statistics()}
+        self.assertEqual(statistics["SlowPlugin"]["handlers"]["send"]["count"], 5)
+        self.assertEqual(statistics["FastPlugin"]["queued"], 0)
+
+    def test_coalesce(self):
+        self.bus.dispatch("SlowPlugin", "sync", self.make_event(EventType.DoubanSync, seq=0))
+        time.sleep(0.1)
+        # 处理中的事件之后，相同的可合并事件只排队一个
+        for _ in range(3):
+            self.bus.dispatch("SlowPlugin", "sync", self.make_event(EventType.DoubanSync, seq=1))
+        for _ in range(2):
+            self.bus.dispatch("SlowPlugin", "send", self.make_event(seq=2))
+        self.release.set()
+        self.wait_handled(4)
+        time.sleep(0.1)
+        self.assertEqual(self.handled, [("SlowPlugin", 0), ("SlowPlugin", 1), ("SlowPlugin", 2), ("SlowPlugin", 2)])
+        self.assertEqual(self.bus.get_statistics()[0]["coalesced"], 2)
+
+    def test_limits(self):
+        # 第一个事件处理中，队列已满时丢弃
+        self.bus.dispatch("SlowPlugin", "send", self.make_event(seq=0))
+        start = time.time()
+        while not self.running and time.time() - start < 3:
+            time.sleep(0.01)
+        for seq in range(1, 20):
+            self.bus.dispatch("SlowPlugin", "send", self.make_event(seq=seq))
+        self.bus.dispatch("FastPlugin", "send", self.make_event(error=True))
+        # 超时后暂停处理，不另起线程处理后续事件
+        time.sleep(1.5)
+        statistics = {item["pid"]: item for item in self.bus.get_statistics()}
+        self.assertEqual(statistics["SlowPlugin"]["timeouts"], 1)
+        self.assertTrue(statistics["SlowPlugin"]["stalled"])
+        self.assertEqual(self.handled, [])
+        # 处理完成后继续处理后续事件
+        self.release.set()
+        self.wait_handled(11)
+        statistics = {item["pid"]: item for item in self.bus.get_statistics()}
+        self.assertFalse(statistics["SlowPlugin"]["stalled"])
+        self.assertEqual([seq for pid, seq in self.handled], list(range(11)))
+        self.assertEqual(statistics["SlowPlugin"]["dropped"], 9)
+        self.assertEqual(statistics["FastPlugin"]["errors"], 1)
+        self.assertEqual(self.max_running, 1)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import re
+import time
+from types import SimpleNamespace
+from unittest import TestCase
+
+from app.filter import Filter
+from app.utils import StringUtils
+from app.utils.types import MediaType
+from tests.cases.meta_cases import meta_cases
+
+
+def _group(gid, name, default="N"):
+    return SimpleNamespace(ID=gid, GROUP_NAME=name, IS_DEFAULT=default, NOTE="")
+
+
+def _rule(rid, gid, pri, include="", exclude="", size="", free=""):
+    return SimpleNamespace(ID=rid, GROUP_ID=gid, ROLE_NAME=f"规则{rid}", PRIORITY=pri,
+                           INCLUDE=include, EXCLUDE=exclude, SIZE_LIMIT=size, NOTE=free)
+
+
+# 覆盖包含、多个排除、大小、促销以及错误正则的规则
+groups_cases = [_group(1, "默认", "Y"), _group(2, "4K")]
+rules_cases = [
+    _rule(1, 1, "1", include="2160p|4K\nWEB-?DL", exclude="HDR\nDV", size="1,100"),
+    _rule(2, 1, "2", include="1080p", exclude="x264", free="1.0 0.0"),
+    _rule(3, 1, "3", include="[(", size="5"),
+    _rule(4, 1, "4", exclude="CAM\nTS\nTC", size="0,10"),
+    _rule(6, 2, "0", exclude="NO-SUCH-WORD\n[("),
+    _rule(5, 2, "1", include="2160p", exclude=r"(\d)\1"),
+]
+
+
+def _meta(title, index):
+    return SimpleNamespace(rev_string=title,
+                           subtitle="HDR DV" if index % 5 == 0 else "",
+                           size=(index % 7 + 1) * 3 * 1024 ** 3,
+                           type=MediaType.MOVIE if index % 2 else MediaType.TV,
+                           total_episodes=index % 3,
+                           upload_volume_factor=1.0 if index % 4 else None,
+                           download_volume_factor=(index % 3) / 2 if index % 4 else None)
+
+
+class _LegacyFilter(object):
+    """
+    未预编译时的过滤规则匹配逻辑：每次匹配都重新构造规则组和规则，逐项编译正则，作为结果比对和性能基准
+    """
+
+    def __init__(self, groups, rules):
+        self._groups = groups
+        self._rules = rules
+
+    def get_rule_groups(self, groupid=None, default=False):
+        ret_groups = []
+        for group in self._groups:
+            group_info = {
+                "id": group.ID,
+                "name": group.GROUP_NAME,
+                "default": group.IS_DEFAULT,
+                "note": group.NOTE
+            }
+            if (groupid and str(groupid) == str(group.ID)) \
+                    or (default and group.IS_DEFAULT == "Y"):
+                return group_info
+            ret_groups.append(group_info)
+        if groupid or default:
+            return {}
+        return ret_groups
+
+    def get_rules(self, groupid, ruleid=None):
+        if not groupid:
+            return []
+        ret_rules = []
+        for rule in self._rules:
+            rule_info = {
+                "id": rule.ID,
+                "group": rule.GROUP_ID,
+                "name": rule.ROLE_NAME,
+                "pri": rule.PRIORITY or 0,
+                "include": rule.INCLUDE.split("\n") if rule.INCLUDE else [],
+                "exclude": rule.EXCLUDE.split("\n") if rule.EXCLUDE else [],
+                "size": rule.SIZE_LIMIT,
+                "free": rule.NOTE,
+                "free_text": {
+                    "1.0 1.0": "普通",
+                    "1.0 0.0": "免费",
+                    "2.0 0.0": "2X免费"
+                }.get(rule.NOTE, "全部") if rule.NOTE else ""
+            }
+            if str(rule.GROUP_ID) == str(groupid) \
+                    and (not ruleid or int(ruleid) == rule.ID):
+                ret_rules.append(rule_info)
+        if ruleid:
+            return ret_rules[0] if ret_rules else {}
+        return ret_rules
+
+    def check_rules(self, meta_info, rulegroup=None):
+        if not meta_info:
+            return False, 0, ""
+        if rulegroup and int(rulegroup) == -1:
+            return True, 0, "不过滤"
+        title = meta_info.rev_string
+        if meta_info.subtitle:
+            title = f"{title} {meta_info.subtitle}"
+        if not rulegroup:
+            rulegroup = self.get_rule_groups(default=True)
+            if not rulegroup:
+                return True, 0, "未配置过滤规则"
+        else:
+            rulegroup = self.get_rule_groups(groupid=rulegroup)
+        filters = self.get_rules(groupid=rulegroup.get("id"))
+        order_seq = 0
+        group_match = True
+        for filter_info in filters:
+            try:
+                rule_match = True
+                order_seq = 100 - int(filter_info.get('pri'))
+                includes = filter_info.get('include')
+                if includes and rule_match:
+                    include_flag = True
+                    for include in includes:
+                        if not include:
+                            continue
+                        if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
+                            include_flag = False
+                            break
+                    if not include_flag:
+                        rule_match = False
+                excludes = filter_info.get('exclude')
+                if excludes and rule_match:
+                    exclude_flag = False
+                    exclude_count = 0
+                    for exclude in excludes:
+                        if not exclude:
+                            continue
+                        exclude_count += 1
+                        if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                            exclude_flag = True
+                    if exclude_count > 0 and not exclude_flag:
+                        rule_match = False
+                sizes = filter_info.get('size')
+                if sizes and rule_match and meta_info.size:
+                    meta_info.size = StringUtils.num_filesize(meta_info.size)
+                    if sizes.find(',') != -1:
+                        sizes = sizes.split(',')
+                        begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+                        end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+                    else:
+                        begin_size = 0
+                        end_size = int(sizes.strip()) if sizes.isdigit() else 0
+                    if meta_info.type == MediaType.MOVIE:
+                        if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                            rule_match = False
+                    else:
+                        if meta_info.total_episodes \
+                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(
+                                    meta_info.total_episodes) <= end_size * 1024 ** 3:
+                            rule_match = False
+                free = filter_info.get("free")
+                if free and meta_info.upload_volume_factor is not None \
+                        and meta_info.download_volume_factor is not None:
+                    ul_factor, dl_factor = free.split()
+                    if float(ul_factor) > meta_info.upload_volume_factor \
+                            or float(dl_factor) < meta_info.download_volume_factor:
+                        rule_match = False
+                if rule_match:
+                    return True, order_seq, rulegroup.get("name")
+                else:
+                    group_match = False
+            except Exception:
+                pass
+        if not group_match:
+            return False, 0, rulegroup.get("name")
+        return True, order_seq, rulegroup.get("name")
+
+
+class FilterTest(TestCase):
+    def setUp(self) -> None:
+        self.filter = Filter()
+        self.filter._groups = groups_cases
+        self.filter._rules = rules_cases
+        self.filter.build_program()
+        self.legacy = _LegacyFilter(groups_cases, rules_cases)
+        titles = [info.get("title") for info in meta_cases if info.get("title")]
+        self.metas = [_meta(title, index) for index, title in enumerate(titles)]
+
+    def tearDown(self) -> None:
+        self.filter.init_config()
+
+    def test_check_rules(self):
+        for rulegroup in [None, 1, 2, 3]:
+            expected = [self.legacy.check_rules(meta, rulegroup) for meta in self.metas]
+            self.assertEqual(expected, [self.filter.check_rules(meta, rulegroup) for meta in self.metas])
+            self.assertEqual(expected, self.filter.evaluate(self.metas, rulegroup))
+        # 结果中既有匹配也有不匹配
+        self.assertEqual({match for match, _, _ in self.filter.evaluate(self.metas)}, {True, False})
+        self.assertEqual(self.filter.evaluate([self.metas[0], None], -1), [(True, 0, "不过滤"), (False, 0, "")])
+        self.assertEqual(self.filter.get_rules(1, 2).get("free_text"), "免费")
+        self.assertEqual(self.filter.get_rule_groups(default=True).get("name"), "默认")
+
+    def test_check_rules_benchmark(self):
+        rounds = 20
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for meta in self.metas:
+                self.legacy.check_rules(meta)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(rounds):
+            self.filter.evaluate(self.metas)
+        compiled_time = time.perf_counter() - start
+        print(f"\n过滤规则匹配 {rounds * len(self.metas)} 个种子，"
+              f"原方式 {legacy_time:.3f} 秒，预编译 {compiled_time:.3f} 秒")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import TestCase, mock
+
+from PIL import Image
+
+from app.helper import ImageCacheHelper
+
+
+class ImageCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.path = tempfile.mkdtemp()
+        self.downloads = []
+        self.helper = ImageCacheHelper()
+        self.reset(maxbytes=1024 * 1024)
+
+        def download(url):
+            self.downloads.append(url)
+            time.sleep(0.05)
+            if url.endswith("missing"):
+                return None
+            if url.endswith("big"):
+                return b"0" * 400 * 1024
+            output = BytesIO()
+            size = (100, 150) if url.endswith("small") else (1000, 1500)
+            Image.new("RGB", size, (255, 0, 0)).save(output, format="PNG")
+            return output.getvalue()
+
+        self.patcher = mock.patch.object(type(self.helper), "_ImageCacheHelper__download",
+                                         staticmethod(download))
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.helper.init_config()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def reset(self, maxbytes):
+        # 模拟重启，重新扫描缓存目录
+        self.helper.init_config()
+        self.helper._cache_path = self.path
+        self.helper._maxbytes = maxbytes
+
+    def test_variant(self):
+        self.assertEqual(self.helper.get_width("300"), 342)
+        self.assertEqual(self.helper.get_width(5000), 0)
+        self.assertIsNone(self.helper.get_image("http://image/missing"))
+        # 同时请求同一图片只下载一次
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.helper.get_image("http://image/poster", 342)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.downloads, ["http://image/missing", "http://image/poster"])
+        with Image.open(results[0]) as image:
+            self.assertEqual((image.format, image.size), ("JPEG", (342, 513)))
+        self.assertEqual(self.helper.get_mimetype(results[0]), "image/jpeg")
+        # 原图和缩略图都已缓存
+        original = self.helper.get_image("http://image/poster")
+        self.assertEqual(self.helper.get_mimetype(original), "image/png")
+        self.assertEqual(len(self.downloads), 2)
+        self.assertEqual(self.helper.get_statistics()["count"], 2)
+
+    def test_limit(self):
+        self.helper.get_image("http://image/0/big")
+        self.helper.get_image("http://image/1/big")
+        self.helper.get_image("http://image/0/big")
+        self.helper.get_image("http://image/2/big")
+        # 超出大小后删除最久未访问的图片
+        statistics = self.helper.get_statistics()
+        self.assertEqual(statistics["count"], 2)
+        self.assertLessEqual(statistics["bytes"], 1024 * 1024)
+        self.assertEqual(len(self.downloads), 3)
+        self.helper.get_image("http://image/0/big")
+        self.assertEqual(len(self.downloads), 3)
+        self.helper.get_image("http://image/1/big")
+        self.assertEqual(self.downloads[-1], "http://image/1/big")
+        self.assertEqual(len(self.downloads), 4)
+
+    def test_persist(self):
+        self.helper.get_image("http://image/0/big")
+        time.sleep(0.05)
+        self.helper.get_image("http://image/1/big")
+        time.sleep(0.05)
+        # 访问后更新淘汰顺序，重启后仍然有效
+        self.helper.get_image("http://image/0/big")
+        self.reset(maxbytes=500 * 1024)
+        self.assertEqual(self.helper.get_statistics()["count"], 1)
+        self.helper.get_image("http://image/0/big")
+        self.assertEqual(len(self.downloads), 2)
+        self.assertEqual(len([name for _, _, names in os.walk(self.path) for name in names]), 1)
+
+    def test_small_original(self):
+        original = self.helper.get_image("http://image/small")
+        # 原图不大于缩略图宽度时，原图作为该宽度的缓存，之后查询直接命中
+        path = self.helper.get_image("http://image/small", 185)
+        self.assertNotEqual(path, original)
+        with open(path, "rb") as f, open(original, "rb") as o:
+            self.assertEqual(f.read(), o.read())
+        with mock.patch.object(type(self.helper), "_ImageCacheHelper__fetch") as fetch:
+            self.assertEqual(self.helper.get_image("http://image/small", 185), path)
+            fetch.assert_not_called()
+        self.assertEqual(self.downloads, ["http://image/small"])
+        # 不残留临时文件
+        self.assertEqual(len([name for _, _, names in os.walk(self.path) for name in names]), 2)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from unittest import TestCase
+
+import log
+
+
+class _SlowHandler(logging.Handler):
+    """
+    模拟写入缓慢的日志输出
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.setFormatter(logging.Formatter('%(filename)s: %(message)s'))
+
+    def emit(self, record):
+        time.sleep(0.01)
+        self.records.append(self.format(record))
+
+
+class LogTest(TestCase):
+    def setUp(self) -> None:
+        self.logger = log.Logger.get_instance("logtest").logger
+        self.handler = _SlowHandler()
+        self.handlers = log.LOG_HANDLERS.get("logtest")
+        log.LOG_HANDLERS["logtest"] = [self.handler]
+
+    def tearDown(self) -> None:
+        log.LOG_HANDLERS["logtest"] = self.handlers
+        self.logger.setLevel(logging.INFO)
+
+    def wait_records(self, count, timeout=3):
+        start = time.time()
+        while len(self.handler.records) < count and time.time() - start < timeout:
+            time.sleep(0.01)
+
+    def test_queue(self):
+        # 调用方不等待日志写入
+        start = time.time()
+        for i in range(20):
+            log.info(f"【LogTest】第{i}条 <b>", module="logtest")
+        self.assertLess(time.time() - start, 0.1)
+        self.wait_records(20)
+        self.assertEqual(self.handler.records, [f"log.py: 【LogTest】第{i}条 <b>" for i in range(20)])
+        # 页面日志在读取时转义并提取来源
+        _, logs = log.get_logs(log.LOG_SEQ - 1)
+        self.assertEqual((logs[0].get("source"), logs[0].get("text")), ("LogTest", "第19条 &lt;b&gt;"))
+        self.assertNotIn("raw", logs[0])
+
+    def test_level(self):
+        log.debug("调试日志", module="logtest")
+        log.info("普通日志", module="logtest")
+        self.wait_records(1)
+        time.sleep(0.05)
+        self.assertEqual(self.handler.records, ["log.py: 普通日志"])
+        self.logger.setLevel(logging.DEBUG)
+        log.debug("调试日志", module="logtest")
+        self.wait_records(2)
+        self.assertEqual(self.handler.records[-1], "log.py: 调试日志")
+
+    def test_concurrent(self):
+        threads = [threading.Thread(target=lambda n=n: [log.warn(f"线程{n}-{i}", module="logtest") for i in range(10)])
+                   for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wait_records(50, timeout=5)
+        self.assertEqual(len(self.handler.records), 50)
+        # 同一线程的日志保持顺序
+        for n in range(5):
+            self.assertEqual([record for record in self.handler.records if record.startswith(f"log.py: 线程{n}-")],
+                             [f"log.py: 线程{n}-{i}" for i in range(10)])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+from app.message import Message
+from app.message.message_queue import MessageQueue
+
+
+class _FakeClient(object):
+    """
+    模拟消息端，第二段首次发送失败
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.failures = 1
+
+    def send_msg(self, title, text="", image="", url="", user_id=""):
+        if len(self.sent) == 1 and self.failures:
+            self.failures -= 1
+            return False, "发送失败"
+        self.sent.append((title, text))
+        return True, ""
+
+
+class MessageQueueTest(TestCase):
+    def setUp(self) -> None:
+        self.sent = []
+        self.failures = {}
+        self.release = threading.Event()
+
+        def sender(client, message):
+            if client.get("slow"):
+                self.release.wait(timeout=5)
+            # 模拟发送失败
+            if self.failures.get(message.get("title"), 0) > 0:
+                self.failures[message.get("title")] -= 1
+                return False
+            self.sent.append((client.get("name"), message.get("title"), message.get("text")))
+            return True
+
+        self.queue = MessageQueue(sender=sender, retry_times=2, retry_delay=0.05, digest_window=0.3)
+
+    def tearDown(self) -> None:
+        self.release.set()
+
+    def wait_sent(self, count, timeout=3):
+        start = time.time()
+        while len(self.sent) < count and time.time() - start < timeout:
+            time.sleep(0.01)
+
+    def test_non_blocking(self):
+        slow = {"id": 1, "name": "slow", "slow": True}
+        fast = {"id": 2, "name": "fast"}
+        start = time.time()
+        for i in range(3):
+            self.queue.put(slow, {"title": f"msg{i}"})
+            self.queue.put(fast, {"title": f"msg{i}"})
+        # 入队不等待发送
+        self.assertLess(time.time() - start, 0.1)
+        # 慢的消息端不影响其它消息端
+        self.wait_sent(3)
+        self.assertEqual([title for name, title, _ in self.sent], ["msg0", "msg1", "msg2"])
+        self.release.set()
+        self.wait_sent(6)
+        self.assertEqual([title for name, title, _ in self.sent if name == "slow"], ["msg0", "msg1", "msg2"])
+
+    def test_retry(self):
+        client = {"id": 1, "name": "client"}
+        self.failures = {"retry": 2, "failed": 10}
+        self.queue.put(client, {"title": "retry"})
+        self.queue.put(client, {"title": "failed"})
+        self.queue.put(client, {"title": "next"})
+        self.wait_sent(2)
+        self.assertEqual([title for _, title, _ in self.sent], ["retry", "next"])
+        statistics = self.queue.get_statistics()[0]
+        self.assertEqual((statistics["sent"], statistics["failed"], statistics["retries"]), (2, 1, 4))
+
+    def test_digest(self):
+        client = {"id": 1, "name": "client"}
+        for episode in range(1, 4):
+            self.queue.put(client, {"title": f"Show S01 E0{episode} 已入库", "text": "1GB"},
+                           digest_key="Show:S01", digest_title="Show S01 已入库")
+        self.queue.put(client, {"title": "Other S01 E01 已入库", "text": "1GB"},
+                       digest_key="Other:S01", digest_title="Other S01 已入库")
+        self.wait_sent(2)
+        self.assertEqual(sorted(self.sent), [
+            ("client", "Other S01 E01 已入库", "1GB"),
+            ("client", "Show S01 已入库（3条）", "Show S01 E01 已入库\nShow S01 E02 已入库\nShow S01 E03 已入库")
+        ])
+
+    def test_retry_segments(self):
+        fake_client = _FakeClient()
+        client = {"id": 1, "name": "client", "max_length": 10, "client": fake_client}
+        queue = MessageQueue(sender=Message()._Message__deliver, retry_times=2, retry_delay=0.05, digest_window=0)
+        queue.put(client, {"title": "标题", "text": "line1\nline2\nline3"})
+        start = time.time()
+        while len(fake_client.sent) < 3 and time.time() - start < 3:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        # 分段消息失败重试时从失败的分段继续，已发送的分段不重复发送
+        self.assertEqual(fake_client.sent, [("标题", "line1"), ("line2", ""), ("line3", "")])
+        self.assertEqual(queue.get_statistics()[0]["retries"], 1)
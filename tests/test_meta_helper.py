@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+from app.db import MediaDb
+from app.db.media_db import _Engine
+from app.db.models import TMDBCACHE
+from app.helper.meta_helper import _DbMetaStore, CACHE_EXPIRE_TIMESTAMP_STR
+from app.utils.types import MediaType
+
+# 测试数据的KEY前缀，用于清理
+TEST_KEY = "[__test_meta_helper__]"
+
+
+class MetaHelperTest(TestCase):
+    def setUp(self) -> None:
+        MediaDb.init_db()
+        self.mediadb = MediaDb()
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.meta_path = os.path.join(self.tempdir.name, "tmdb.dat")
+
+    def tearDown(self) -> None:
+        self.mediadb.session.query(TMDBCACHE).filter(TMDBCACHE.KEY.startswith(TEST_KEY)).delete()
+        self.mediadb.session.commit()
+        self.tempdir.cleanup()
+
+    @staticmethod
+    def info(tmdbid, title, mtype=MediaType.MOVIE, expire=None):
+        info = {"id": tmdbid, "type": mtype, "year": "2020", "title": title,
+                "poster_path": "/poster.jpg", "backdrop_path": "/backdrop.jpg"}
+        if expire:
+            info[CACHE_EXPIRE_TIMESTAMP_STR] = expire
+        return info
+
+    def test_migrate(self):
+        expire = int(time.time()) + 3600
+        meta_data = {f"{TEST_KEY}电影A-2020": self.info(100, "电影A", expire=expire),
+                     f"{TEST_KEY}剧集B-None": self.info(200, "剧集B", MediaType.TV),
+                     f"{TEST_KEY}未知C-None": self.info(0, None)}
+        with open(self.meta_path, 'wb') as f:
+            pickle.dump(meta_data, f, pickle.HIGHEST_PROTOCOL)
+        # 导入失败时保留缓存文件，下次启动重新迁移
+        with mock.patch.object(MediaDb, "insert_tmdb_cache", return_value=False):
+            _DbMetaStore(self.meta_path, True)
+        self.assertTrue(os.path.exists(self.meta_path))
+        # 导入成功后缓存文件重命名为tmdb.dat.bak，未识别的记录不导入
+        store = _DbMetaStore(self.meta_path, True)
+        self.assertFalse(os.path.exists(self.meta_path))
+        self.assertTrue(os.path.exists(f"{self.meta_path}.bak"))
+        self.assertEqual(store.dump(TEST_KEY, 0, 10)[0], 2)
+        info = store.get(f"{TEST_KEY}电影A-2020")
+        self.assertEqual((info.get("id"), info.get("type"), info.get("title")), (100, MediaType.MOVIE, "电影A"))
+        self.assertEqual(store.get(f"{TEST_KEY}剧集B-None").get("type"), MediaType.TV)
+        self.assertIsNone(store.get(f"{TEST_KEY}未知C-None"))
+        # 再次启动时不重复迁移
+        self.assertEqual(_DbMetaStore(self.meta_path, True).dump(TEST_KEY, 0, 10)[0], 2)
+
+    def test_get_update_delete(self):
+        store = _DbMetaStore(self.meta_path, True)
+        key_a, key_b, key_c = f"{TEST_KEY}电影A-2020", f"{TEST_KEY}电影B-2020", f"{TEST_KEY}未知C-None"
+        store.update({key_a: self.info(100, "电影A"), key_b: self.info(101, "电影B"), key_c: self.info(0, None)})
+        self.assertEqual(store.get(key_a).get("title"), "电影A")
+        # 未识别的记录只保存在内存中
+        self.assertEqual(store.get(key_c).get("id"), 0)
+        self.assertIsNone(self.mediadb.get_tmdb_cache(key_c))
+        self.assertEqual(store.dump(TEST_KEY, 0, 10)[0], 2)
+        # 未指定TMDBID时不删除任何记录
+        store.delete_by_tmdbid(None)
+        store.delete_by_tmdbid(0)
+        self.assertFalse(self.mediadb.delete_tmdb_cache())
+        self.assertEqual(store.dump(TEST_KEY, 0, 10)[0], 2)
+        # 已识别的记录不被覆盖，未识别的记录可被识别结果替换
+        store.update({key_a: self.info(999, "其它"), key_c: self.info(102, "剧集C", MediaType.TV)})
+        self.assertEqual(store.get(key_a).get("id"), 100)
+        self.assertEqual(store.get(key_c).get("id"), 102)
+        # 修改标题
+        self.assertEqual(store.modify_title(key_a, "新标题").get("title"), "新标题")
+        # 读取时续期过期时间
+        self.mediadb.update_tmdb_cache(key_b, EXPIRE_TIME=int(time.time()) + 3600)
+        self.assertGreater(store.get(key_b).get(CACHE_EXPIRE_TIMESTAMP_STR), int(time.time()) + 3600)
+        self.assertGreater(self.mediadb.get_tmdb_cache(key_b).EXPIRE_TIME, int(time.time()) + 3600)
+        # 过期记录读取时删除
+        self.mediadb.update_tmdb_cache(key_b, EXPIRE_TIME=int(time.time()) - 1)
+        store.get(key_b)
+        self.assertIsNone(self.mediadb.get_tmdb_cache(key_b))
+        # 删除记录
+        self.assertEqual(store.delete(key_a).get("id"), 100)
+        self.assertIsNone(store.get(key_a))
+        store.delete_by_tmdbid(102)
+        self.assertIsNone(store.get(key_c))
+        store.update({key_c: self.info(0, None)})
+        store.delete_unknown()
+        self.assertIsNone(store.get(key_c))
+        self.assertEqual(store.dump(TEST_KEY, 0, 10)[0], 0)
+
+    def test_release_connection(self):
+        # 长期运行的线程读取缓存后不占用连接
+        store = _DbMetaStore(self.meta_path, True)
+        key = f"{TEST_KEY}电影A-2020"
+        store.update({key: self.info(100, "电影A")})
+        barrier = threading.Barrier(33)
+        results = []
+
+        def worker():
+            results.append(store.get(key).get("id"))
+            barrier.wait(timeout=10)
+            barrier.wait(timeout=10)
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        barrier.wait(timeout=10)
+        checkedout = _Engine.pool.checkedout()
+        barrier.wait(timeout=10)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [100] * 32)
+        self.assertLessEqual(checkedout, 1)
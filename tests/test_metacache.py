@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from app.helper import WordsHelper
+from app.media.meta import MetaInfo
+from app.media.meta.metacache import MetaCache
+from app.media.meta.release_groups import ReleaseGroupsMatcher
+
+
+class _FakeMeta(object):
+    """
+    模拟识别结果，记录识别次数
+    """
+    count = 0
+
+    def __init__(self, title, *args):
+        _FakeMeta.count += 1
+        self.title = title
+        self.begin_season = 1
+        self.tag = ["WEB-DL"]
+
+    def get_name(self):
+        return self.title
+
+
+class MetaCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.cache = MetaCache()
+        self.patchers = [mock.patch.object(self.cache, "_enabled", True),
+                         mock.patch.object(self.cache, "_maxsize", 3)]
+        for patcher in self.patchers:
+            patcher.start()
+        self.cache.clear()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+        self.cache.init_config()
+
+    def test_hit_miss(self):
+        settings = (False, 0, 0, 0)
+        self.assertIsNone(self.cache.get("a", settings))
+        meta_info = SimpleNamespace(title="The Long Season", begin_season=1, tag=["WEB-DL"])
+        self.cache.set("a", settings, meta_info)
+        cached = self.cache.get("a", settings)
+        self.assertIsNotNone(cached)
+        self.assertIsNot(cached, meta_info)
+        self.assertEqual(cached.title, meta_info.title)
+        # 返回副本，修改不影响缓存内容
+        cached.begin_season = 9
+        cached.tag.append("1080p")
+        cached = self.cache.get("a", settings)
+        self.assertEqual((cached.begin_season, cached.tag), (1, ["WEB-DL"]))
+        statistics = self.cache.get_statistics()
+        self.assertEqual((statistics.get("hits"), statistics.get("misses"), statistics.get("size")), (2, 1, 1))
+        # 超出数量时淘汰最久未使用的结果
+        for key in ["b", "c"]:
+            self.cache.set(key, settings, meta_info)
+        self.cache.get("a", settings)
+        self.cache.set("d", settings, meta_info)
+        self.assertIsNone(self.cache.get("b", settings))
+        for key in ["a", "c", "d"]:
+            self.assertIsNotNone(self.cache.get(key, settings))
+
+    def test_invalidate(self):
+        settings = (False, 0, 0, 0)
+        meta_info = SimpleNamespace(title="The Long Season")
+        self.cache.set("a", settings, meta_info)
+        # 设置版本变化时清空缓存，旧版本的结果不再写入
+        new_settings = (False, 1, 0, 0)
+        self.assertIsNone(self.cache.get("a", new_settings))
+        self.assertEqual(self.cache.get_statistics().get("size"), 0)
+        self.cache.set("b", settings, meta_info)
+        self.assertIsNone(self.cache.get("b", new_settings))
+
+    def test_metainfo(self):
+        title = "The.Long.Season.2017.S01E02.1080p.WEB-DL-TTG"
+        _FakeMeta.count = 0
+        with mock.patch("app.media.meta.metainfo.MetaVideo", _FakeMeta), \
+                mock.patch("app.media.meta.metainfo.MetaAnime", _FakeMeta), \
+                mock.patch("app.media.meta.metainfo.MetaVideoV2", _FakeMeta):
+            first = MetaInfo(title)
+            second = MetaInfo(title)
+            # 相同标题命中缓存，不再重新识别
+            self.assertEqual(_FakeMeta.count, 1)
+            self.assertEqual(first.get_name(), second.get_name())
+            self.assertIsNot(first, second)
+            # 识别词、制作组更新后重新识别
+            WordsHelper().version += 1
+            MetaInfo(title)
+            self.assertEqual(_FakeMeta.count, 2)
+            MetaInfo(title)
+            self.assertEqual(_FakeMeta.count, 2)
+            ReleaseGroupsMatcher().version += 1
+            MetaInfo(title)
+            self.assertEqual(_FakeMeta.count, 3)
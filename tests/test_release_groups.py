@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+from unittest import TestCase
+
+import regex as re
+
+from app.media.meta.release_groups import ReleaseGroupsMatcher, literal_prefixes
+
+# 覆盖分支、字符集、转义、量词、捕获分组、中文的自定义制作组
+custom_groups_cases = [
+    "TTG", "(?:ARi|ExRE)N", "HONE(?:|yG)", "T(?:EPES|aengoo|rollHD )", "Nekomoe kissaten",
+    "[Ss]ubs", r"A\.B", r"X\d+", "Foo?", "Ba+r", "(?:CMCT|HDS)[a-z]*", "Q{2}Z", "(Cap)ture",
+    "W.rd", "织梦字幕组", "Lilith-Raws", r"\[Pre\]", "(?:Ab|Cd)(?:Ef|Gh)", ".*Any"
+]
+title_parts = ["TTG", "ARiN", "ExREN", "HONE", "HONEyG", "TrollHD ", "nekomoe kissaten", "subs", "Subs", "A.B",
+               "AxB", "X12", "Fo", "Foo", "Bar", "Baaar", "CMCTabc", "HDS", "QQZ", "Capture", "Word", "织梦字幕组",
+               "Lilith-Raws", "[Pre]", "AbGh", "CdEf", "xAny", "Other", "1080p", "WEB-DL"]
+delimiters = ["-", "@", "[", "￡", "【", "&", ".", " ", ""]
+endings = ["@", ".", " ", "]", "[", "】", "&", "-", ""]
+
+
+def plain_match(groups, title):
+    """
+    不使用预筛选，直接正则匹配
+    """
+    groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+    unique_groups = []
+    for item in groups_re.findall(f"{title} "):
+        if item not in unique_groups:
+            unique_groups.append(item)
+    return "@".join(unique_groups)
+
+
+class ReleaseGroupsTest(TestCase):
+    def setUp(self) -> None:
+        self.matcher = ReleaseGroupsMatcher()
+        rnd = random.Random(3)
+        self.titles = []
+        for _ in range(2000):
+            parts = [rnd.choice(delimiters) + rnd.choice(title_parts) + rnd.choice(endings)
+                     for _ in range(rnd.randrange(1, 4))]
+            self.titles.append("Movie.2020." + "".join(parts))
+
+    def test_literal_prefixes(self):
+        self.assertEqual(literal_prefixes("TTG"), {"ttg"})
+        self.assertEqual(literal_prefixes("(?:ARi|ExRE)N"), {"arin", "exren"})
+        self.assertEqual(literal_prefixes("[Ss]ubs"), None)
+        self.assertEqual(literal_prefixes(r"A\.B"), {"a.b"})
+        self.assertEqual(literal_prefixes(r"X\d+"), {"x"})
+        self.assertEqual(literal_prefixes("Foo?"), {"fo"})
+        self.assertEqual(literal_prefixes("Ba+r"), {"ba"})
+        self.assertEqual(literal_prefixes("(?:Ab|Cd)(?:Ef|Gh)"), {"abef", "abgh", "cdef", "cdgh"})
+        # 存在空前缀时无法预筛选
+        self.assertIsNone(literal_prefixes("TTG|.*Any"))
+        self.assertIsNone(literal_prefixes("TTG|(?:|Foo)"))
+        self.assertIsNone(literal_prefixes("TTG)"))
+
+    def test_match(self):
+        # 单个自定义制作组以及合并后的自定义制作组，预筛选结果与直接正则匹配一致
+        groups_list = custom_groups_cases + ["|".join(custom_groups_cases[:-1]), "|".join(custom_groups_cases)]
+        for groups in groups_list:
+            for title in self.titles:
+                self.assertEqual(self.matcher.match(title=title, groups=groups), plain_match(groups, title),
+                                 f"{groups} {title}")
+        # 内置制作组
+        for title in self.titles + ["Movie.2020.1080p.BluRay-CMCTV", "[织梦字幕组][Movie][1080p]", "Movie-NoGroup"]:
+            self.assertEqual(self.matcher.match(title=title),
+                             plain_match(self.matcher._ReleaseGroupsMatcher__release_groups, title))
+
+    def test_match_benchmark(self):
+        titles = [f"Movie.{i}.2020.1080p.BluRay.x264-Unknown{i}" for i in range(3000)]
+        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])"
+                               % self.matcher._ReleaseGroupsMatcher__release_groups, re.I)
+        start = time.perf_counter()
+        for title in titles:
+            groups_re.findall(f"{title} ")
+        plain_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for title in titles:
+            self.matcher.match(title=title)
+        prefilter_time = time.perf_counter() - start
+        print(f"\n识别 {len(titles)} 个无制作组标题，直接正则 {plain_time:.3f} 秒，预筛选 {prefilter_time:.3f} 秒")
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase, mock
+
+from app.rss import Rss
+from app.sites.site_limiter import SiteRateLimiter
+
+
+class _FakeSites(object):
+    """
+    模拟站点，站点1刚访问过、触发访问间隔流控
+    """
+
+    def __init__(self):
+        self.sites = [{"id": i, "name": f"站点{i}", "rssurl": f"https://site{i}/rss"} for i in range(6)]
+        self.sites.append({"id": 6, "name": "站点6", "rssurl": ""})
+        self.limiters = {0: SiteRateLimiter(limit_interval=60, limit_count=1, limit_seconds=0),
+                         1: SiteRateLimiter(limit_interval=0, limit_count=0, limit_seconds=60)}
+        self.limiters[1].check_rate_limit()
+
+    def get_sites(self, rss=False):
+        return self.sites
+
+    def check_ratelimit(self, site_id, peek=False):
+        if not self.limiters.get(site_id):
+            return False
+        return self.limiters[site_id].check_rate_limit(peek=peek)[0]
+
+
+class _FakeSubscribe(object):
+
+    @staticmethod
+    def get_subscribe_movies(state=None):
+        return {"1": {"id": 1, "name": "电影A"}}
+
+    @staticmethod
+    def get_subscribe_tvs(state=None):
+        return {}
+
+
+class _FakeRssHelper(object):
+    """
+    模拟RSS下载，记录同时下载数
+    """
+
+    def __init__(self):
+        self.urls = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def parse_rssxml(self, url):
+        with self.lock:
+            self.urls.append(url)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        # 排在前面的站点下载更慢，检查仍按站点顺序处理
+        time.sleep(0.15 if url.startswith("https://site0") else 0.05)
+        with self.lock:
+            self.running -= 1
+        if url.startswith("https://site3"):
+            raise Exception("下载出错")
+        return [{"title": url}]
+
+
+class RssFetchTest(TestCase):
+    def setUp(self) -> None:
+        self.rss = Rss()
+        self.sites = _FakeSites()
+        self.rsshelper = _FakeRssHelper()
+        self.processed = []
+        self.patchers = [mock.patch.object(self.rss, "sites", self.sites),
+                         mock.patch.object(self.rss, "subscribe", _FakeSubscribe()),
+                         mock.patch.object(self.rss, "rsshelper", self.rsshelper),
+                         mock.patch.object(self.rss, "_fetch_workers", 3),
+                         mock.patch.object(type(self.rss), "_Rss__process_site_rss", self.process_site_rss),
+                         mock.patch.object(type(self.rss), "download_rss_torrent", lambda *args, **kwargs: None)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def process_site_rss(self, site_info, rss_acticles, rss_no_exists, **kwargs):
+        self.processed.append((site_info.get("name"), rss_acticles))
+        return rss_no_exists
+
+    def test_fetch(self):
+        start = time.time()
+        self.rss.rssdownload()
+        seconds = time.time() - start
+        # 触发流控的站点在下载前跳过，未配置rssurl的站点不下载
+        self.assertEqual(sorted(self.rsshelper.urls), [f"https://site{i}/rss" for i in [0, 2, 3, 4, 5]])
+        # 预先检查流控不计入访问次数
+        self.assertEqual(self.sites.limiters[0].count, 0)
+        self.assertFalse(self.sites.check_ratelimit(0, peek=True))
+        # 并发下载，同时下载数不超过设置
+        self.assertEqual(self.rsshelper.max_running, 3)
+        self.assertLess(seconds, 0.3)
+        # 按站点顺序处理，下载出错的站点结果为空
+        self.assertEqual(self.processed, [("站点0", [{"title": "https://site0/rss"}]),
+                                          ("站点2", [{"title": "https://site2/rss"}]),
+                                          ("站点3", []),
+                                          ("站点4", [{"title": "https://site4/rss"}]),
+                                          ("站点5", [{"title": "https://site5/rss"}])])
+        statistics = self.rss.get_fetch_statistics()
+        self.assertGreaterEqual(statistics.get("站点3", {}).get("failed"), 1)
+        self.assertNotIn("站点1", statistics)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+import time
+from types import SimpleNamespace
+from unittest import TestCase
+
+from app.rss import _RssIndex
+from app.utils.types import MediaType
+
+
+def legacy_match(media_info, rss_movies, rss_tvs):
+    """
+    逐个遍历订阅的匹配逻辑，作为结果比对基准
+    """
+    if media_info.type == MediaType.MOVIE and rss_movies:
+        for rid, rss_info in rss_movies.items():
+            rss_sites = rss_info.get('rss_sites')
+            if rss_sites and media_info.site not in rss_sites:
+                continue
+            name = rss_info.get('name')
+            year = rss_info.get('year')
+            tmdbid = rss_info.get('tmdbid')
+            if not rss_info.get('fuzzy_match'):
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    if str(media_info.tmdb_id) != str(tmdbid):
+                        continue
+                else:
+                    if year and str(media_info.year) not in [str(year), str(int(year) + 1), str(int(year) - 1)]:
+                        continue
+                    if name != media_info.title:
+                        continue
+            else:
+                if year and str(year) != str(media_info.year):
+                    continue
+                search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
+                if not re.search(name, search_title, re.I) and name not in search_title:
+                    continue
+            return True, rss_info
+    elif rss_tvs:
+        for rid, rss_info in rss_tvs.items():
+            rss_sites = rss_info.get('rss_sites')
+            if rss_sites and media_info.site not in rss_sites:
+                continue
+            name = rss_info.get('name')
+            year = rss_info.get('year')
+            season = rss_info.get('season')
+            tmdbid = rss_info.get('tmdbid')
+            if not rss_info.get('fuzzy_match'):
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    if str(media_info.tmdb_id) != str(tmdbid):
+                        continue
+                else:
+                    if year and str(year) != str(media_info.year):
+                        continue
+                    if name != media_info.title:
+                        continue
+                if season and season != media_info.get_season_string():
+                    continue
+            else:
+                if season and season != "S00" and season != media_info.get_season_string():
+                    continue
+                if year and str(year) != str(media_info.year):
+                    continue
+                search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
+                if not re.search(name, search_title, re.I) and name not in search_title:
+                    continue
+            return True, rss_info
+    return False, {}
+
+
+SITES = ["站点A", "站点B", "站点C"]
+FUZZY_NAMES = ["剧集\\d+", "Show 1[0-9]", "(Movie|Film) 7", "(a)\\1", "a+b", "(?i)show 3", "[x"]
+
+
+def _subscribes(rnd, count, mtype):
+    subscribes = {}
+    for rid in range(count):
+        fuzzy = rnd.random() < 0.1
+        kind = rnd.random()
+        subscribes[str(rid)] = {
+            "id": rid,
+            "name": rnd.choice(FUZZY_NAMES) if fuzzy else f"剧集{rnd.randrange(count)}",
+            "year": rnd.choice(["", "2020", "2021", "2022"]),
+            "tmdbid": "" if fuzzy or kind < 0.3 else (f"DB:{rid}" if kind < 0.4 else str(rnd.randrange(count))),
+            "season": rnd.choice(["", "S01", "S02", "S00"]) if mtype == MediaType.TV else None,
+            "rss_sites": rnd.sample(SITES, rnd.randrange(3)),
+            "fuzzy_match": fuzzy
+        }
+    return subscribes
+
+
+def _media(rnd, count):
+    season = rnd.choice(["S01", "S02", ""])
+    title = f"剧集{rnd.randrange(count)}"
+    return SimpleNamespace(type=rnd.choice([MediaType.MOVIE, MediaType.TV]),
+                           tmdb_id=rnd.randrange(count),
+                           title=title,
+                           year=rnd.choice(["2020", "2021", "2022", None]),
+                           rev_string=rnd.choice([f"{title} 1080p", "Show 12 2160p", "Film 7", "aa a+b", "剧集x"]),
+                           site=rnd.choice(SITES),
+                           get_season_string=lambda s=season: s)
+
+
+class RssIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.rnd = random.Random(24)
+        # 去掉会导致逐个遍历时出错的正则，单独测试
+        FUZZY_NAMES.remove("[x")
+
+    def tearDown(self) -> None:
+        FUZZY_NAMES.append("[x")
+
+    def test_match(self):
+        for count in [0, 1, 20, 200]:
+            rss_movies = _subscribes(self.rnd, count, MediaType.MOVIE)
+            rss_tvs = _subscribes(self.rnd, count, MediaType.TV)
+            rss_index = _RssIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
+            for _ in range(300):
+                media_info = _media(self.rnd, max(count, 1))
+                expected = legacy_match(media_info, rss_movies, rss_tvs)
+                matched = rss_index.match(media_info)
+                self.assertEqual(expected[0], matched[0])
+                self.assertEqual(expected[1].get("id"), matched[1].get("id"))
+        # 模糊订阅正则错误时与原逻辑一样抛出异常
+        rss_tvs = {"1": {"id": 1, "name": "[x", "fuzzy_match": True}}
+        with self.assertRaises(re.error):
+            _RssIndex(rss_movies={}, rss_tvs=rss_tvs).match(_media(self.rnd, 1))
+
+    def test_match_benchmark(self):
+        rss_movies = _subscribes(self.rnd, 800, MediaType.MOVIE)
+        rss_tvs = _subscribes(self.rnd, 800, MediaType.TV)
+        medias = [_media(self.rnd, 800) for _ in range(2000)]
+        start = time.perf_counter()
+        for media_info in medias:
+            legacy_match(media_info, rss_movies, rss_tvs)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rss_index = _RssIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
+        for media_info in medias:
+            rss_index.match(media_info)
+        index_time = time.perf_counter() - start
+        print(f"\n{len(medias)} 个种子匹配 {len(rss_movies) + len(rss_tvs)} 个订阅，"
+              f"逐个遍历 {legacy_time:.3f} 秒，索引 {index_time:.3f} 秒")
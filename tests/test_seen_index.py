@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase
+
+from app.db import MainDb
+from app.db.models import RSSTORRENTS
+from app.helper import RssHelper
+from app.utils import SeenIndex
+
+# 测试数据的种子名称，用于清理
+TEST_TITLE = "__test_seen_index__"
+
+
+class SeenIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.rsshelper = RssHelper()
+        self.enclosures = [f"https://example.com/download.php?id={i}&passkey=test" for i in range(2000)]
+
+    def tearDown(self) -> None:
+        self.rsshelper.simple_delete_rss_torrents(TEST_TITLE)
+
+    def test_index(self):
+        keys = {"a", "b"}
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return list(keys)
+
+        index = SeenIndex(loader=loader)
+        self.assertTrue(index.contains("a"))
+        self.assertFalse(index.contains("c"))
+        index.add("c")
+        self.assertTrue(index.contains("c"))
+        self.assertEqual(len(loads), 1)
+        keys.discard("a")
+        index.invalidate()
+        self.assertFalse(index.contains("a"))
+        self.assertEqual(len(loads), 2)
+
+    def test_rss_enclosure(self):
+        enclosure = self.enclosures[0]
+        self.assertFalse(self.rsshelper.is_rssd_by_enclosure(enclosure))
+        self.rsshelper.simple_insert_rss_torrents(TEST_TITLE, enclosure)
+        self.assertTrue(self.rsshelper.is_rssd_by_enclosure(enclosure))
+        self.rsshelper.simple_delete_rss_torrents(TEST_TITLE, enclosure)
+        self.assertFalse(self.rsshelper.is_rssd_by_enclosure(enclosure))
+
+    def test_rss_enclosure_unit_of_work(self):
+        db = MainDb()
+        enclosure, failed_enclosure = self.enclosures[0], self.enclosures[1]
+        self.assertFalse(self.rsshelper.is_rssd_by_enclosure(enclosure))
+        # 事务单元提交后才加入索引
+        with db.unit_of_work():
+            self.rsshelper.simple_insert_rss_torrents(TEST_TITLE, enclosure)
+            self.assertFalse(self.rsshelper._enclosure_index.contains(enclosure))
+        self.assertTrue(self.rsshelper.is_rssd_by_enclosure(enclosure))
+        # 事务单元回滚时不加入索引
+        with db.unit_of_work():
+            self.rsshelper.simple_insert_rss_torrents(TEST_TITLE, failed_enclosure)
+            db.fail_unit_of_work()
+        self.assertFalse(self.rsshelper._enclosure_index.contains(failed_enclosure))
+        self.assertFalse(self.rsshelper.is_rssd_by_enclosure(failed_enclosure))
+        # 索引中残留的链接由数据库确认
+        self.rsshelper._enclosure_index.add(failed_enclosure)
+        self.assertFalse(self.rsshelper.is_rssd_by_enclosure(failed_enclosure))
+
+    def test_rss_enclosure_benchmark(self):
+        for enclosure in self.enclosures[::2]:
+            self.rsshelper.simple_insert_rss_torrents(TEST_TITLE, enclosure)
+        db = MainDb()
+        start = time.perf_counter()
+        db_result = [db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0
+                     for enclosure in self.enclosures]
+        db_time = time.perf_counter() - start
+        start = time.perf_counter()
+        index_result = [self.rsshelper.is_rssd_by_enclosure(enclosure) for enclosure in self.enclosures]
+        index_time = time.perf_counter() - start
+        self.assertEqual(db_result, index_result)
+        print(f"\n查询 {len(self.enclosures)} 个下载链接，数据库 {db_time:.3f} 秒，内存索引 {index_time:.3f} 秒")
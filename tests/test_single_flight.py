@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase, mock
+
+from app.media import Media
+from app.media.meta._base import MetaBase
+from app.media.tmdbv3api import TMDb, TMDbConfig, Movie
+from app.utils import SingleFlight
+from app.utils.types import MediaType
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self) -> None:
+        self.calls = []
+        self.details = Movie.details
+
+        def details(movie, movie_id, append_to_response=None):
+            self.calls.append(movie_id)
+            # 模拟网络延迟，让并发查询重叠
+            time.sleep(0.2)
+            return {"id": movie_id, "title": "阿凡达", "genres": [{"id": 28, "name": "动作"}]}
+
+        Movie.details = details
+
+    def tearDown(self) -> None:
+        Movie.details = self.details
+
+    @staticmethod
+    def run_threads(target, count):
+        results = [None] * count
+
+        def worker(i):
+            results[i] = target()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_do(self):
+        flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"items": []}
+
+        results = self.run_threads(lambda: flight.do("key", func), 20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([shared for _, shared in results].count(False), 1)
+        # 各调用方拿到的是独立的副本
+        self.assertEqual(len({id(result) for result, _ in results}), 20)
+        statistics = flight.get_statistics()
+        self.assertEqual((statistics["total"], statistics["coalesced"], statistics["inflight"]), (20, 19, 0))
+        # 调用完成后不再共享
+        flight.do("key", func)
+        self.assertEqual(len(calls), 2)
+
+    def test_error(self):
+        flight = SingleFlight()
+
+        def func():
+            time.sleep(0.2)
+            raise ValueError("failed")
+
+        def call():
+            try:
+                flight.do("key", func)
+            except ValueError as err:
+                return str(err)
+
+        self.assertEqual(self.run_threads(call, 5), ["failed"] * 5)
+
+    def test_get_tmdb_info(self):
+        config = TMDbConfig(api_key="test")
+        media = Media()
+        media.tmdb = TMDb(config=config)
+        media.movie = Movie(config=config)
+        coalesced = Media.get_flight_statistics()["coalesced"]
+        results = self.run_threads(lambda: media.get_tmdb_info(mtype=MediaType.MOVIE, tmdbid=19995), 10)
+        self.assertEqual(self.calls, [19995])
+        self.assertTrue(all(result.get("media_type") == MediaType.MOVIE for result in results))
+        self.assertEqual(Media.get_flight_statistics()["coalesced"] - coalesced, 9)
+
+    def test_get_media_info_chatgpt(self):
+        media = Media()
+        chatgpt_calls = []
+
+        def meta_info(title, subtitle=None):
+            meta = MetaBase(title, en_name="Unknown Show")
+            meta.type = MediaType.MOVIE
+            return meta
+
+        def search_chatgpt(file_name, mtype):
+            chatgpt_calls.append(file_name)
+            time.sleep(0.2)
+            return MediaType.TV, [1], [int(file_name[-2:])], None
+
+        with mock.patch("app.media.media.MetaInfo", meta_info), \
+                mock.patch.object(media, "tmdb", TMDb(config=TMDbConfig(api_key="test"))), \
+                mock.patch.object(media, "_chatgpt_enable", True), \
+                mock.patch.object(media, "_search_tmdbweb", False), \
+                mock.patch.object(media, "_search_keyword", False), \
+                mock.patch.object(type(media), "_Media__search_multi_tmdb", lambda *args, **kwargs: None), \
+                mock.patch.object(type(media), "_Media__search_chatgpt", lambda _, **kwargs: search_chatgpt(**kwargs)), \
+                mock.patch.object(type(media), "_Media__insert_media_cache", lambda *args, **kwargs: None):
+            titles = ["Unknown.Show.E01", "Unknown.Show.E02"] * 5
+            results = self.run_threads(lambda: media.get_media_info(title=titles.pop(), cache=False), 10)
+        # ChatGPT按种子名称查询，名称相同的并发识别只查询一次
+        self.assertEqual(sorted(chatgpt_calls), ["Unknown.Show.E01", "Unknown.Show.E02"])
+        # 每个调用方按各自名称的识别结果修正类型和集数
+        for result in results:
+            self.assertEqual(result.type, MediaType.TV)
+            self.assertEqual(result.get_season_string(), "S01")
+            self.assertEqual(result.get_episode_string(), f"E{result.org_string[-2:]}")
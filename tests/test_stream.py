@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from unittest import TestCase
+
+import log
+from app.helper import ProgressHelper
+
+
+class StreamTest(TestCase):
+    def test_logs(self):
+        cursor1, _ = log.get_logs()
+        cursor2 = cursor1
+        log.info("【StreamTest】第一条")
+        log.info("【StreamTest】第二条")
+        # 各订阅方独立读取，互不影响
+        cursor1, logs1 = log.get_logs(cursor1)
+        cursor2, logs2 = log.get_logs(cursor2)
+        self.assertEqual([lg.get("text") for lg in logs1], ["第一条", "第二条"])
+        self.assertEqual(logs1, logs2)
+        self.assertEqual(log.get_logs(cursor1), (cursor1, []))
+        # 没有新日志时阻塞到新日志写入
+        threading.Timer(0.2, log.info, args=("【StreamTest】第三条",)).start()
+        start = time.time()
+        _, logs = log.get_logs(cursor1, timeout=5)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual([lg.get("text") for lg in logs], ["第三条"])
+
+    def test_progress(self):
+        progress = ProgressHelper()
+        progress.start("streamtest")
+        version, detail = progress.wait_process("streamtest")
+        self.assertEqual(detail.get("value"), 0)
+        threading.Timer(0.2, progress.update, kwargs={"value": 50, "text": "处理中", "ptype": "streamtest"}).start()
+        start = time.time()
+        version, detail = progress.wait_process("streamtest", version, timeout=5)
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual((detail.get("value"), detail.get("text")), (50, "处理中"))
+        # 无变化时等待超时后返回当前进度
+        self.assertEqual(progress.wait_process("streamtest", version, timeout=0.1), (version, detail))
+        progress.end("streamtest")
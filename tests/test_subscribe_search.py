@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from app.indexer import Indexer
+from app.indexer.client._base import _IIndexClient
+from app.subscribe import Subscribe
+from app.utils.types import IndexerType
+
+
+class _FakeIndexClient(_IIndexClient):
+    """
+    模拟索引器，记录每个站点实际访问次数和同时访问数
+    """
+    client_id = "fake"
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.fetches = {}
+        self.running = {}
+        self.max_running = {}
+        self.calls_lock = threading.Lock()
+
+    def match(self, ctype):
+        return False
+
+    def get_status(self):
+        return True
+
+    def get_type(self):
+        return IndexerType.BUILTIN
+
+    def get_client_id(self):
+        return self.client_id
+
+    def get_indexers(self, check=False, public=True):
+        return self.sites
+
+    def __fetch(self, indexer, key_word):
+        with self.calls_lock:
+            self.fetches[(indexer.id, key_word)] = self.fetches.get((indexer.id, key_word), 0) + 1
+            self.running[indexer.id] = self.running.get(indexer.id, 0) + 1
+            self.max_running[indexer.id] = max(self.max_running.get(indexer.id, 0), self.running[indexer.id])
+        time.sleep(0.02)
+        with self.calls_lock:
+            self.running[indexer.id] -= 1
+        return [f"{indexer.name} {key_word}"]
+
+    def search(self, order_seq, indexer, key_word, filter_args, match_media, in_from):
+        if filter_args.get("site") and indexer.name not in filter_args.get("site"):
+            return []
+        return self._shared_fetch((self.client_id, indexer.id, key_word), self.__fetch, indexer, key_word)
+
+
+class SubscribeSearchTest(TestCase):
+    def setUp(self) -> None:
+        self.indexer = Indexer()
+        self.sites = [SimpleNamespace(id=i, name=f"站点{i}", pri=i) for i in range(3)]
+        self.client = _FakeIndexClient(self.sites)
+        self.patchers = [mock.patch.object(self.indexer, "_client", self.client),
+                         mock.patch.object(self.indexer, "_client_type", IndexerType.BUILTIN)]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def search(self, key_word, sites=None):
+        return sorted(self.indexer.search_by_keyword(key_word=key_word, filter_args={"site": sites}))
+
+    def test_indexer(self):
+        keywords = ["剧集A", "剧集B", "剧集A", "剧集A", "剧集B", "剧集C"] * 2
+        with self.indexer.search_batch():
+            with ThreadPoolExecutor(max_workers=len(keywords)) as executor:
+                results = list(executor.map(self.search, keywords))
+        # 相同关键字的结果一致
+        self.assertEqual(results[0], ["站点0 剧集A", "站点1 剧集A", "站点2 剧集A"])
+        self.assertEqual(results[0], results[2])
+        # 批量搜索期间每个站点、关键字只访问一次
+        self.assertEqual(set(self.client.fetches.values()), {1})
+        self.assertEqual(len(self.client.fetches), 9)
+        # 每个站点同时访问数不超过并发额度
+        self.assertLessEqual(max(self.client.max_running.values()), 2)
+        # 批量搜索结束后重新访问站点，只访问搜索范围内的站点
+        self.assertEqual(self.search("剧集A", sites=["站点1"]), ["站点1 剧集A"])
+        self.assertEqual(self.client.fetches[(1, "剧集A")], 2)
+        self.assertEqual(self.client.fetches[(0, "剧集A")], 1)
+
+    def test_unshared_fetch(self):
+        def fetch(key):
+            time.sleep(0.1)
+            return [key]
+
+        # 非批量搜索时各站点的访问互不阻塞
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(lambda key: self.client._shared_fetch(key, fetch, key), ["a", "b", "c"]))
+        self.assertEqual(results, [["a"], ["b"], ["c"]])
+        self.assertLess(time.time() - start, 0.2)
+
+    def test_subscribe(self):
+        subscribe = Subscribe()
+        rss_movies = {
+            "1": {"id": 1, "name": "电影A", "tmdbid": "100"},
+            "2": {"id": 2, "name": "电影B", "tmdbid": "200"},
+            "3": {"id": 3, "name": "电影A", "tmdbid": "100"},
+            "4": {"id": 4, "name": "电影C", "tmdbid": "", "fuzzy_match": True},
+            "5": {"id": 5, "name": "电影D", "tmdbid": "300"}
+        }
+        events = []
+        events_lock = threading.Lock()
+
+        def search_movie(_, rss_info):
+            with events_lock:
+                events.append(("start", rss_info.get("id")))
+            time.sleep(0.05)
+            with events_lock:
+                events.append(("end", rss_info.get("id")))
+            if rss_info.get("id") == 2:
+                raise Exception("搜索出错")
+
+        with mock.patch.object(type(subscribe), "get_subscribe_movies", lambda *args, **kwargs: rss_movies), \
+                mock.patch.object(type(subscribe), "_Subscribe__search_movie", search_movie):
+            start = time.time()
+            subscribe.subscribe_search_movie()
+            seconds = time.time() - start
+        # 模糊匹配的订阅不搜索，出错的订阅不影响其它订阅
+        self.assertEqual(sorted(rid for event, rid in events if event == "end"), [1, 2, 3, 5])
+        # 同一媒体的订阅依次搜索
+        self.assertLess(events.index(("end", 1)), events.index(("start", 3)))
+        # 不同媒体的订阅并发搜索
+        self.assertLess(events.index(("start", 2)), events.index(("end", 1)))
+        self.assertLess(seconds, 0.18)
+        # 线程池常驻，线程数不变时重新加载配置不重建，变化时重建
+        executor = subscribe._search_executor
+        subscribe.init_config()
+        self.assertIs(subscribe._search_executor, executor)
+        with mock.patch("app.subscribe.Config") as config:
+            config.return_value.get_config.return_value = {"subscribe_search_workers": 8}
+            subscribe.init_config()
+        self.assertIsNot(subscribe._search_executor, executor)
+        self.assertEqual(subscribe._search_executor._max_workers, 8)
+        subscribe.init_config()
+        self.assertEqual(subscribe._search_executor._max_workers, 4)
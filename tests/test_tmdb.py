@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+from unittest import TestCase
+from urllib.parse import urlparse, parse_qs
+
+from app.media.tmdbv3api import TMDb, TMDbConfig, Search
+from app.media.tmdbv3api.cache import ResponseCache
+from app.media.tmdbv3api.scheduler import RateScheduler, Priority
+
+
+class _Response(object):
+
+    def __init__(self, result, status_code=200, headers=None):
+        self._result = result
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(result).encode("utf-8")
+
+    def json(self):
+        return self._result
+
+
+class TmdbTest(TestCase):
+    def setUp(self) -> None:
+        self.config = TMDbConfig(api_key="test",
+                                 proxies=TMDbConfig.parse_proxies({"http": None, "https": "http://127.0.0.1:7890"}))
+        self._request = TMDb._request
+        self.requests = []
+
+        def request(tmdb, method, url, data=None):
+            query = parse_qs(urlparse(url).query)
+            self.requests.append((query.get("language")[0], tmdb.config.proxies))
+            # 模拟网络延迟，让各线程的请求交错执行
+            time.sleep(0.01)
+            return _Response({"page": 1,
+                              "total_results": len((query.get("query") or [""])[0]),
+                              "total_pages": 1,
+                              "results": []})
+
+        TMDb._request = request
+        TMDb._response_cache.clear()
+
+    def tearDown(self) -> None:
+        TMDb._request = self._request
+        TMDb._response_cache.clear()
+
+    def test_config(self):
+        self.assertEqual(self.config.proxies_dict, {"https": "http://127.0.0.1:7890"})
+        self.assertEqual(TMDbConfig(proxies=TMDbConfig.parse_proxies({"http": None})).proxies_dict, None)
+        self.assertEqual(TMDb(config=self.config).language, "zh")
+
+    def test_concurrent_language(self):
+        tmdb = TMDb(config=self.config)
+        search = Search(config=self.config)
+        errors = []
+
+        def worker(language, query):
+            tmdb.language = language
+            for _ in range(10):
+                # 不含关键字的搜索使用当前线程设置的语种
+                search.movies({"year": 2023})
+                if search.language != language:
+                    errors.append(f"language {search.language} != {language}")
+                # 搜索关键字决定本次请求的语种
+                search.movies({"query": query})
+                if search.total_results != len(query):
+                    errors.append(f"total_results {search.total_results} != {len(query)}")
+
+        threads = [threading.Thread(target=worker, args=(language, query))
+                   for language, query in [("en", "a"), ("ja", "bb"), ("ko", "阿凡达")]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(tmdb.language, "zh")
+        self.assertEqual({language for language, _ in self.requests}, {"en", "ja", "ko", "zh"})
+        self.assertEqual({proxies for _, proxies in self.requests}, {self.config.proxies})
+
+    def test_response_cache(self):
+        tmdb = TMDb(config=self.config)
+        search = Search(config=self.config)
+        hits = TMDb.get_cache_statistics()["hits"]
+        search.movies({"query": "abc"})
+        search.movies({"query": "abc"})
+        self.assertEqual(len(self.requests), 1)
+        # 命中缓存时返回新的对象，修改不影响缓存
+        result = search._call("/search/movie", "query=abc", language=self.requests[0][0])
+        result["results"].append({"id": 1})
+        self.assertEqual(search._call("/search/movie", "query=abc", language=self.requests[0][0])["results"], [])
+        self.assertIs(tmdb._session, search._session)
+        statistics = TMDb.get_cache_statistics()
+        self.assertEqual(statistics["size"], 1)
+        self.assertEqual(statistics["hits"] - hits, 3)
+
+    def test_cache_limit(self):
+        cache = ResponseCache(ttl=0.05, maxsize=10, maxbytes=100)
+        for i in range(5):
+            cache.set(i, b'"%s"' % (b"x" * 30))
+        # 按字节数淘汰最久未使用的条目
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["size"], 3)
+        self.assertLessEqual(statistics["bytes"], 100)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(4), "x" * 30)
+        # 过期条目在下次访问时清除
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(4))
+        statistics = cache.get_statistics()
+        self.assertEqual((statistics["size"], statistics["bytes"], statistics["expirations"]), (0, 0, 3))
+
+    def test_scheduler_priority(self):
+        scheduler = RateScheduler(rate=20, burst=1)
+        scheduler.acquire()
+        order = []
+
+        def worker(priority):
+            with scheduler.priority(priority):
+                scheduler.acquire()
+            order.append(priority)
+
+        threads = [threading.Thread(target=worker, args=(Priority.BACKGROUND,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.01)
+        # 后到的页面查询先于排队中的后台任务
+        threads.append(threading.Thread(target=worker, args=(Priority.INTERACTIVE,)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order[0], Priority.INTERACTIVE)
+        statistics = scheduler.get_statistics()
+        self.assertEqual(statistics["lanes"]["background"]["granted"], 5)
+        self.assertEqual(statistics["lanes"]["background"]["waiting"], 0)
+        self.assertGreater(statistics["lanes"]["background"]["max_wait"], 100)
+
+    def test_scheduler_pause(self):
+        scheduler = RateScheduler(rate=10, burst=5)
+        for _ in range(5):
+            scheduler.acquire()
+        time.sleep(0.2)
+        scheduler.pause(0.3)
+        # 暂停前和暂停期间都不累积令牌，暂停结束后按速率重新发放
+        start = time.monotonic()
+        scheduler.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.35)
+        self.assertEqual(scheduler.get_statistics()["tokens"], 0)
+
+    def test_rate_limited(self):
+        responses = [_Response({"status_code": 25}, status_code=429, headers={"Retry-After": "1"}),
+                     _Response({"id": 1})]
+
+        def request(tmdb, method, url, data=None):
+            self.requests.append(url)
+            return responses.pop(0)
+
+        TMDb._request = request
+        start = time.time()
+        # 被限流的请求暂停后自动重试
+        self.assertEqual(TMDb(config=self.config)._call("/movie/1", ""), {"id": 1})
+        self.assertEqual(len(self.requests), 2)
+        self.assertGreaterEqual(time.time() - start, 0.9)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import copy
+import time
+from unittest import TestCase, mock
+
+from transmission_rpc.torrent import Torrent
+
+from app.downloader.client import Qbittorrent, Transmission
+
+
+class _FakeQbc(object):
+    """
+    模拟qBittorrent的sync/maindata接口
+    """
+
+    def __init__(self):
+        self.torrents = {}
+        self.snapshots = {}
+        self.rid = 0
+        self.calls = []
+        self.on_change = None
+
+    def sync_maindata(self, rid=0):
+        self.calls.append(rid)
+        self.rid += 1
+        snapshot = self.snapshots.get(rid)
+        self.snapshots[self.rid] = copy.deepcopy(self.torrents)
+        if snapshot is None:
+            return {"rid": self.rid, "full_update": True, "torrents": copy.deepcopy(self.torrents)}
+        changed = {}
+        for thash, torrent in self.torrents.items():
+            old = snapshot.get(thash) or {}
+            fields = {key: value for key, value in torrent.items() if old.get(key) != value}
+            if fields:
+                changed[thash] = fields
+        return {"rid": self.rid,
+                "torrents": changed,
+                "torrents_removed": [thash for thash in snapshot if thash not in self.torrents]}
+
+    def torrents_info(self, torrent_hashes=None, status_filter=None):
+        self.calls.append(status_filter)
+        return []
+
+    def torrents_add(self, **kwargs):
+        return "Ok."
+
+    def torrents_pause(self, torrent_hashes=None):
+        # 下载器执行期间其它线程刷新了镜像
+        if self.on_change:
+            self.on_change()
+        for thash in torrent_hashes or []:
+            self.torrents[thash]["state"] = "pausedDL"
+        return True
+
+    @staticmethod
+    def app_preferences():
+        return {}
+
+
+class _FakeTrc(object):
+    """
+    模拟Transmission的recently-active查询，标签变化不计入最近活动
+    """
+
+    def __init__(self):
+        self.torrents = {}
+        self.active = set()
+        self.removed = []
+        self.calls = []
+
+    def get_torrents(self, ids=None, arguments=None):
+        self.calls.append(ids)
+        return [Torrent(fields=dict(fields)) for tid, fields in self.torrents.items()
+                if ids is None or tid in ids or fields.get("hashString") in ids]
+
+    def get_recently_active_torrents(self, arguments=None):
+        self.calls.append("recently-active")
+        active = [Torrent(fields=dict(self.torrents[tid])) for tid in self.active if tid in self.torrents]
+        removed, self.active, self.removed = self.removed, set(), []
+        return active, removed
+
+    def set_session(self, **kwargs):
+        pass
+
+    def change_torrent(self, ids=None, labels=None, **kwargs):
+        for fields in self.torrents.values():
+            if fields.get("id") in ids or fields.get("hashString") in ids:
+                fields["labels"] = labels
+
+
+class TorrentMirrorTest(TestCase):
+
+    def test_qbittorrent(self):
+        qbc = _FakeQbc()
+        qbc.torrents = {
+            "a": {"name": "A", "state": "downloading", "tags": "刷流", "progress": 0.5},
+            "b": {"name": "B", "state": "stalledUP", "tags": "刷流, 已整理", "progress": 1},
+            "c": {"name": "C", "state": "pausedUP", "tags": "", "progress": 1}
+        }
+        client = Qbittorrent({"name": "qb"})
+        client.qbc = qbc
+        torrents, error = client.get_torrents()
+        self.assertFalse(error)
+        self.assertEqual(sorted(torrent.get("hash") for torrent in torrents), ["a", "b", "c"])
+        self.assertEqual([torrent.get("hash") for torrent in client.get_completed_torrents(tag="刷流")], ["b"])
+        self.assertEqual([torrent.name for torrent in client.get_downloading_torrents()], ["A"])
+        # 有效期内不访问下载器
+        self.assertEqual(qbc.calls, [0])
+        # 指定的种子不在镜像中时立即同步
+        self.assertEqual([torrent.get("hash") for torrent in client.get_torrents(ids="c|x")[0]], ["c"])
+        self.assertEqual(qbc.calls, [0, 1])
+        # 增量同步合并变化的字段
+        qbc.torrents["a"].update({"state": "uploading", "progress": 1})
+        del qbc.torrents["b"]
+        client.add_torrent("magnet:?xt=urn:btih:d")
+        qbc.torrents["d"] = {"name": "D", "state": "metaDL", "tags": "", "progress": 0}
+        completed = client.get_completed_torrents()
+        self.assertEqual(qbc.calls, [0, 1, 2])
+        self.assertEqual(sorted(torrent.get("hash") for torrent in completed), ["a", "c"])
+        self.assertEqual([torrent.get("name") for torrent in completed if torrent.get("hash") == "a"], ["A"])
+        self.assertEqual([torrent.get("hash") for torrent in client.get_downloading_torrents()], ["d"])
+        self.assertEqual(client.get_torrents(tag="刷流")[0][0].get("hash"), "a")
+        # 镜像不支持的状态筛选直接查询下载器
+        client.get_torrents(status="errored")
+        self.assertEqual(qbc.calls[-1], "errored")
+        statistics = client._mirror.get_statistics()
+        self.assertEqual((statistics["count"], statistics["syncs"], statistics["full_syncs"]), (3, 3, 1))
+
+    def test_invalidate_after_change(self):
+        qbc = _FakeQbc()
+        qbc.torrents = {"a": {"name": "A", "state": "downloading", "tags": "", "progress": 0.5}}
+        client = Qbittorrent({"name": "qb"})
+        client.qbc = qbc
+        qbc.on_change = client.get_torrents
+        client.stop_torrents(["a"])
+        # 修改完成后才使镜像失效，执行期间刷新的旧状态不会被继续使用
+        self.assertEqual(client.get_torrents(ids="a")[0][0].get("state"), "pausedDL")
+
+    def test_transmission(self):
+        trc = _FakeTrc()
+        trc.torrents = {
+            1: {"id": 1, "hashString": "a", "name": "A", "status": 4, "labels": ["刷流"]},
+            2: {"id": 2, "hashString": "b", "name": "B", "status": 6, "labels": []}
+        }
+        with mock.patch.object(Transmission, "connect", lambda client: setattr(client, "trc", trc)):
+            client = Transmission({"name": "tr"})
+        self.assertEqual([torrent.name for torrent in client.get_completed_torrents()], ["B"])
+        self.assertEqual([torrent.name for torrent in client.get_downloading_torrents(tag="刷流")], ["A"])
+        # 按数字ID查询
+        self.assertEqual([torrent.hashString for torrent in client.get_torrents(ids=["2"])[0]], ["b"])
+        self.assertEqual(trc.calls, [None])
+        # 最近活动的种子和修改过标签的种子在下次同步时更新
+        trc.torrents[1]["status"] = 6
+        trc.active.add(1)
+        trc.removed.append(3)
+        client.set_torrents_status(ids=["b"])
+        torrents = client.get_completed_torrents(tag="已整理")
+        self.assertEqual([torrent.hashString for torrent in torrents], ["b"])
+        self.assertEqual(trc.calls, [None, "recently-active", ["b"]])
+        self.assertEqual(len(client.get_completed_torrents()), 2)
+        # 删除的种子
+        del trc.torrents[2]
+        trc.removed.append(2)
+        client.delete_torrents(delete_file=False, ids=["b"])
+        self.assertEqual([torrent.hashString for torrent in client.get_torrents()[0]], ["a"])
+        # 超出recently-active的时间窗口后全量同步
+        client._mirror._sync_time = time.time() - 60
+        client.get_torrents()
+        self.assertEqual(trc.calls[-1], None)
+        self.assertEqual(client._mirror.get_statistics()["full_syncs"], 2)
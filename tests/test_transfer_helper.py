@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from app.helper import TransferHelper
+from app.utils.types import RmtMode
+
+
+class TransferHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.helper = TransferHelper()
+        self.running = {}
+        self.max_running = {}
+        self.lock = threading.Lock()
+        # 以目标路径的第一级目录模拟设备
+        self.patcher = mock.patch.object(type(self.helper), "get_device_key",
+                                         staticmethod(lambda target_file, rmt_mode: target_file.split("/")[1]))
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.helper.init_config()
+
+    def transfer(self, file_item, target_file, rmt_mode):
+        device = target_file.split("/")[1]
+        with self.lock:
+            self.running[device] = self.running.get(device, 0) + 1
+            self.max_running[device] = max(self.max_running.get(device, 0), self.running[device])
+        time.sleep(0.05)
+        with self.lock:
+            self.running[device] -= 1
+        if file_item == "error":
+            raise Exception("转移出错")
+        return 0, ""
+
+    def execute(self, target_file, rmt_mode=RmtMode.COPY, file_item="file"):
+        return self.helper.execute(self.transfer, file_item, target_file, rmt_mode)
+
+    def test_device(self):
+        targets = ["/disk1/a", "/disk1/b", "/disk1/c", "/disk2/a", "/disk2/b", "/disk3/a"]
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            results = list(executor.map(self.execute, targets))
+        seconds = time.time() - start
+        self.assertEqual(results, [(0, "")] * len(targets))
+        # 同一设备依次转移，不同设备并发转移
+        self.assertEqual(self.max_running, {"disk1": 1, "disk2": 1, "disk3": 1})
+        self.assertLess(seconds, 0.25)
+        # 硬链接不按设备排队
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: self.execute("/disk4/a", RmtMode.LINK), range(3)))
+        self.assertGreater(self.max_running["disk4"], 1)
+        # 转移函数出错时返回错误
+        self.assertEqual(self.execute("/disk1/a", file_item="error"), (-1, "转移出错"))
+
+    def test_reconfigure(self):
+        # 转移过程中重新加载配置替换线程池，新旧任务都能完成
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            tasks = [executor.submit(self.execute, f"/disk{i}/a") for i in range(8)]
+            for workers in [2, 3, 4]:
+                with mock.patch.object(type(self.helper), "_TransferHelper__get_int",
+                                       staticmethod(lambda value, default, w=workers: w)):
+                    self.helper.init_config()
+                time.sleep(0.01)
+            self.assertEqual([task.result() for task in tasks], [(0, "")] * 8)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import time
+from types import SimpleNamespace
+from unittest import TestCase
+
+from app.helper import WordsHelper
+from tests.cases.meta_cases import meta_cases
+
+
+def _word(wtype, replaced="", replace="", front="", back="", offset="", regex=0):
+    return SimpleNamespace(TYPE=wtype, REPLACED=replaced, REPLACE=replace,
+                           FRONT=front, BACK=back, OFFSET=offset, REGEX=regex)
+
+
+# 覆盖屏蔽、替换、替换+集偏移、集偏移以及错误正则的识别词
+words_cases = [
+    _word(1, replaced="招募翻译校对"),
+    _word(1, replaced=r"\[GB\]", regex=1),
+    _word(1, replaced="[(", regex=1),
+    _word(2, replaced="HEVC", replace="H265"),
+    _word(2, replaced=r"(?i)web[-.]?dl", replace="WEB-DL", regex=1),
+    _word(2, replaced="第二季", replace="S02"),
+    _word(2, replaced="不会出现的替换词", replace="XXX"),
+    _word(3, replaced=r"\[(\d+)\]\[1080p\]", replace=r"[\1][1080P]", front=r"\[", back=r"\]\[1080P", offset="EP+12"),
+    _word(4, front="第", back="集", offset="EP-1"),
+    _word(4, front="(", back="集", offset="EP-1"),
+] + [_word(2, replaced=f"Placeholder{i}", replace=f"Replaced{i}") for i in range(200)]
+
+
+class WordsHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.wordshelper = WordsHelper()
+        self.wordshelper.words_info = words_cases
+        self.wordshelper.build_program()
+        self.titles = [info.get("title") for info in meta_cases if info.get("title")]
+
+    def tearDown(self) -> None:
+        self.wordshelper.init_config()
+
+    def legacy_process(self, title):
+        """
+        未预编译时的识别词处理逻辑，作为结果比对基准
+        """
+        msg = []
+        used = {"ignored": [], "replaced": [], "offset": []}
+        for word_info in words_cases:
+            match word_info.TYPE:
+                case 1:
+                    ignored = word_info.REPLACED
+                    title, ignore_msg, ignore_flag = self.wordshelper.replace_regex(title, ignored, "") \
+                        if word_info.REGEX else self.wordshelper.replace_noregex(title, ignored, "")
+                    if ignore_flag:
+                        used["ignored"].append(ignored)
+                    elif ignore_msg:
+                        msg.append(f"自定义屏蔽词 {ignored} 设置有误：{ignore_msg}")
+                case 2:
+                    replaced, replace = word_info.REPLACED, word_info.REPLACE
+                    replaced_word = f"{replaced} ⇒ {replace}"
+                    title, replace_msg, replace_flag = self.wordshelper.replace_regex(title, replaced, replace) \
+                        if word_info.REGEX else self.wordshelper.replace_noregex(title, replaced, replace)
+                    if replace_flag:
+                        used["replaced"].append(replaced_word)
+                    elif replace_msg:
+                        msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
+                case 3:
+                    replaced, replace, front, back, offset = \
+                        word_info.REPLACED, word_info.REPLACE, word_info.FRONT, word_info.BACK, word_info.OFFSET
+                    replaced_word = f"{replaced} ⇒ {replace}"
+                    offset_word = f"{front} + {back} >> {offset}"
+                    replaced_offset_word = f"{replaced_word} @@@ {offset_word}"
+                    title_cache = title
+                    title, replace_msg, replace_flag = self.wordshelper.replace_regex(title, replaced, replace)
+                    if replace_flag:
+                        title, offset_msg, offset_flag = self.wordshelper.episode_offset(title, front, back, offset)
+                        if offset_flag:
+                            used["replaced"].append(replaced_word)
+                            used["offset"].append(offset_word)
+                        elif offset_msg:
+                            title = title_cache
+                            msg.append(
+                                f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
+                    elif replace_msg:
+                        msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
+                case 4:
+                    front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
+                    offset_word = f"{front} + {back} >> {offset}"
+                    title, offset_msg, offset_flag = self.wordshelper.episode_offset(title, front, back, offset)
+                    if offset_flag:
+                        used["offset"].append(offset_word)
+                    elif offset_msg:
+                        msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
+        return title, msg, used
+
+    def test_process(self):
+        for title in self.titles + ["测试 第二季 第03集 WEB.DL 招募翻译校对"]:
+            self.assertEqual(self.legacy_process(title), self.wordshelper.process(title))
+
+    def test_process_benchmark(self):
+        rounds = 5
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for title in self.titles:
+                self.legacy_process(title)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for title in self.titles:
+                self.wordshelper.process(title)
+        compiled_time = time.perf_counter() - start
+        print(f"\n识别词处理 {rounds * len(self.titles)} 个标题，"
+              f"原方式 {legacy_time:.3f} 秒，预编译 {compiled_time:.3f} 秒")
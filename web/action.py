@@ -22,12 +22,13 @@ from werkzeug.security import generate_password_hash
 import log
 from app.brushtask import BrushTask
 from app.conf import SystemConfig, ModuleConf
+from app.db import MainDb
 from app.downloader import Downloader
 from app.filetransfer import FileTransfer
 from app.filter import Filter
 from app.helper import DbHelper, ProgressHelper, ThreadHelper, \
     MetaHelper, DisplayHelper, WordsHelper
-from app.helper import RssHelper, PluginHelper
+from app.helper import RssHelper, PluginHelper, ImageCacheHelper
 from app.indexer import Indexer
 from app.media import Category, Media, Bangumi, DouBan, Scraper
 from app.media.meta import MetaInfo, MetaBase
@@ -2448,6 +2449,10 @@ class WebAction:
                 'fav': fav,
                 'rssid': rssid
             })
+        # 后台预加载海报缩略图，与页面请求的地址保持一致
+        ImageCacheHelper().prefetch(urls=[re.sub(r"qnmob3", "img1", res.get("image"), count=1, flags=re.I)
+                                          for res in res_list if res.get("image") and str(res.get("image")).lower() != "none"],
+                                    width=342)
         return {"code": 0, "Items": res_list}
 
     @staticmethod
@@ -2579,7 +2584,6 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -2622,6 +2626,8 @@ class WebAction:
             temp_path = Config().get_temp_path()
             file_path = os.path.join(temp_path, filename)
             try:
+                # 先合并WAL日志，避免恢复后旧日志被回放到新的数据库文件
+                MainDb().checkpoint()
                 shutil.unpack_archive(file_path, config_path, format='zip')
                 return {"code": 0, "msg": ""}
             except Exception as e:
@@ -5321,7 +5327,14 @@ class WebAction:
             # 把现有的相关文件进行copy备份
             shutil.copy(f'{config_path}/config.yaml', backup_path)
             shutil.copy(f'{config_path}/default-category.yaml', backup_path)
-            shutil.copy(f'{config_path}/user.db', backup_path)
+            # WAL模式下数据可能尚在日志中，使用SQLite在线备份复制数据库
+            src_conn = sqlite3.connect(f'{config_path}/user.db')
+            dst_conn = sqlite3.connect(f'{backup_path}/user.db')
+            try:
+                src_conn.backup(dst_conn)
+            finally:
+                dst_conn.close()
+                src_conn.close()
 
             # 完整备份不删除表
             if not full_backup:
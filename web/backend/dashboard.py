@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import log
+from app.helper import ThreadHelper
+from app.mediaserver import MediaServer
+from app.utils import ExceptionUtils, SingleFlight
+from app.utils.commons import singleton
+from config import Config
+from web.action import WebAction
+
+
+@singleton
+class Dashboard(object):
+    """
+    首页数据快照：并发查询媒体服务器统计、播放记录、媒体库等数据，有效期内直接返回快照，
+    过期后先返回旧快照并在后台刷新，多个页面同时打开时只查询一次
+    """
+    # 快照有效期（秒）
+    SNAPSHOT_TTL = 60
+
+    _snapshot = None
+    _snapshot_time = 0
+    _snapshot_server = None
+    _refreshing = False
+
+    def __init__(self):
+        self._lock = Lock()
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="Dashboard")
+
+    @staticmethod
+    def __get_server_type():
+        return Config().get_config('media').get('media_server')
+
+    def get_snapshot(self):
+        """
+        获取首页数据快照
+        """
+        server_type = self.__get_server_type()
+        with self._lock:
+            snapshot = self._snapshot
+            # 没有快照或媒体服务器已切换时同步查询
+            refresh_sync = not snapshot or self._snapshot_server != server_type
+            expired = time.time() - self._snapshot_time > self.SNAPSHOT_TTL
+            refresh_async = not refresh_sync and expired and not self._refreshing
+            if refresh_async:
+                self._refreshing = True
+        if refresh_sync:
+            return self.refresh()
+        if refresh_async:
+            ThreadHelper().start_thread(self.__refresh_background, ())
+        return snapshot
+
+    def refresh(self):
+        """
+        立即刷新快照，同时发起的刷新只查询一次
+        """
+        snapshot, _ = self._flight.do("dashboard", self.__build)
+        return snapshot
+
+    def __refresh_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def __submit(self, func, default):
+        """
+        提交查询任务，出错时返回默认值，不影响其它数据
+        """
+
+        def run():
+            try:
+                return func()
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return default
+
+        return self._executor.submit(run)
+
+    def __build(self):
+        start = time.time()
+        server_type = self.__get_server_type()
+        futures = {
+            "MediaCounts": self.__submit(WebAction.get_library_mediacount, {"code": -1}),
+            "Activity": self.__submit(lambda: WebAction.get_library_playhistory().get("result"), []),
+            "LibrarySpaces": self.__submit(WebAction.get_library_spacesize, {}),
+            "Librarys": self.__submit(MediaServer().get_libraries, []),
+            "Resumes": self.__submit(MediaServer().get_resume, []),
+            "Latests": self.__submit(MediaServer().get_latest, [])
+        }
+        snapshot = {key: future.result() for key, future in futures.items()}
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_time = time.time()
+            self._snapshot_server = server_type
+        log.debug(f"【Web】首页数据刷新完成，耗时 {round(time.time() - start, 2)} 秒")
+        return snapshot
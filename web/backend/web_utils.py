@@ -1,5 +1,3 @@
-from functools import lru_cache
-
 import cn2an
 
 from app.media import Media, Bangumi, DouBan
@@ -192,19 +190,3 @@ class WebUtils:
                 else:
                     EndPage = total_page
         return range(StartPage, EndPage + 1)
-
-    @staticmethod
-    @lru_cache(maxsize=128)
-    def request_cache(url):
-        """
-        带缓存的请求
-        """
-        if url.find('douban'):
-            ret = RequestUtils(referer="https://movie.douban.com").get_res(url)
-        else:
-            ret = RequestUtils().get_res(url)
-        if ret:
-            return ret.content
-        
-        # 避免 lru 缓存失败的情况，exception 不会被缓存
-        raise Exception('request failed')
@@ -1,6 +1,5 @@
 import base64
 import datetime
-import hashlib
 import ipaddress
 import mimetypes
 import os.path
@@ -31,12 +30,15 @@ from app.brushtask import BrushTask
 from app.conf import ModuleConf, SystemConfig
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper
+from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper, ProgressHelper, ImageCacheHelper
 from app.indexer import Indexer
-from app.media.meta import MetaInfo
+from app.media import Media
+from app.media.meta import MetaInfo, MetaCache
+from app.media.tmdbv3api import TMDb, Priority
 from app.mediaserver import MediaServer
 from app.message import Message
-from app.plugins import EventManager
+from app.plugins import EventManager, PluginManager
+from app.rss import Rss
 from app.rsschecker import RssChecker
 from app.sites import Sites, SiteUserInfo
 from app.subscribe import Subscribe
@@ -48,6 +50,7 @@ from config import PT_TRANSFER_INTERVAL, Config, TMDB_API_DOMAINS
 from web.action import WebAction
 from web.apiv1 import apiv1_bp
 from web.backend.WXBizMsgCrypt3 import WXBizMsgCrypt
+from web.backend.dashboard import Dashboard
 from web.backend.pro_user import ProUser
 from web.backend.wallpaper import get_login_wallpaper
 from web.backend.web_utils import WebUtils
@@ -85,10 +88,6 @@ LoginManager = LoginManager()
 LoginManager.login_view = "login"
 LoginManager.init_app(App)
 
-# SSE
-LoggingSource = ""
-LoggingLock = Lock()
-
 # 路由注册
 App.register_blueprint(apiv1_bp, url_prefix="/api/v1")
 
@@ -97,6 +96,19 @@ mimetypes.add_type('application/javascript', '.js')
 mimetypes.add_type('text/css', '.css')
 
 
+@App.before_request
+def set_tmdb_priority():
+    """
+    页面发起的TMDB查询优先于后台任务
+    """
+    TMDb.set_priority(Priority.INTERACTIVE)
+
+
+@App.teardown_request
+def reset_tmdb_priority(exc=None):
+    TMDb.set_priority(None)
+
+
 @App.after_request
 def add_header(r):
     """
@@ -301,21 +313,23 @@ def web():
 def index():
     # 媒体服务器类型
     MSType = Config().get_config('media').get('media_server')
+    # 首页数据快照：媒体数量、活动日志、磁盘空间、媒体库、继续观看、最近添加
+    Snapshot = Dashboard().get_snapshot()
     # 获取媒体数量
-    MediaCounts = WebAction().get_library_mediacount()
+    MediaCounts = Snapshot.get("MediaCounts")
     if MediaCounts.get("code") == 0:
         ServerSucess = True
     else:
         ServerSucess = False
 
     # 获得活动日志
-    Activity = WebAction().get_library_playhistory().get("result")
+    Activity = Snapshot.get("Activity")
 
     # 磁盘空间
-    LibrarySpaces = WebAction().get_library_spacesize()
+    LibrarySpaces = Snapshot.get("LibrarySpaces")
 
     # 媒体库
-    Librarys = MediaServer().get_libraries()
+    Librarys = Snapshot.get("Librarys")
     LibrarySyncConf = SystemConfig().get(SystemConfigKey.SyncLibrary) or []
     AllLibraryModule = [MyMediaLibraryType.MINE, MyMediaLibraryType.WATCHING, MyMediaLibraryType.NEWESTADD]
     LibraryManageConf = SystemConfig().get(SystemConfigKey.LibraryDisplayModule) or []
@@ -324,10 +338,10 @@ def index():
             LibraryManageConf.append({"id": index, "name": item.value, "selected": True})
 
     # 继续观看
-    Resumes = MediaServer().get_resume()
+    Resumes = Snapshot.get("Resumes")
 
     # 最近添加
-    Latests = MediaServer().get_latest()
+    Latests = Snapshot.get("Latests")
 
     return render_template("index.html",
                            ServerSucess=ServerSucess,
@@ -754,6 +768,15 @@ def service():
             'time': tim_rssdownload,
             'state': rss_state,
         })
+        # RSS下载耗时
+        fetch_statistics = Rss().get_fetch_statistics()
+        if fetch_statistics:
+            slowest_site, slowest = max(fetch_statistics.items(), key=lambda x: x[1].get("last_seconds"))
+            Services['rssdownload'].update({
+                'desc': "%s 个站点，最慢 %s %s 秒" % (len(fetch_statistics),
+                                                 slowest_site,
+                                                 slowest.get("last_seconds"))
+            })
 
     # RSS搜索
     if "subscribe_search_all" in Services:
@@ -794,6 +817,16 @@ def service():
         else:
             Services.pop('sync')
 
+    # 插件事件
+    if "pluginevents" in Services:
+        event_statistics = PluginManager().get_event_statistics()
+        Services['pluginevents'].update({
+            'time': "%s 个插件" % len(event_statistics),
+            'state': 'ON' if event_statistics else 'OFF',
+            'desc': "排队 %s 个事件" % sum(item.get("queued") for item in event_statistics),
+            'statistics': event_statistics
+        })
+
     # 系统进程
     if "processes" in Services:
         if not SystemUtils.is_docker() or not SystemUtils.get_all_processes():
@@ -803,7 +836,12 @@ def service():
                            Count=len(Services),
                            RuleGroups=RuleGroups,
                            SyncPaths=SyncPaths,
-                           SchedulerTasks=Services)
+                           SchedulerTasks=Services,
+                           MetaCacheStats=MetaCache().get_statistics(),
+                           TmdbCacheStats=TMDb.get_cache_statistics(),
+                           MediaFlightStats=Media.get_flight_statistics(),
+                           TmdbSchedulerStats=TMDb.get_scheduler_statistics(),
+                           ImageCacheStats=ImageCacheHelper().get_statistics())
 
 
 # 历史记录页面
@@ -1805,25 +1843,27 @@ def Img():
     url = request.args.get('url')
     if not url:
         return make_response("参数错误", 400)
-    # 计算Etag
-    etag = hashlib.sha256(url.encode('utf-8')).hexdigest()
-    # 检查协商缓存
-    if_none_match = request.headers.get('If-None-Match')
-    if if_none_match and if_none_match == etag:
-        return make_response('', 304)
-    
-    # 获取图片数据
-    try:
-      img = WebUtils.request_cache(url)
-      response = Response(
-          img,
-          mimetype='image/jpeg'
-      )
-      response.headers.set('Cache-Control', 'max-age=604800')
-      response.headers.set('Etag', etag)
-      return response
-    except:
-      return make_response("图片加载失败", 400)
+    # 缩略图宽度
+    width = ImageCacheHelper().get_width(request.args.get('w'))
+    for _ in range(2):
+        # 获取图片缓存文件
+        try:
+            path = ImageCacheHelper().get_image(url, width)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            path = None
+        if not path:
+            return make_response("图片加载失败", 400)
+        try:
+            return send_file(path,
+                             mimetype=ImageCacheHelper().get_mimetype(path),
+                             etag=ImageCacheHelper().get_etag(url, width),
+                             max_age=604800,
+                             conditional=True)
+        except FileNotFoundError:
+            # 发送前缓存文件已被淘汰，重新获取
+            continue
+    return make_response("图片加载失败", 400)
 
 @App.route('/stream-logging')
 @login_required
@@ -1834,24 +1874,18 @@ def stream_logging():
 
     def __logging(_source=""):
         """
-        实时日志
+        实时日志，每个连接单独记录读取位置，有新日志时推送
         """
-        global LoggingSource
-
+        cursor = 0
         while True:
-            with LoggingLock:
-                if _source != LoggingSource:
-                    LoggingSource = _source
-                    log.LOG_INDEX = len(log.LOG_QUEUE)
-                if log.LOG_INDEX > 0:
-                    logs = list(log.LOG_QUEUE)[-log.LOG_INDEX:]
-                    log.LOG_INDEX = 0
-                    if _source:
-                        logs = [lg for lg in logs if lg.get("source") == _source]
-                else:
-                    logs = []
-                time.sleep(1)
+            cursor, logs = log.get_logs(cursor, timeout=15)
+            if _source:
+                logs = [lg for lg in logs if lg.get("source") == _source]
+            if logs:
                 yield 'data: %s\n\n' % json.dumps(logs)
+            else:
+                # 保持连接，浏览器关闭时及时结束
+                yield ': keepalive\n\n'
 
     return Response(
         __logging(request.args.get("source") or ""),
@@ -1863,18 +1897,21 @@ def stream_logging():
 @login_required
 def stream_progress():
     """
-    实时日志EventSources响应
+    实时进度EventSources响应
     """
 
     def __progress(_type):
         """
-        实时日志
+        实时进度，进度变化时推送，无变化时定时推送当前进度
         """
-        WA = WebAction()
+        version = None
         while True:
-            time.sleep(0.2)
-            detail = WA.refresh_process({"type": _type})
-            yield 'data: %s\n\n' % json.dumps(detail)
+            version, detail = ProgressHelper().wait_process(_type, version, timeout=5)
+            if detail:
+                data = {"code": 0, "value": detail.get("value"), "text": detail.get("text")}
+            else:
+                data = {"code": 1, "value": 0, "text": "正在处理..."}
+            yield 'data: %s\n\n' % json.dumps(data)
 
     return Response(
         __progress(request.args.get("type")),